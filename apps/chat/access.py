@@ -0,0 +1,73 @@
+"""
+Кто может подключиться к чату.
+
+- обычный чат — участники (Chat.participants);
+- чат сообщества — владелец сообщества и его участники без бана
+  (CommunityMembership.is_banned).
+
+Решение кэшируется на CHAT_ACCESS_CACHE_TTL: переподключение не ходит в
+БД, а ChatConsumer проверяет доступ один раз на соединение. При смене
+участников чата или членства в сообществе signals.py сбрасывает ключи и
+шлёт в личную группу пользователя управляющее сообщение chat.access —
+открытые соединения перепроверяют доступ и закрываются, если его больше нет.
+"""
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.cache import cache
+
+from apps.communities.models import CommunityMembership
+
+from .models import Chat
+from .unread import user_group
+
+CACHE_VERSION = 1
+
+
+def cache_key(chat_id: int, user_id: int) -> str:
+    return f"chat:access:v{CACHE_VERSION}:{chat_id}:{user_id}"
+
+
+def check(chat_id: int, user_id: int) -> bool:
+    """Решение по БД, без кэша."""
+    chat = Chat.objects.filter(pk=chat_id).values("community_id", "community__owner_id").first()
+    if chat is None:
+        return False
+    if chat["community_id"]:
+        if chat["community__owner_id"] == user_id:
+            return True
+        banned = (
+            CommunityMembership.objects.filter(community_id=chat["community_id"], user_id=user_id)
+            .values_list("is_banned", flat=True)
+            .first()
+        )
+        return banned is False
+    return Chat.participants.through.objects.filter(chat_id=chat_id, user_id=user_id).exists()
+
+
+def allowed(chat_id: int, user_id: int) -> bool:
+    key = cache_key(chat_id, user_id)
+    hit = cache.get(key)
+    if hit is not None:
+        return bool(hit)
+    result = check(chat_id, user_id)
+    cache.set(key, int(result), int(getattr(settings, "CHAT_ACCESS_CACHE_TTL", 300)))
+    return result
+
+
+def invalidate(pairs) -> None:
+    """
+    Сбрасывает решения для пар (chat_id, user_id) и просит открытые
+    соединения этих пользователей перепроверить доступ. Вызывать после коммита.
+    """
+    pairs = set(pairs)
+    if not pairs:
+        return
+    cache.delete_many([cache_key(chat_id, user_id) for chat_id, user_id in pairs])
+    by_user = {}
+    for chat_id, user_id in pairs:
+        by_user.setdefault(user_id, []).append(chat_id)
+    send = async_to_sync(get_channel_layer().group_send)
+    for user_id, chat_ids in by_user.items():
+        send(user_group(user_id), {"type": "chat.access", "chats": sorted(chat_ids)})
@@ -5,6 +5,9 @@ class ChatConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.chat"
 
+    def ready(self):
+        from . import signals  # noqa: F401
+
 
 
 
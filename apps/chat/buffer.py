@@ -0,0 +1,138 @@
+"""
+Отложенная запись сообщений чата (write-behind).
+
+ChatConsumer рассылает сообщение сразу, а строку Message кладёт в буфер
+процесса. Буфер пишет её в БД через bulk_create — пачкой на чат, раз в
+CHAT_WRITE_FLUSH_MS или как только в чате набралось CHAT_WRITE_BATCH_SIZE
+сообщений. Запись идёт через database_sync_to_async, event loop не ждёт БД.
+
+- uid и created_at назначает consumer, поэтому рассылка и строка совпадают,
+  а повторная запись той же пачки ничего не дублирует (ignore_conflicts по uid);
+- при отключении клиента consumer дожидается сброса буфера своего чата;
+- в той же транзакции обновляются счётчики непрочитанных (unread.py),
+  после записи участникам рассылаются новые значения;
+- после записи сбрасывается кэш последней страницы истории (history.py);
+- сбой БД (OperationalError и т. п.) — пачка возвращается в буфер и
+  пишется повторно; строки, которые не проходят ограничения (чат удалён),
+  отбрасываются с записью в лог.
+"""
+
+import asyncio
+import logging
+import weakref
+from collections import defaultdict
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from . import history, unread
+from .models import Message
+
+logger = logging.getLogger(__name__)
+
+RETRY_DELAY = 1.0
+
+
+def write_messages(messages: list) -> int:
+    written = _insert(messages)
+    for chat_id in {message.chat_id for message in written}:
+        try:
+            history.invalidate(chat_id)
+        except Exception:
+            # The rows are committed: a failed cache reset must not send the batch back for a retry.
+            logger.exception("cannot invalidate chat %s history cache", chat_id)
+    return len(written)
+
+
+def _insert(messages: list) -> list:
+    try:
+        with transaction.atomic():
+            Message.objects.bulk_create(messages, ignore_conflicts=True)
+            unread.record(messages)
+        return messages
+    except IntegrityError:
+        # One bad row (e.g. its chat was deleted) must not hold back the rest.
+        written = []
+        for message in messages:
+            try:
+                with transaction.atomic():
+                    Message.objects.bulk_create([message], ignore_conflicts=True)
+                    unread.record([message])
+                written.append(message)
+            except IntegrityError:
+                logger.warning("chat message %s dropped: chat %s is gone", message.uid, message.chat_id)
+        return written
+
+
+class MessageBuffer:
+    def __init__(self, flush_ms: int, batch_size: int):
+        self.delay = max(0, flush_ms) / 1000
+        self.batch_size = max(1, batch_size)
+        self.pending = defaultdict(list)
+        self.locks = defaultdict(asyncio.Lock)
+        self.timers = {}
+        self.tasks = set()
+
+    def add(self, message: Message) -> None:
+        chat_id = message.chat_id
+        self.pending[chat_id].append(message)
+        if len(self.pending[chat_id]) >= self.batch_size:
+            self._spawn(self.flush(chat_id))
+        elif chat_id not in self.timers:
+            self.timers[chat_id] = self._spawn(self._flush_later(chat_id, self.delay))
+
+    def _spawn(self, coro) -> asyncio.Task:
+        # Keep a reference: the loop only holds weak ones to running tasks.
+        task = asyncio.get_running_loop().create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+    async def _flush_later(self, chat_id: int, delay: float) -> None:
+        await asyncio.sleep(delay)
+        self.timers.pop(chat_id, None)
+        await self.flush(chat_id)
+
+    async def flush(self, chat_id: int) -> int:
+        """Пишет всё, что накопилось для чата. Возвращает число записанных строк."""
+        async with self.locks[chat_id]:
+            written = await self._write(chat_id)
+        if written:
+            try:
+                await unread.notify(chat_id)
+            except Exception:
+                logger.exception("cannot push unread badges for chat %s", chat_id)
+        return written
+
+    async def _write(self, chat_id: int) -> int:
+        batch = self.pending.pop(chat_id, [])
+        if not batch:
+            return 0
+        try:
+            return await database_sync_to_async(write_messages)(batch)
+        except Exception:
+            logger.exception("cannot write %s chat messages for chat %s, will retry", len(batch), chat_id)
+            self.pending[chat_id][:0] = batch
+            if chat_id not in self.timers:
+                self.timers[chat_id] = self._spawn(self._flush_later(chat_id, RETRY_DELAY))
+            return 0
+
+    async def flush_all(self) -> int:
+        return sum([await self.flush(chat_id) for chat_id in list(self.pending)])
+
+
+_buffers = weakref.WeakKeyDictionary()
+
+
+def get_buffer() -> MessageBuffer:
+    """Буфер текущего event loop (asyncio-примитивы привязаны к циклу)."""
+    loop = asyncio.get_running_loop()
+    buffer = _buffers.get(loop)
+    if buffer is None:
+        buffer = MessageBuffer(
+            int(getattr(settings, "CHAT_WRITE_FLUSH_MS", 250)),
+            int(getattr(settings, "CHAT_WRITE_BATCH_SIZE", 50)),
+        )
+        _buffers[loop] = buffer
+    return buffer
@@ -1,32 +1,199 @@
-from channels.generic.websocket import AsyncWebsocketConsumer
 import json
+import uuid
+
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncWebsocketConsumer
+from django.conf import settings
+from django.utils import timezone
+
+from apps.core.pagination import InvalidCursor
+
+from . import access, history, presence, unread
+from .buffer import get_buffer
+from .models import Message
+
+
+def message_payload(message: Message, username: str, client_id=None) -> dict:
+    """То, что получают клиенты: id и время — серверные (строка в БД будет с теми же)."""
+    payload = {
+        "type": "message",
+        "id": str(message.uid),
+        "chat": message.chat_id,
+        "author": {"id": message.author_id, "username": username},
+        "message": message.text,
+        # Plain types only: the Redis channel layer serializes events with msgpack.
+        "created_at": message.created_at.isoformat(),
+    }
+    if client_id:
+        # Lets the sender match the echo with its optimistic copy.
+        payload["client_id"] = str(client_id)[:64]
+    return payload
+
+
+async def send_unread(consumer, event):
+    payload = {"type": "unread", "chat": event["chat"], "unread": event["unread"]}
+    if event.get("last_message_at"):
+        payload["last_message_at"] = event["last_message_at"]
+    await consumer.send(text_data=json.dumps(payload))
 
 
 class ChatConsumer(AsyncWebsocketConsumer):
+    joined = False
+
     async def connect(self):
-        self.chat_id = self.scope["url_route"]["kwargs"]["chat_id"]
+        self.chat_id = int(self.scope["url_route"]["kwargs"]["chat_id"])
         self.room_group_name = f"chat_{self.chat_id}"
+        self.user = self.scope.get("user")
+
+        # Checked once per connection (and cached across reconnects); membership changes
+        # arrive as chat.access control messages, see access.py.
+        if not (self.user and self.user.is_authenticated) or not await database_sync_to_async(access.allowed)(
+            self.chat_id, self.user.pk
+        ):
+            await self.close(code=4403)
+            return
+        # Community members are allowed without being participants: give them unread tracking too.
+        await database_sync_to_async(unread.ensure_state)(self.chat_id, self.user.pk)
 
         await self.channel_layer.group_add(self.room_group_name, self.channel_name)
+        # Unread badges of the user's other chats (sidebar).
+        await self.channel_layer.group_add(unread.user_group(self.user.pk), self.channel_name)
+        self.joined = True
         await self.accept()
+        hub = presence.get_hub()
+        await hub.join(self.chat_id, self.user.pk, self.channel_name)
+        # Group frames only carry changes; a new connection needs the current state once.
+        current = await hub.current(self.chat_id)
+        if current:
+            await self.send(text_data=json.dumps(current))
 
     async def disconnect(self, close_code):
+        if not self.joined:
+            return
+        await presence.get_hub().leave(self.chat_id, self.user.pk, self.channel_name)
         await self.channel_layer.group_discard(self.room_group_name, self.channel_name)
+        await self.channel_layer.group_discard(unread.user_group(self.user.pk), self.channel_name)
+        # Whatever this client sent must reach the database even though the socket is gone.
+        await get_buffer().flush(self.chat_id)
 
     async def receive(self, text_data=None, bytes_data=None):
-        if text_data:
+        if not text_data or not self.joined:
+            return
+        try:
             data = json.loads(text_data)
-            message = data.get("message", "")
-            await self.channel_layer.group_send(
-                self.room_group_name,
-                {
-                    "type": "chat_message",
-                    "message": message,
-                },
+        except ValueError:
+            await self.send_error("bad_json")
+            return
+        if not isinstance(data, dict):
+            await self.send_error("bad_json")
+            return
+
+        if data.get("command") == "history":
+            await self.send_history(data.get("before"))
+            return
+        if data.get("command") == "read":
+            await self.mark_read(data.get("id"))
+            return
+        if data.get("command") == "typing":
+            await presence.get_hub().typing(
+                self.chat_id, self.user.pk, self.user.get_username(), active=data.get("active", True) is not False
             )
+            return
+
+        text = str(data.get("message") or "").strip()
+        if not text:
+            await self.send_error("empty_message")
+            return
+        if len(text) > int(getattr(settings, "CHAT_MESSAGE_MAX_LENGTH", 4000)):
+            await self.send_error("message_too_long")
+            return
+
+        message = Message(
+            uid=uuid.uuid4(),
+            chat_id=self.chat_id,
+            author_id=self.user.pk,
+            text=text,
+            created_at=timezone.now(),
+        )
+        get_buffer().add(message)
+        await presence.get_hub().typing(self.chat_id, self.user.pk, self.user.get_username(), active=False)
+        await self.channel_layer.group_send(
+            self.room_group_name,
+            {
+                "type": "chat_message",
+                "message": message_payload(message, self.user.get_username(), data.get("client_id")),
+            },
+        )
+
+    async def send_history(self, before):
+        """Команда {"command": "history", "before": курсор?}: страница старше курсора, без него — последняя."""
+        try:
+            data = await database_sync_to_async(history.page)(self.chat_id, str(before) if before else None)
+        except InvalidCursor:
+            await self.send_error("bad_cursor")
+            return
+        await self.send(text_data=json.dumps({"type": "history", "before": before or None, **data}))
+
+    async def mark_read(self, uid):
+        """Команда {"command": "read", "id": uid}: прочитано всё до этого сообщения."""
+        try:
+            uid = uuid.UUID(str(uid))
+        except ValueError:
+            await self.send_error("bad_message_id")
+            return
+        # The message may still sit in the write buffer.
+        await get_buffer().flush(self.chat_id)
+        count = await database_sync_to_async(unread.mark_read)(self.chat_id, self.user.pk, uid)
+        if count is None:
+            await self.send_error("bad_message_id")
+            return
+        # Every open tab of this user, this one included.
+        await unread.send_badge(self.user.pk, unread.badge(self.chat_id, count))
 
     async def chat_message(self, event):
-        await self.send(text_data=json.dumps({"message": event["message"]}))
+        await self.send(text_data=json.dumps(event["message"]))
+
+    async def chat_unread(self, event):
+        await send_unread(self, event)
+
+    async def chat_access(self, event):
+        if self.chat_id not in event["chats"]:
+            return
+        if not await database_sync_to_async(access.allowed)(self.chat_id, self.user.pk):
+            await self.send_error("access_revoked")
+            await self.close(code=4403)
+
+    async def chat_presence(self, event):
+        await self.send(text_data=json.dumps(event["presence"]))
+
+    async def send_error(self, error: str):
+        await self.send(text_data=json.dumps({"type": "error", "error": error}))
+
+
+class InboxConsumer(AsyncWebsocketConsumer):
+    """Счётчики непрочитанных для списка чатов: только события {"type": "unread", ...}."""
+
+    joined = False
+
+    async def connect(self):
+        self.user = self.scope.get("user")
+        if not (self.user and self.user.is_authenticated):
+            await self.close(code=4403)
+            return
+        await self.channel_layer.group_add(unread.user_group(self.user.pk), self.channel_name)
+        self.joined = True
+        await self.accept()
+
+    async def disconnect(self, close_code):
+        if self.joined:
+            await self.channel_layer.group_discard(unread.user_group(self.user.pk), self.channel_name)
+
+    async def chat_unread(self, event):
+        await send_unread(self, event)
+
+    async def chat_access(self, event):
+        # Access changes matter to room connections only; the inbox just shows badges.
+        pass
 
 
 
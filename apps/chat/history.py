@@ -0,0 +1,96 @@
+"""
+История чата: страницы от новых к старым по курсору.
+
+Ключ — (created_at, id) внутри чата, то есть индекс (chat, created_at):
+каждая следующая страница — «сообщения старше курсора», без OFFSET.
+Ответ компактный: авторы вынесены в отдельный словарь, сообщения внутри
+страницы — в хронологическом порядке (их удобно вставлять в начало ленты).
+
+Последняя страница каждого чата лежит в кэше (Redis) под ключом с
+поколением чата. buffer.write_messages после записи только увеличивает
+поколение (invalidate) — без чтения из БД; страницу соберёт первый
+читатель и положит через cache.add. Читатель, начавший загрузку до
+записи, кладёт страницу под старое поколение, которое уже никто не
+читает, так что свежие сообщения не перетираются устаревшей страницей.
+CHAT_HISTORY_CACHE_TTL ограничивает устаревание, если сообщения меняются
+в обход буфера.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from apps.core.pagination import CursorPaginator
+
+from .models import Message
+
+CACHE_VERSION = 1
+ORDERING = ["-created_at", "-id"]
+
+
+def page_size() -> int:
+    return int(getattr(settings, "CHAT_HISTORY_PAGE_SIZE", 50))
+
+
+def _generation_key(chat_id: int) -> str:
+    return f"chat:history:v{CACHE_VERSION}:{chat_id}:gen"
+
+
+def _generation(chat_id: int) -> int:
+    key = _generation_key(chat_id)
+    # Seeded from the clock, not 1: after an eviction the counter must not reuse old page keys.
+    cache.add(key, time.time_ns(), None)
+    return cache.get(key) or 0
+
+
+def cache_key(chat_id: int, generation: int) -> str:
+    return f"chat:history:v{CACHE_VERSION}:{chat_id}:{generation}"
+
+
+def _serialize(page) -> dict:
+    authors = {}
+    messages = []
+    for message in reversed(page.object_list):
+        authors[str(message.author_id)] = message.author.username
+        messages.append(
+            {
+                "id": str(message.uid),
+                "author": message.author_id,
+                "text": "" if message.is_deleted else message.text,
+                "created_at": message.created_at.isoformat(),
+                **({"edited": True} if message.is_edited else {}),
+                **({"deleted": True} if message.is_deleted else {}),
+            }
+        )
+    return {"messages": messages, "authors": authors, "older": page.next_cursor}
+
+
+def _load(chat_id: int, before: str | None) -> dict:
+    qs = (
+        Message.objects.filter(chat_id=chat_id)
+        .select_related("author")
+        .only("id", "uid", "chat_id", "text", "created_at", "is_edited", "is_deleted", "author__username")
+    )
+    return _serialize(CursorPaginator(qs, page_size(), ordering=ORDERING).page(before))
+
+
+def page(chat_id: int, before: str | None = None) -> dict:
+    """{"messages": [...], "authors": {id: username}, "older": курсор или None}; InvalidCursor — плохой курсор."""
+    if before:
+        return _load(chat_id, before)
+    key = cache_key(chat_id, _generation(chat_id))
+    data = cache.get(key)
+    if data is None:
+        data = _load(chat_id, None)
+        cache.add(key, data, int(getattr(settings, "CHAT_HISTORY_CACHE_TTL", 3600)))
+    return data
+
+
+def invalidate(chat_id: int) -> None:
+    """Новые сообщения записаны: следующий читатель соберёт страницу заново."""
+    key = _generation_key(chat_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), None)
@@ -0,0 +1,278 @@
+"""
+Нагрузочный прогон чата: N WebSocket-клиентов на ws/chat/<id>/.
+
+Каждый клиент подключается, шлёт сообщения с заданной частотой и
+принимает рассылку. В client_id сообщения зашита метка времени отправки,
+поэтому любой получатель считает задержку «отправил -> получил» (все
+клиенты в одном процессе, часы общие).
+
+Транспорты:
+- InProcessTransport — ASGI-приложение чата вызывается прямо в этом
+  процессе (asgiref ApplicationCommunicator), без сети: consumer, слой
+  каналов (InMemoryChannelLayer или Redis), буфер записи и БД — настоящие.
+  Удобно для CI: регрессии ChatConsumer видны без поднятого сервера.
+- WebsocketsTransport — настоящий сервер (uvicorn config.asgi:application)
+  по сети, библиотека websockets, аутентификация JWT через ?token=.
+
+Запуск — команда chat_loadtest.
+"""
+
+import asyncio
+import json
+import time
+from dataclasses import dataclass, field
+
+from asgiref.testing import ApplicationCommunicator
+from django.contrib.auth import get_user_model
+
+from .models import Chat
+
+USERNAME_PREFIX = "loadtest_"
+CLIENT_ID_PREFIX = "lt"
+
+
+def percentile(values, p: float) -> float:
+    values = sorted(values)
+    k = max(0, min(len(values) - 1, int(round(p / 100 * (len(values) - 1)))))
+    return values[k]
+
+
+class Closed(Exception):
+    pass
+
+
+class InProcessTransport:
+    def __init__(self, application, path: str, user=None, query_string: bytes = b""):
+        scope = {
+            "type": "websocket",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": query_string,
+            "headers": [(b"host", b"loadtest")],
+            "subprotocols": [],
+            "client": ("127.0.0.1", 0),
+            "server": ("loadtest", 80),
+        }
+        if user is not None:
+            scope["user"] = user
+        self.comm = ApplicationCommunicator(application, scope)
+
+    async def connect(self, timeout: float) -> None:
+        await self.comm.send_input({"type": "websocket.connect"})
+        event = await self._next(timeout)
+        if event["type"] != "websocket.accept":
+            raise Closed(event.get("code"))
+
+    async def _next(self, timeout):
+        # Not receive_output(): its timeout cancels the application.
+        return await asyncio.wait_for(self.comm.output_queue.get(), timeout)
+
+    async def send(self, text: str) -> None:
+        await self.comm.send_input({"type": "websocket.receive", "text": text})
+
+    async def recv(self, timeout: float) -> str:
+        event = await self._next(timeout)
+        if event["type"] == "websocket.close":
+            raise Closed(event.get("code"))
+        return event.get("text") or ""
+
+    async def close(self) -> None:
+        await self.comm.send_input({"type": "websocket.disconnect", "code": 1000})
+        try:
+            await self.comm.wait(5)
+        except Exception:
+            pass
+
+
+class WebsocketsTransport:
+    def __init__(self, url: str):
+        self.url = url
+        self.ws = None
+
+    async def connect(self, timeout: float) -> None:
+        import websockets
+
+        try:
+            self.ws = await websockets.connect(self.url, open_timeout=timeout, max_queue=None)
+        except websockets.InvalidStatus as exc:
+            raise Closed(exc.response.status_code)
+        except websockets.ConnectionClosed as exc:
+            raise Closed(exc.code)
+
+    async def send(self, text: str) -> None:
+        await self.ws.send(text)
+
+    async def recv(self, timeout: float) -> str:
+        import websockets
+
+        try:
+            return await asyncio.wait_for(self.ws.recv(), timeout)
+        except websockets.ConnectionClosed as exc:
+            raise Closed(exc.code)
+
+    async def close(self) -> None:
+        await self.ws.close()
+
+
+@dataclass
+class Stats:
+    connect_ms: list = field(default_factory=list)
+    latency_ms: list = field(default_factory=list)
+    connect_failed: int = 0
+    sent: int = 0
+    expected: int = 0
+    delivered: int = 0
+    errors: int = 0
+    dropped: int = 0
+    started: float = 0.0
+    finished: float = 0.0
+
+    def report(self) -> dict:
+        def dist(values):
+            if not values:
+                return None
+            return {
+                "p50": percentile(values, 50),
+                "p90": percentile(values, 90),
+                "p99": percentile(values, 99),
+                "max": max(values),
+            }
+
+        elapsed = max(1e-9, self.finished - self.started)
+        return {
+            "clients": len(self.connect_ms),
+            "connect_failed": self.connect_failed,
+            "connect_ms": dist(self.connect_ms),
+            "sent": self.sent,
+            "delivered": self.delivered,
+            # Below 1.0: broadcasts were lost (e.g. a full channel) or never arrived before hang-up.
+            "delivery_ratio": self.delivered / self.expected if self.expected else None,
+            "errors": self.errors,
+            "dropped_connections": self.dropped,
+            "seconds": elapsed,
+            "sent_per_s": self.sent / elapsed,
+            "delivered_per_s": self.delivered / elapsed,
+            "latency_ms": dist(self.latency_ms),
+        }
+
+
+# After the last send, wait until the socket has been quiet this long (at most DRAIN_MAX).
+DRAIN_QUIET = 1.0
+DRAIN_MAX = 30.0
+
+
+class Client:
+    def __init__(self, index: int, transport, stats: Stats, room_size: int = 1):
+        self.index = index
+        self.transport = transport
+        self.stats = stats
+        self.room_size = room_size
+        self.connected = False
+        self.last_rx = 0.0
+
+    async def connect(self, timeout: float) -> None:
+        started = time.perf_counter()
+        try:
+            await self.transport.connect(timeout)
+        except (Closed, OSError, asyncio.TimeoutError):
+            self.stats.connect_failed += 1
+            return
+        self.stats.connect_ms.append((time.perf_counter() - started) * 1000)
+        self.connected = True
+        self.last_rx = time.perf_counter()
+
+    async def run(self, rate: float, duration: float, size: int) -> None:
+        if not self.connected:
+            return
+        reader = asyncio.get_running_loop().create_task(self._read())
+        try:
+            await self._write(rate, duration, size)
+            self.stats.finished = max(self.stats.finished, time.perf_counter())
+            # Let the backlog of broadcasts arrive before hanging up.
+            deadline = time.perf_counter() + DRAIN_MAX
+            while time.perf_counter() < deadline and time.perf_counter() - self.last_rx < DRAIN_QUIET:
+                await asyncio.sleep(0.1)
+        finally:
+            reader.cancel()
+            await self.transport.close()
+
+    async def _write(self, rate: float, duration: float, size: int) -> None:
+        if rate <= 0:
+            await asyncio.sleep(duration)
+            return
+        period = 1 / rate
+        body = "x" * max(1, size)
+        deadline = time.perf_counter() + duration
+        # Spread clients over the first period instead of sending in lockstep.
+        await asyncio.sleep(period * (self.index % 97) / 97)
+        seq = 0
+        while time.perf_counter() < deadline:
+            seq += 1
+            client_id = f"{CLIENT_ID_PREFIX}:{self.index}:{seq}:{time.perf_counter():.6f}"
+            try:
+                await self.transport.send(json.dumps({"message": body, "client_id": client_id}))
+            except Exception:
+                self.stats.dropped += 1
+                return
+            self.stats.sent += 1
+            self.stats.expected += self.room_size
+            await asyncio.sleep(period)
+
+    async def _read(self) -> None:
+        while True:
+            try:
+                text = await self.transport.recv(3600)
+            except (Closed, asyncio.TimeoutError):
+                self.stats.dropped += 1
+                return
+            now = self.last_rx = time.perf_counter()
+            try:
+                data = json.loads(text)
+            except ValueError:
+                continue
+            if data.get("type") == "error":
+                self.stats.errors += 1
+            elif data.get("type") == "message":
+                parts = str(data.get("client_id") or "").split(":")
+                if len(parts) == 4 and parts[0] == CLIENT_ID_PREFIX:
+                    self.stats.delivered += 1
+                    self.stats.latency_ms.append((now - float(parts[3])) * 1000)
+
+
+def room_sizes(clients: int, rooms: int) -> list[int]:
+    """Сколько клиентов в чате клиента i (клиент i — в чате i % rooms)."""
+    return [len(range(i % rooms, clients, rooms)) for i in range(clients)]
+
+
+def prepare(clients: int, chats: int) -> tuple[list, list]:
+    """Пользователи loadtest_<i> и чаты; клиент i — в чате i % chats."""
+    User = get_user_model()
+    users = []
+    for i in range(clients):
+        user, _ = User.objects.get_or_create(username=f"{USERNAME_PREFIX}{i}")
+        users.append(user)
+    rooms = [Chat.objects.create(type=Chat.ChatType.GROUP) for _ in range(max(1, chats))]
+    for idx, room in enumerate(rooms):
+        room.participants.add(*users[idx :: len(rooms)])
+    return users, rooms
+
+
+def cleanup(rooms) -> None:
+    """Удаляет чаты прогона вместе с сообщениями; пользователи остаются для следующего запуска."""
+    Chat.objects.filter(pk__in=[room.pk for room in rooms]).delete()
+
+
+async def run(transports, *, room_sizes=None, rate: float, duration: float, size: int, connect_concurrency: int, timeout: float):
+    stats = Stats()
+    room_sizes = room_sizes or [len(transports)] * len(transports)
+    clients = [Client(i, t, stats, room_sizes[i]) for i, t in enumerate(transports)]
+    gate = asyncio.Semaphore(max(1, connect_concurrency))
+
+    async def connect(client):
+        async with gate:
+            await client.connect(timeout)
+
+    await asyncio.gather(*(connect(c) for c in clients))
+    stats.started = time.perf_counter()
+    await asyncio.gather(*(c.run(rate, duration, size) for c in clients))
+    return stats.report()
@@ -0,0 +1,140 @@
+import asyncio
+import json
+from contextlib import nullcontext
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from apps.chat import loadtest
+
+LAYERS = ("default", "memory", "redis")
+
+
+def _layer_settings(layer: str, redis_url: str):
+    if layer == "memory":
+        return {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+    if layer == "redis":
+        return {"default": {"BACKEND": "channels_redis.core.RedisChannelLayer", "CONFIG": {"hosts": [redis_url]}}}
+    return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный прогон WebSocket-чата: N клиентов, задержка подключения, "
+        "перцентили задержки доставки и пропускная способность."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clients", type=int, default=100, help="Число WebSocket-клиентов.")
+        parser.add_argument("--chats", type=int, default=1, help="На сколько чатов разделить клиентов.")
+        parser.add_argument("--rate", type=float, default=1.0, help="Сообщений в секунду на клиента (0 — только слушать).")
+        parser.add_argument("--duration", type=float, default=10.0, help="Длительность отправки, секунд.")
+        parser.add_argument("--size", type=int, default=64, help="Длина текста сообщения.")
+        parser.add_argument("--connect-concurrency", type=int, default=50, help="Одновременных подключений.")
+        parser.add_argument("--timeout", type=float, default=10.0, help="Таймаут подключения, секунд.")
+        parser.add_argument(
+            "--layer",
+            choices=LAYERS,
+            default="default",
+            help="Слой каналов для прогона в процессе: из настроек, InMemoryChannelLayer или Redis.",
+        )
+        parser.add_argument("--redis-url", default="redis://localhost:6379/3", help="Redis для --layer redis.")
+        parser.add_argument(
+            "--url",
+            help="Гнать нагрузку на запущенный сервер (ws://host:port) вместо приложения в процессе; нужен websockets.",
+        )
+        parser.add_argument("--keep", action="store_true", help="Не удалять чаты и сообщения прогона.")
+        parser.add_argument("--json", action="store_true", help="Отчёт одной строкой JSON (для CI).")
+        parser.add_argument("--max-p99-ms", type=float, help="Ошибка, если p99 задержки доставки выше.")
+        parser.add_argument(
+            "--min-delivery", type=float, help="Ошибка, если доля доставленных рассылок ниже (0..1)."
+        )
+
+    def handle(self, *args, **options):
+        if options["clients"] < 1:
+            raise CommandError("--clients должно быть больше нуля.")
+        if options["url"] and options["layer"] != "default":
+            raise CommandError("--layer относится к прогону в процессе; у сервера слой из его настроек.")
+
+        layers = _layer_settings(options["layer"], options["redis_url"])
+        users, rooms = loadtest.prepare(options["clients"], options["chats"])
+        try:
+            with override_settings(CHANNEL_LAYERS=layers) if layers else nullcontext():
+                transports = self._transports(users, rooms, options)
+                report = asyncio.run(
+                    loadtest.run(
+                        transports,
+                        room_sizes=loadtest.room_sizes(len(users), len(rooms)),
+                        rate=options["rate"],
+                        duration=options["duration"],
+                        size=options["size"],
+                        connect_concurrency=options["connect_concurrency"],
+                        timeout=options["timeout"],
+                    )
+                )
+        finally:
+            if not options["keep"]:
+                loadtest.cleanup(rooms)
+
+        report["layer"] = options["layer"] if not options["url"] else "server"
+        if options["json"]:
+            self.stdout.write(json.dumps(report))
+        else:
+            self._print(report)
+
+        limit = options["max_p99_ms"]
+        if report["connect_failed"]:
+            raise CommandError(f"Не подключились: {report['connect_failed']} клиентов.")
+        ratio = report["delivery_ratio"]
+        if options["min_delivery"] is not None and ratio is not None and ratio < options["min_delivery"]:
+            raise CommandError(f"Доставлено {ratio:.3f} рассылок < {options['min_delivery']:.3f}")
+        if limit is not None and report["latency_ms"] and report["latency_ms"]["p99"] > limit:
+            raise CommandError(f"p99 {report['latency_ms']['p99']:.1f} ms > {limit:.1f} ms")
+
+    def _transports(self, users, rooms, options):
+        if options["url"]:
+            try:
+                import websockets  # noqa: F401
+            except ImportError:
+                raise CommandError("Для --url нужен пакет websockets (ставится с uvicorn[standard]).")
+            from rest_framework_simplejwt.tokens import AccessToken
+
+            base = options["url"].rstrip("/")
+            return [
+                loadtest.WebsocketsTransport(
+                    f"{base}/ws/chat/{rooms[i % len(rooms)].pk}/?token={AccessToken.for_user(user)}"
+                )
+                for i, user in enumerate(users)
+            ]
+
+        from channels.routing import URLRouter
+
+        from apps.chat.routing import websocket_urlpatterns
+
+        # Same router as config/asgi.py; the user goes straight into the scope instead of a session.
+        application = URLRouter(websocket_urlpatterns)
+        return [
+            loadtest.InProcessTransport(application, f"/ws/chat/{rooms[i % len(rooms)].pk}/", user=user)
+            for i, user in enumerate(users)
+        ]
+
+    def _print(self, report):
+        def row(name, dist):
+            if not dist:
+                return f"{name:<14}{'-':>9}"
+            return f"{name:<14}" + "".join(f"{dist[k]:>9.1f}" for k in ("p50", "p90", "p99", "max"))
+
+        self.stdout.write(
+            f"layer: {report['layer']}, clients: {report['clients']} "
+            f"(failed {report['connect_failed']}), {report['seconds']:.1f} s"
+        )
+        self.stdout.write(f"{'ms':<14}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}")
+        self.stdout.write(row("connect", report["connect_ms"]))
+        self.stdout.write(row("delivery", report["latency_ms"]))
+        self.stdout.write(
+            f"sent {report['sent']} ({report['sent_per_s']:.0f}/s), "
+            f"delivered {report['delivered']} ({report['delivered_per_s']:.0f}/s), "
+            f"errors {report['errors']}, dropped {report['dropped_connections']}"
+        )
+        if report["delivery_ratio"] is not None:
+            self.stdout.write(f"delivery ratio {report['delivery_ratio']:.3f}")
@@ -0,0 +1,43 @@
+"""
+JWT для WebSocket: клиенты API (rest_framework_simplejwt) не имеют
+сессионной cookie и передают access-токен в строке запроса:
+ws://host/ws/chat/<id>/?token=<access>.
+
+Сессия (AuthMiddlewareStack) проверяется первой; токен — только если
+пользователь по сессии анонимный. Неверный или просроченный токен даёт
+AnonymousUser, и consumer закрывает соединение.
+"""
+
+from urllib.parse import parse_qs
+
+from channels.auth import AuthMiddlewareStack
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from django.contrib.auth.models import AnonymousUser
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+
+@database_sync_to_async
+def get_jwt_user(raw_token: str):
+    auth = JWTAuthentication()
+    try:
+        return auth.get_user(auth.get_validated_token(raw_token))
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return AnonymousUser()
+
+
+class JWTAuthMiddleware(BaseMiddleware):
+    async def __call__(self, scope, receive, send):
+        user = scope.get("user")
+        if user is None or not user.is_authenticated:
+            query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+            token = (query.get("token") or [""])[0]
+            if token:
+                scope = dict(scope, user=await get_jwt_user(token))
+        return await super().__call__(scope, receive, send)
+
+
+def JWTAuthMiddlewareStack(inner):
+    return AuthMiddlewareStack(JWTAuthMiddleware(inner))
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.2 on 2026-10-18
+
+import uuid
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def fill_uids(apps, schema_editor):
+    Message = apps.get_model("chat", "Message")
+    for pk in Message.objects.filter(uid__isnull=True).values_list("pk", flat=True).iterator():
+        Message.objects.filter(pk=pk).update(uid=uuid.uuid4())
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("chat", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="message",
+            name="uid",
+            field=models.UUIDField(editable=False, null=True),
+        ),
+        migrations.RunPython(fill_uids, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="message",
+            name="uid",
+            field=models.UUIDField(default=uuid.uuid4, editable=False, unique=True),
+        ),
+        migrations.AlterField(
+            model_name="message",
+            name="created_at",
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,88 @@
+# Generated by Django 5.1.2 on 2026-10-18
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def create_read_states(apps, schema_editor):
+    """Существующая история считается прочитанной."""
+    Chat = apps.get_model("chat", "Chat")
+    Message = apps.get_model("chat", "Message")
+    ChatReadState = apps.get_model("chat", "ChatReadState")
+    for chat in Chat.objects.iterator():
+        last = Message.objects.filter(chat_id=chat.pk).order_by("-created_at", "-id").only("id", "created_at").first()
+        if last is not None:
+            Chat.objects.filter(pk=chat.pk).update(last_message_at=last.created_at)
+        user_ids = chat.participants.through.objects.filter(chat_id=chat.pk).values_list("user_id", flat=True)
+        ChatReadState.objects.bulk_create(
+            [
+                ChatReadState(
+                    chat_id=chat.pk,
+                    user_id=user_id,
+                    last_read_message_id=last.pk if last else None,
+                    activity_at=last.created_at if last else chat.created_at,
+                )
+                for user_id in user_ids
+            ],
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("chat", "0002_message_uid"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="chat",
+            name="last_message_at",
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.CreateModel(
+            name="ChatReadState",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("unread_count", models.PositiveIntegerField(default=0)),
+                ("activity_at", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "chat",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="read_states",
+                        to="chat.chat",
+                    ),
+                ),
+                (
+                    "last_read_message",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="chat.message",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="chat_read_states",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(fields=("user", "chat"), name="chat_readstate_user_chat"),
+                ],
+                "indexes": [
+                    models.Index(fields=["user", "-activity_at", "-id"], name="chat_readstate_activity"),
+                ],
+            },
+        ),
+        migrations.RunPython(create_read_states, migrations.RunPython.noop),
+    ]
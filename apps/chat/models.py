@@ -1,5 +1,8 @@
+import uuid
+
 from django.conf import settings
 from django.db import models
+from django.utils import timezone
 from apps.core.models import TimeStampedModel
 
 
@@ -27,6 +30,8 @@ class Chat(TimeStampedModel):
         on_delete=models.CASCADE,
         related_name="chats",
     )
+    # Maintained by unread.record() when the write buffer stores messages.
+    last_message_at = models.DateTimeField(null=True, blank=True, db_index=True)
 
     class Meta:
         indexes = [
@@ -38,6 +43,10 @@ class Chat(TimeStampedModel):
 
 
 class Message(TimeStampedModel):
+    # Assigned by ChatConsumer before the row exists (write-behind buffer):
+    # the broadcast carries uid/created_at, and the row is stored with the same values.
+    uid = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
     chat = models.ForeignKey(
         Chat,
         on_delete=models.CASCADE,
@@ -64,6 +73,42 @@ class Message(TimeStampedModel):
         return f"Message #{self.pk} in chat {self.chat_id}"
 
 
+class ChatReadState(models.Model):
+    """
+    Состояние чата для одного участника: непрочитанные и позиция прочтения.
+    Счётчики денормализованы и меняются при записи сообщений (unread.py),
+    поэтому список чатов — один запрос по индексу (user, -activity_at).
+    """
+
+    chat = models.ForeignKey(Chat, on_delete=models.CASCADE, related_name="read_states")
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="chat_read_states",
+    )
+    last_read_message = models.ForeignKey(
+        Message,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="+",
+    )
+    unread_count = models.PositiveIntegerField(default=0)
+    # Chat.last_message_at copied per participant (join time until the first message): the list sort key.
+    activity_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "chat"], name="chat_readstate_user_chat"),
+        ]
+        indexes = [
+            models.Index(fields=["user", "-activity_at", "-id"], name="chat_readstate_activity"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.user_id} in chat {self.chat_id}: {self.unread_count} unread"
+
+
 
 
 
@@ -0,0 +1,269 @@
+"""
+Присутствие и «печатает…» в чатах.
+
+Наивная схема — group_send на каждое подключение и каждое нажатие
+клавиши — растёт как (события × участники). Здесь события только
+отмечают чат «грязным», а хаб процесса (PresenceHub, один на event loop)
+раз в CHAT_PRESENCE_INTERVAL_MS собирает полное состояние чата и
+рассылает один кадр {"type": "presence", ...} на группу. Кадр не
+отправляется, если состояние не изменилось, и не чаще раза за интервал
+на чат даже при нескольких процессах (метка интервала — cache.add).
+
+Состояние — в Redis (сортированные множества со сроком в score):
+- online: элемент "<user_id>:<channel_name>" на каждое подключение; хаб
+  сам продлевает их (heartbeat) раз в треть CHAT_PRESENCE_TTL, так что
+  подключения упавшего процесса истекают без его участия;
+- typing: элемент "<user_id>:<username>", живёт CHAT_TYPING_TTL после
+  последнего {"command": "typing"}, снимается отправкой сообщения.
+
+Без django-redis (dev-настройки) состояние хранится в памяти процесса.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+import weakref
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+ONLINE = "online"
+TYPING = "typing"
+# Frames list at most this many online user ids; online_count is always exact.
+ONLINE_LIMIT = 100
+
+
+def interval() -> float:
+    return max(50, int(getattr(settings, "CHAT_PRESENCE_INTERVAL_MS", 1000))) / 1000
+
+
+def presence_ttl() -> int:
+    return int(getattr(settings, "CHAT_PRESENCE_TTL", 60))
+
+
+def typing_ttl() -> int:
+    return int(getattr(settings, "CHAT_TYPING_TTL", 6))
+
+
+def _key(chat_id: int, kind: str) -> str:
+    return f"chat:presence:{chat_id}:{kind}"
+
+
+class RedisPresenceStore:
+    def _redis(self):
+        from django_redis import get_redis_connection
+
+        return get_redis_connection("default")
+
+    def add(self, chat_id: int, kind: str, members, ttl: int) -> None:
+        expires = time.time() + ttl
+        pipe = self._redis().pipeline(transaction=False)
+        pipe.zadd(_key(chat_id, kind), {m: expires for m in members})
+        # The whole set goes away with the chat's last connection.
+        pipe.expire(_key(chat_id, kind), ttl * 2)
+        pipe.execute()
+
+    def remove(self, chat_id: int, kind: str, member: str) -> None:
+        self._redis().zrem(_key(chat_id, kind), member)
+
+    def snapshot(self, chat_id: int) -> tuple[list, list]:
+        now = time.time()
+        pipe = self._redis().pipeline(transaction=False)
+        for kind in (ONLINE, TYPING):
+            pipe.zremrangebyscore(_key(chat_id, kind), "-inf", now)
+            pipe.zrange(_key(chat_id, kind), 0, -1)
+        _, online, _, typing = pipe.execute()
+        return [m.decode() for m in online], [m.decode() for m in typing]
+
+
+class LocalPresenceStore:
+    def __init__(self):
+        self.sets = defaultdict(dict)
+
+    def add(self, chat_id: int, kind: str, members, ttl: int) -> None:
+        expires = time.time() + ttl
+        for member in members:
+            self.sets[_key(chat_id, kind)][member] = expires
+
+    def remove(self, chat_id: int, kind: str, member: str) -> None:
+        self.sets[_key(chat_id, kind)].pop(member, None)
+
+    def snapshot(self, chat_id: int) -> tuple[list, list]:
+        now = time.time()
+        out = []
+        for kind in (ONLINE, TYPING):
+            members = self.sets[_key(chat_id, kind)]
+            for member in [m for m, expires in members.items() if expires <= now]:
+                del members[member]
+            out.append(list(members))
+        return out[0], out[1]
+
+
+_store = None
+
+
+def store():
+    global _store
+    if _store is None:
+        if "django_redis" in settings.CACHES["default"]["BACKEND"]:
+            _store = RedisPresenceStore()
+        else:
+            _store = LocalPresenceStore()
+    return _store
+
+
+class Busy(Exception):
+    """Кадр этого интервала уже отправлен другим процессом."""
+
+
+def state(chat_id: int) -> dict:
+    """Текущее состояние чата: {"type": "presence", chat, online, online_count, typing}."""
+    online, typing = store().snapshot(chat_id)
+    users = sorted({int(m.split(":", 1)[0]) for m in online})
+    typers = {}
+    for member in typing:
+        user_id, _, username = member.partition(":")
+        typers[int(user_id)] = username
+    return {
+        "type": "presence",
+        "chat": chat_id,
+        "online": users[:ONLINE_LIMIT],
+        "online_count": len(users),
+        "typing": [{"id": pk, "username": typers[pk]} for pk in sorted(typers)],
+    }
+
+
+def frame(chat_id: int) -> dict | None:
+    """
+    Кадр для рассылки группе или None, если состояние не изменилось с
+    прошлого кадра. Busy — в этом интервале кадр уже ушёл (в т. ч. из
+    другого процесса). Синхронная: ходит в Redis.
+    """
+    if not cache.add(f"chat:presence:{chat_id}:tick", 1, interval()):
+        raise Busy
+    data = state(chat_id)
+    digest = hashlib.sha1(json.dumps(data, separators=(",", ":")).encode()).hexdigest()
+    sent_key = f"chat:presence:{chat_id}:sent"
+    if cache.get(sent_key) == digest:
+        return None
+    cache.set(sent_key, digest, presence_ttl())
+    return data
+
+
+class PresenceHub:
+    def __init__(self):
+        # chat_id -> {channel_name: user_id} for connections of this process
+        self.local = defaultdict(dict)
+        # chat_id -> {member: expires_at} for typers seen by this process
+        self.typers = defaultdict(dict)
+        self.dirty = set()
+        self.task = None
+        self.last_beat = 0.0
+
+    # --- events from consumers ---
+
+    async def join(self, chat_id: int, user_id: int, channel: str) -> None:
+        self.local[chat_id][channel] = user_id
+        await self._call(store().add, chat_id, ONLINE, [f"{user_id}:{channel}"], presence_ttl())
+        self._mark(chat_id)
+
+    async def leave(self, chat_id: int, user_id: int, channel: str) -> None:
+        self.local[chat_id].pop(channel, None)
+        if not self.local[chat_id]:
+            del self.local[chat_id]
+        await self._call(store().remove, chat_id, ONLINE, f"{user_id}:{channel}")
+        self._mark(chat_id)
+
+    async def typing(self, chat_id: int, user_id: int, username: str, active: bool = True) -> None:
+        member = f"{user_id}:{username}"
+        now = time.time()
+        expires = self.typers[chat_id].get(member, 0)
+        known = expires > now
+        if active:
+            if expires - now > typing_ttl() / 2:
+                # Clients repeat "typing" every couple of seconds; no need to touch Redis each time.
+                return
+            self.typers[chat_id][member] = now + typing_ttl()
+            await self._call(store().add, chat_id, TYPING, [member], typing_ttl())
+        else:
+            self.typers[chat_id].pop(member, None)
+            if not known:
+                return
+            await self._call(store().remove, chat_id, TYPING, member)
+        # Repeated keystrokes only extend the TTL: nothing visible changed.
+        if active != known:
+            self._mark(chat_id)
+
+    async def current(self, chat_id: int) -> dict | None:
+        return await self._call(state, chat_id)
+
+    # --- ticker ---
+
+    def _mark(self, chat_id: int) -> None:
+        self.dirty.add(chat_id)
+        if self.task is None or self.task.done():
+            self.task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _call(self, func, *args):
+        try:
+            return await sync_to_async(func, thread_sensitive=False)(*args)
+        except Exception:
+            # Presence is cosmetic: a Redis hiccup must not break the chat.
+            logger.warning("chat presence store failed", exc_info=True)
+
+    async def _run(self) -> None:
+        while self.local or self.dirty:
+            await asyncio.sleep(interval())
+            now = time.time()
+            if now - self.last_beat >= presence_ttl() / 3:
+                self.last_beat = now
+                await self._beat()
+            for chat_id, members in list(self.typers.items()):
+                expired = [m for m, expires in members.items() if expires <= now]
+                for member in expired:
+                    del members[member]
+                if expired:
+                    self.dirty.add(chat_id)
+                if not members:
+                    del self.typers[chat_id]
+            dirty, self.dirty = self.dirty, set()
+            for chat_id in dirty:
+                await self._send(chat_id)
+
+    async def _beat(self) -> None:
+        """Продлевает свои подключения; заодно пересылает кадры — вдруг истекли чужие."""
+        for chat_id, channels in list(self.local.items()):
+            members = [f"{user_id}:{channel}" for channel, user_id in channels.items()]
+            await self._call(store().add, chat_id, ONLINE, members, presence_ttl())
+            self.dirty.add(chat_id)
+
+    async def _send(self, chat_id: int) -> None:
+        try:
+            data = await sync_to_async(frame, thread_sensitive=False)(chat_id)
+        except Busy:
+            self.dirty.add(chat_id)
+            return
+        except Exception:
+            logger.warning("chat presence frame failed for chat %s", chat_id, exc_info=True)
+            return
+        if data is not None:
+            await get_channel_layer().group_send(f"chat_{chat_id}", {"type": "chat.presence", "presence": data})
+
+
+_hubs = weakref.WeakKeyDictionary()
+
+
+def get_hub() -> PresenceHub:
+    """Хаб текущего event loop (как buffer.get_buffer)."""
+    loop = asyncio.get_running_loop()
+    hub = _hubs.get(loop)
+    if hub is None:
+        hub = _hubs[loop] = PresenceHub()
+    return hub
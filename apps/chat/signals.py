@@ -0,0 +1,63 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from apps.communities.models import CommunityMembership
+
+from . import access
+from .models import Chat, ChatReadState
+
+
+def _pairs(instance, reverse, pk_set) -> list[tuple[int, int]]:
+    """(chat_id, user_id) для изменения с любой стороны связи."""
+    if reverse:
+        return [(pk, instance.pk) for pk in pk_set]
+    return [(instance.pk, pk) for pk in pk_set]
+
+
+@receiver(m2m_changed, sender=Chat.participants.through)
+def participants_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """ChatReadState есть у каждого участника: на нём держатся список чатов и счётчики."""
+    if action == "pre_clear":
+        # post_clear has no pk_set: remember who is being removed.
+        through = Chat.participants.through.objects
+        rows = through.filter(user_id=instance.pk) if reverse else through.filter(chat_id=instance.pk)
+        instance._cleared_chat_pairs = list(rows.values_list("chat_id", "user_id"))
+        return
+
+    if action == "post_add":
+        pairs = _pairs(instance, reverse, pk_set)
+        chats = Chat.objects.in_bulk([chat_id for chat_id, _ in pairs])
+        now = timezone.now()
+        ChatReadState.objects.bulk_create(
+            [
+                ChatReadState(chat_id=chat_id, user_id=user_id, activity_at=chats[chat_id].last_message_at or now)
+                for chat_id, user_id in pairs
+                if chat_id in chats
+            ],
+            ignore_conflicts=True,
+        )
+    elif action == "post_remove":
+        pairs = _pairs(instance, reverse, pk_set)
+        key = "chat_id__in" if reverse else "user_id__in"
+        owner = "user_id" if reverse else "chat_id"
+        ChatReadState.objects.filter(**{owner: instance.pk, key: pk_set}).delete()
+    elif action == "post_clear":
+        pairs = getattr(instance, "_cleared_chat_pairs", [])
+        ChatReadState.objects.filter(**{"user_id" if reverse else "chat_id": instance.pk}).delete()
+    else:
+        return
+    transaction.on_commit(lambda: access.invalidate(pairs))
+
+
+@receiver(post_save, sender=CommunityMembership)
+@receiver(post_delete, sender=CommunityMembership)
+def membership_changed(sender, instance, raw=False, **kwargs):
+    """Бан, разбан, вступление и выход меняют доступ ко всем чатам сообщества."""
+    if raw:
+        return
+    user_id = instance.user_id
+    chat_ids = list(Chat.objects.filter(community_id=instance.community_id).values_list("pk", flat=True))
+    if chat_ids:
+        transaction.on_commit(lambda: access.invalidate((chat_id, user_id) for chat_id in chat_ids))
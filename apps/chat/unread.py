@@ -0,0 +1,134 @@
+"""
+Непрочитанные сообщения и порядок списка чатов.
+
+Ничего не считается на лету: при записи пачки сообщений (buffer.py)
+record() в той же транзакции сдвигает Chat.last_message_at и для каждого
+участника — unread_count и activity_at в ChatReadState. Список чатов —
+один запрос по индексу (user, -activity_at) без подзапросов по сообщениям.
+
+После записи notify() рассылает новые счётчики в личные группы
+участников (user_group), их слушают ChatConsumer и InboxConsumer.
+"""
+
+import logging
+from collections import Counter, defaultdict
+
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Chat, ChatReadState, Message
+
+logger = logging.getLogger(__name__)
+
+
+def user_group(user_id: int) -> str:
+    return f"chat_user_{user_id}"
+
+
+def chat_list(user):
+    """Чаты пользователя (ChatReadState с .chat), свежие сверху."""
+    return ChatReadState.objects.filter(user=user).select_related("chat").order_by("-activity_at", "-id")
+
+
+def ensure_state(chat_id: int, user_id: int) -> None:
+    """
+    ChatReadState для того, кто получил доступ не через Chat.participants
+    (участник сообщества в чате сообщества): без него record() не считает
+    ему непрочитанные, а mark_read() не находит позицию. Отсчёт — с текущего
+    момента: история до первого входа непрочитанной не считается.
+    """
+    chat = Chat.objects.filter(pk=chat_id).values("last_message_at").first()
+    if chat is None:
+        return
+    last = Message.objects.filter(chat_id=chat_id).order_by("-created_at", "-id").only("id").first()
+    ChatReadState.objects.bulk_create(
+        [
+            ChatReadState(
+                chat_id=chat_id,
+                user_id=user_id,
+                last_read_message=last,
+                activity_at=chat["last_message_at"] or timezone.now(),
+            )
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def record(messages) -> None:
+    """Учитывает только что записанные сообщения; вызывается в транзакции записи."""
+    by_chat = defaultdict(list)
+    for message in messages:
+        by_chat[message.chat_id].append(message)
+
+    for chat_id, batch in by_chat.items():
+        last_at = max(m.created_at for m in batch)
+        Chat.objects.filter(pk=chat_id).filter(
+            Q(last_message_at__isnull=True) | Q(last_message_at__lt=last_at)
+        ).update(last_message_at=last_at)
+
+        # Own messages are not unread for their author.
+        own = Counter(m.author_id for m in batch)
+        states = ChatReadState.objects.filter(chat_id=chat_id)
+        states.exclude(user_id__in=own).update(unread_count=F("unread_count") + len(batch), activity_at=last_at)
+        for author_id, count in own.items():
+            states.filter(user_id=author_id).update(
+                unread_count=F("unread_count") + (len(batch) - count), activity_at=last_at
+            )
+
+
+def mark_read(chat_id: int, user_id: int, uid) -> int | None:
+    """
+    Отмечает прочитанным всё до сообщения uid включительно. Позиция только
+    двигается вперёд. Возвращает новый unread_count или None, если нет
+    такого сообщения или участника.
+    """
+    message = Message.objects.filter(chat_id=chat_id, uid=uid).only("id", "created_at").first()
+    if message is None:
+        return None
+    with transaction.atomic():
+        # Lock first: a concurrent record() then either is already visible to the count or waits for us.
+        state = (
+            ChatReadState.objects.select_for_update()
+            .select_related("last_read_message")
+            .filter(chat_id=chat_id, user_id=user_id)
+            .first()
+        )
+        if state is None:
+            return None
+        current = state.last_read_message
+        if current is not None and (current.created_at, current.pk) >= (message.created_at, message.pk):
+            return state.unread_count
+        unread = (
+            Message.objects.filter(chat_id=chat_id)
+            .filter(Q(created_at__gt=message.created_at) | Q(created_at=message.created_at, id__gt=message.pk))
+            .exclude(author_id=user_id)
+            .count()
+        )
+        ChatReadState.objects.filter(pk=state.pk).update(last_read_message=message, unread_count=unread)
+    return unread
+
+
+def badge(chat_id: int, unread: int, activity_at=None) -> dict:
+    event = {"type": "chat.unread", "chat": chat_id, "unread": unread}
+    if activity_at is not None:
+        event["last_message_at"] = activity_at.isoformat()
+    return event
+
+
+async def send_badge(user_id: int, event: dict) -> None:
+    await get_channel_layer().group_send(user_group(user_id), event)
+
+
+async def notify(chat_id: int) -> None:
+    """Новые счётчики чата — каждому участнику (одно событие на пачку, а не на сообщение)."""
+    rows = await database_sync_to_async(list)(
+        ChatReadState.objects.filter(chat_id=chat_id).values_list("user_id", "unread_count", "activity_at")
+    )
+    for user_id, unread, activity_at in rows:
+        try:
+            await send_badge(user_id, badge(chat_id, unread, activity_at))
+        except Exception:
+            logger.warning("cannot push unread badge to user %s", user_id, exc_info=True)
@@ -6,6 +6,7 @@ app_name = "chat"
 urlpatterns = [
     path("", views.ChatListView.as_view(), name="chat_list"),
     path("<int:pk>/", views.ChatDetailView.as_view(), name="chat_detail"),
+    path("<int:pk>/history/", views.ChatHistoryView.as_view(), name="chat_history"),
 ]
 
 
@@ -1,22 +1,57 @@
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import Http404, JsonResponse
+from django.views import View
 from django.views.generic import ListView, DetailView
+
+from apps.core.pagination import InvalidCursor
+
+from . import access, history, unread
 from .models import Chat
 
 
 class ChatListView(LoginRequiredMixin, ListView):
-    model = Chat
+    """Чаты пользователя по последней активности; object_list — ChatReadState (unread.chat_list)."""
+
     template_name = "chat/chat_list.html"
+    context_object_name = "chat_states"
 
     def get_queryset(self):
-        return Chat.objects.filter(participants=self.request.user)
+        return unread.chat_list(self.request.user)
 
 
 class ChatDetailView(LoginRequiredMixin, DetailView):
     model = Chat
     template_name = "chat/chat_detail.html"
 
-    def get_queryset(self):
-        return Chat.objects.filter(participants=self.request.user)
+    def get_object(self, queryset=None):
+        # Same rule as ChatConsumer and ChatHistoryView: participants, or community members without a ban.
+        chat = super().get_object(queryset)
+        if not access.allowed(chat.pk, self.request.user.pk):
+            raise Http404
+        unread.ensure_state(chat.pk, self.request.user.pk)
+        return chat
+
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        ctx["chat_states"] = unread.chat_list(self.request.user)
+        return ctx
+
+
+class ChatHistoryView(LoginRequiredMixin, View):
+    """
+    История чата от новых к старым: GET ?before=<курсор>.
+    Returns JSON: {ok, messages: [{id, author, text, created_at}], authors: {id: username}, older}
+    Последняя страница (без before) отдаётся из кэша, логика — в history.py.
+    """
+
+    def get(self, request, pk):
+        if not access.allowed(pk, request.user.pk):
+            return JsonResponse({"ok": False, "error": "not_found"}, status=404)
+        try:
+            data = history.page(pk, request.GET.get("before") or None)
+        except InvalidCursor:
+            return JsonResponse({"ok": False, "error": "bad_cursor"}, status=400)
+        return JsonResponse({"ok": True, **data})
 
 
 
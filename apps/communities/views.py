@@ -1,21 +1,19 @@
 from django.contrib.auth.mixins import LoginRequiredMixin
-<<<<<<< HEAD
 from django.views.generic import ListView, DetailView, View
 from django.db.models import Count
 from django.shortcuts import redirect
-=======
-from django.views.generic import ListView, DetailView
->>>>>>> c3b89d27ec563af11f9e50443796471accc02753
+
+from apps.core.pagination import CursorPaginationMixin
+
 from .models import Community
 
 
-class CommunityListView(LoginRequiredMixin, ListView):
+class CommunityListView(LoginRequiredMixin, CursorPaginationMixin, ListView):
     model = Community
     template_name = "communities/community_list.html"
     paginate_by = 20
 
     def get_queryset(self):
-<<<<<<< HEAD
         qs = (
             Community.objects.filter(visibility=Community.Visibility.PUBLIC)
             .annotate(members_count=Count("members", distinct=True))
@@ -32,9 +30,6 @@ class CommunityListView(LoginRequiredMixin, ListView):
         ctx["sidebar_top"] = list(self.get_queryset()[:20])
         ctx["sidebar_mine"] = list(self.request.user.communities.all().order_by("name")[:20])
         return ctx
-=======
-        return Community.objects.filter(visibility=Community.Visibility.PUBLIC)
->>>>>>> c3b89d27ec563af11f9e50443796471accc02753
 
 
 class CommunityDetailView(LoginRequiredMixin, DetailView):
@@ -43,7 +38,6 @@ class CommunityDetailView(LoginRequiredMixin, DetailView):
     slug_field = "slug"
     slug_url_kwarg = "slug"
 
-<<<<<<< HEAD
     def get_queryset(self):
         return (
             Community.objects.select_related("owner")
@@ -79,13 +73,3 @@ class CommunityJoinToggleView(LoginRequiredMixin, View):
             community.members.add(request.user)
 
         return redirect("communities:community_detail", slug=slug)
-
-=======
->>>>>>> c3b89d27ec563af11f9e50443796471accc02753
-
-
-
-
-
-
-
@@ -0,0 +1,107 @@
+from datetime import timedelta
+
+from django.core.files.storage import FileSystemStorage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.core.models import StoredBlob
+from apps.core.storage import CAS_PREFIX, TRACKED_FIELDS, content_storage
+
+
+class Command(BaseCommand):
+    help = (
+        "Переносит загрузки, сделанные до контентно-адресуемого хранилища, в cas/: "
+        "одинаковые файлы остаются в одном экземпляре. Затем сверяет refcount "
+        "с настоящими ссылками и удаляет файлы, на которые никто не ссылается."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=200)
+        parser.add_argument(
+            "--grace-minutes",
+            type=int,
+            default=60,
+            help="Не трогать refcount файлов моложе этого: их строки могут ещё сохраняться.",
+        )
+
+    def handle(self, *args, **options):
+        storage = content_storage()
+        batch_size = max(1, options["batch_size"])
+        blobs_before = StoredBlob.objects.count()
+        moved = missing = 0
+
+        for model, field_name in TRACKED_FIELDS:
+            label = f"{model._meta.label}.{field_name}"
+            qs = (
+                model.objects.exclude(**{f"{field_name}__startswith": CAS_PREFIX})
+                .exclude(Q(**{f"{field_name}__isnull": True}) | Q(**{field_name: ""}))
+                .order_by("pk")
+            )
+            last_pk = 0
+            while True:
+                rows = list(qs.filter(pk__gt=last_pk).values_list("pk", field_name)[:batch_size])
+                if not rows:
+                    break
+                for pk, old in rows:
+                    if not storage.exists(old):
+                        missing += 1
+                        continue
+                    with storage.open(old, "rb") as fh:
+                        new = storage.save(old, fh)
+                    # update(), not save(): the row keeps its other fields and no signals fire.
+                    if model.objects.filter(pk=pk, **{field_name: old}).update(**{field_name: new}):
+                        moved += 1
+                        if not self._still_referenced(old):
+                            FileSystemStorage.delete(storage, old)
+                    else:
+                        storage.release(new)
+                last_pk = rows[-1][0]
+                self.stdout.write(f"{label}: {moved}")
+
+        created = StoredBlob.objects.count() - blobs_before
+        self.stdout.write(
+            self.style.SUCCESS(f"Перенесено файлов: {moved}, уникальных: {created}, не найдено на диске: {missing}")
+        )
+
+        fixed, removed = self._repair_refcounts(storage, timedelta(minutes=max(0, options["grace_minutes"])), batch_size)
+        self.stdout.write(self.style.SUCCESS(f"Исправлено счётчиков: {fixed}, удалено файлов без ссылок: {removed}"))
+
+    def _still_referenced(self, name: str) -> bool:
+        return any(model.objects.filter(**{field_name: name}).exists() for model, field_name in TRACKED_FIELDS)
+
+    def _references(self, name: str) -> int:
+        return sum(model.objects.filter(**{field_name: name}).count() for model, field_name in TRACKED_FIELDS)
+
+    def _repair_refcounts(self, storage, grace, batch_size: int) -> tuple[int, int]:
+        """refcount = число строк с этим именем (завышенный остаётся после сбоя между _save и save())."""
+        cutoff = timezone.now() - grace
+        fixed = removed = 0
+        last_pk = 0
+        while True:
+            ids = list(
+                StoredBlob.objects.filter(pk__gt=last_pk, updated_at__lt=cutoff)
+                .order_by("pk")
+                .values_list("pk", flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            last_pk = ids[-1]
+            for pk in ids:
+                with transaction.atomic():
+                    # Same row lock as _save/retain/release: no new reference can appear meanwhile.
+                    blob = StoredBlob.objects.select_for_update().filter(pk=pk).first()
+                    if blob is None:
+                        continue
+                    refs = self._references(blob.name)
+                    if refs == blob.refcount:
+                        continue
+                    fixed += 1
+                    if refs:
+                        StoredBlob.objects.filter(pk=pk).update(refcount=refs)
+                        continue
+                    blob.delete()
+                    FileSystemStorage.delete(storage, blob.name)
+                    removed += 1
+        return fixed, removed
@@ -42,9 +42,12 @@ class Comment(TimeStampedModel):
         return f"Comment by {self.user}"
 
 
+class StoredBlob(TimeStampedModel):
+    """Файл в контентно-адресуемом хранилище (apps/core/storage.py) и число ссылок на него."""
 
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField(default=0)
+    refcount = models.PositiveIntegerField(default=0)
 
-
-
-
-
+    def __str__(self) -> str:
+        return f"{self.name} ({self.refcount})"
@@ -0,0 +1,214 @@
+"""
+Курсорная (keyset) пагинация для длинных лент.
+
+Вместо OFFSET/COUNT страница выбирается условием по ключу сортировки
+крайней показанной строки: (a, b, id) > (x, y, z). Стоимость запроса не
+зависит от глубины листания, а новые строки не сдвигают уже открытую ленту.
+
+Курсор — base64url от JSON с значениями ключа, направлением и номером
+строки; для клиента он непрозрачен. Сортировка должна быть уникальной
+(заканчиваться на id) и не содержать NULL в полях ключа.
+"""
+
+import base64
+import binascii
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured, ValidationError
+from django.core.paginator import InvalidPage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import Http404, JsonResponse
+from django.template.loader import render_to_string
+from django.utils.cache import patch_vary_headers
+
+NEXT = "n"
+PREVIOUS = "p"
+
+
+class InvalidCursor(InvalidPage):
+    pass
+
+
+class CursorPage:
+    """Страница в интерфейсе, близком к django.core.paginator.Page, но без номера и числа страниц."""
+
+    def __init__(self, object_list, paginator, *, has_next, has_previous, start_index):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self._start_index = start_index
+        self.next_cursor = None
+        self.previous_cursor = None
+        if has_next:
+            self.next_cursor = paginator.encode_cursor(object_list[-1], NEXT, start_index + len(object_list))
+        if has_previous:
+            self.previous_cursor = paginator.encode_cursor(object_list[0], PREVIOUS, start_index)
+
+    def __repr__(self):
+        return f"<CursorPage of {len(self.object_list)} objects>"
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    def start_index(self):
+        """1-based номер первой строки страницы (как у Page), считается без COUNT."""
+        return self._start_index + 1 if self.object_list else 0
+
+
+class CursorPaginator:
+    def __init__(self, queryset, per_page, ordering=None):
+        ordering = list(ordering or queryset.query.order_by or queryset.model._meta.ordering)
+        if not ordering or not all(isinstance(o, str) for o in ordering):
+            raise ImproperlyConfigured("CursorPaginator needs a string ordering ending with a unique field.")
+        self.queryset = queryset.order_by(*ordering)
+        self.per_page = int(per_page)
+        self.ordering = ordering
+        self.keys = [(o.lstrip("-"), o.startswith("-")) for o in ordering]
+
+    def _field(self, name):
+        try:
+            return self.queryset.model._meta.get_field("id" if name == "pk" else name)
+        except FieldDoesNotExist:
+            # Аннотация (search_rank, members_count): значение из JSON как есть.
+            return None
+
+    def encode_cursor(self, obj, direction: str, index: int) -> str:
+        values = [getattr(obj, name) for name, _ in self.keys]
+        raw = json.dumps({"v": values, "d": direction, "i": index}, cls=DjangoJSONEncoder, separators=(",", ":"))
+        return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+    def decode_cursor(self, token: str):
+        try:
+            raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+            data = json.loads(raw)
+            values, direction, index = data["v"], data["d"], int(data["i"])
+        except (binascii.Error, ValueError, TypeError, KeyError):
+            raise InvalidCursor("Invalid cursor")
+        if direction not in (NEXT, PREVIOUS) or not isinstance(values, list) or len(values) != len(self.keys):
+            raise InvalidCursor("Invalid cursor")
+        decoded = []
+        for (name, _), value in zip(self.keys, values):
+            field = self._field(name)
+            try:
+                decoded.append(field.to_python(value) if field is not None else value)
+            except ValidationError:
+                raise InvalidCursor("Invalid cursor")
+        return decoded, direction, index
+
+    def _after(self, values, backwards: bool) -> Q:
+        """(k1, k2, ...) строго после values в порядке сортировки (или до — при backwards)."""
+        cond = Q()
+        equal = {}
+        for (name, desc), value in zip(self.keys, values):
+            op = "lt" if desc != backwards else "gt"
+            cond |= Q(**equal, **{f"{name}__{op}": value})
+            equal[name] = value
+        return cond
+
+    def page(self, cursor=None) -> CursorPage:
+        if not cursor:
+            rows = list(self.queryset[: self.per_page + 1])
+            return CursorPage(
+                rows[: self.per_page], self, has_next=len(rows) > self.per_page, has_previous=False, start_index=0
+            )
+
+        values, direction, index = self.decode_cursor(cursor)
+        if direction == NEXT:
+            rows = list(self.queryset.filter(self._after(values, backwards=False))[: self.per_page + 1])
+            return CursorPage(
+                rows[: self.per_page], self, has_next=len(rows) > self.per_page, has_previous=True, start_index=index
+            )
+
+        reverse = [o[1:] if o.startswith("-") else "-" + o for o in self.ordering]
+        qs = self.queryset.filter(self._after(values, backwards=True)).order_by(*reverse)
+        rows = list(qs[: self.per_page + 1])
+        if not rows:
+            # Всё, что было выше, удалили — начинаем с начала.
+            return self.page()
+        has_previous = len(rows) > self.per_page
+        rows = rows[: self.per_page][::-1]
+        return CursorPage(
+            rows, self, has_next=True, has_previous=has_previous, start_index=max(0, index - len(rows))
+        )
+
+
+def cursor_url(request, cursor, param: str = "cursor") -> str | None:
+    """Текущий URL с подставленным курсором (фильтры и сортировка сохраняются)."""
+    if not cursor:
+        return None
+    params = request.GET.copy()
+    params[param] = cursor
+    params.pop("page", None)
+    return f"{request.path}?{params.urlencode()}"
+
+
+def wants_json(request) -> bool:
+    return "application/json" in request.headers.get("Accept", "")
+
+
+def page_json_response(request, page, template_name: str, context: dict, param: str = "cursor"):
+    """Ответ для бесконечной прокрутки: HTML карточек и ссылка на следующую страницу."""
+    html = render_to_string(template_name, {**context, "page_obj": page}, request=request)
+    response = JsonResponse({"ok": True, "html": html, "next": cursor_url(request, page.next_cursor, param)})
+    patch_vary_headers(response, ["Accept"])
+    return response
+
+
+class CursorPaginationMixin:
+    """
+    Для ListView: paginate_by строк по курсору из ?cursor= вместо ?page=.
+    Сортировка берётся из order_by queryset'а (или cursor_ordering).
+
+    Если задан cursor_items_template и клиент просит JSON, отдаётся только
+    следующая порция карточек (см. page_json_response).
+    """
+
+    cursor_param = "cursor"
+    cursor_ordering = None
+    cursor_items_template = None
+
+    def get_cursor_ordering(self, queryset):
+        return self.cursor_ordering
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = CursorPaginator(queryset, page_size, ordering=self.get_cursor_ordering(queryset))
+        try:
+            page = paginator.page(self.request.GET.get(self.cursor_param))
+        except InvalidCursor:
+            raise Http404("Invalid cursor")
+        return paginator, page, page.object_list, page.has_other_pages()
+
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        page = ctx.get("page_obj")
+        if page is not None:
+            ctx["next_page_url"] = cursor_url(self.request, page.next_cursor, self.cursor_param)
+            ctx["previous_page_url"] = cursor_url(self.request, page.previous_cursor, self.cursor_param)
+        return ctx
+
+    def render_to_response(self, context, **response_kwargs):
+        if self.cursor_items_template and wants_json(self.request) and context.get("page_obj") is not None:
+            return page_json_response(
+                self.request, context["page_obj"], self.cursor_items_template, context, self.cursor_param
+            )
+        response = super().render_to_response(context, **response_kwargs)
+        if self.cursor_items_template:
+            patch_vary_headers(response, ["Accept"])
+        return response
@@ -0,0 +1,160 @@
+"""
+Контентно-адресуемое хранилище загрузок.
+
+Файл хэшируется (SHA-256) по мере записи и сохраняется под именем
+cas/ab/cd/<sha256><ext>, поэтому одинаковые картинки (одна и та же
+обложка из OpenLibrary для каждого экземпляра книги, повторно
+загруженный аватар) лежат на диске один раз.
+
+Сколько полей ссылается на файл, хранит StoredBlob.refcount:
++1 при каждой загрузке (_save) или повторном использовании имени (retain),
+-1 при удалении строки или замене файла (сигналы из track_file_field).
+Файл удаляется, когда ссылок не осталось.
+
++1 в _save фиксируется сразу, до сохранения строки: отложить его до
+коммита нельзя — параллельный release() успел бы удалить файл. Если
+строка потом не сохранится (ошибка вне внешней транзакции), счётчик
+останется завышенным и файл не удалится; `dedupe_media` пересчитывает
+refcount по ссылкам и убирает такие файлы.
+
+Файлы, загруженные до перехода (имена без "cas/"), не трогаются; их
+переносит команда `dedupe_media`.
+"""
+
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_init, post_save
+
+from .models import StoredBlob
+
+CAS_PREFIX = "cas/"
+CHUNK_SIZE = 64 * 1024
+
+# (model, field_name) registered via track_file_field(); used by dedupe_media.
+TRACKED_FIELDS = []
+
+
+def is_content_addressed(name) -> bool:
+    return bool(name) and str(name).startswith(CAS_PREFIX)
+
+
+def blob_name(digest: str, ext: str) -> str:
+    return f"{CAS_PREFIX}{digest[:2]}/{digest[2:4]}/{digest}{ext}"
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def get_available_name(self, name, max_length=None):
+        # Имя всё равно заменяется хэшем в _save, а одинаковое содержимое — это тот же файл.
+        return name
+
+    def _save(self, name, content):
+        ext = os.path.splitext(name)[1].lower()[:10]
+        tmp_dir = self.path(CAS_PREFIX + "tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        try:
+            digest = hashlib.sha256()
+            size = 0
+            with os.fdopen(fd, "wb") as out:
+                for chunk in content.chunks(CHUNK_SIZE):
+                    digest.update(chunk)
+                    out.write(chunk)
+                    size += len(chunk)
+
+            final = blob_name(digest.hexdigest(), ext)
+            full_path = self.path(final)
+            # Row lock serialises with release(): the file can't be removed between the check and +1.
+            with transaction.atomic():
+                blob, _ = StoredBlob.objects.select_for_update().get_or_create(
+                    name=final, defaults={"size": size, "refcount": 0}
+                )
+                if not os.path.exists(full_path):
+                    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                    os.replace(tmp_path, full_path)
+                    if self.file_permissions_mode is not None:
+                        os.chmod(full_path, self.file_permissions_mode)
+                StoredBlob.objects.filter(pk=blob.pk).update(refcount=F("refcount") + 1)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+        return final
+
+    def retain(self, name) -> bool:
+        """
+        +1 ссылка на уже сохранённый файл (вторая строка с тем же именем,
+        без повторной записи). False — файла больше нет. Вызывать в той же
+        транзакции, что и сохранение строки.
+        """
+        if not is_content_addressed(name):
+            return False
+        with transaction.atomic():
+            blob = StoredBlob.objects.select_for_update().filter(name=name).first()
+            if blob is None or not self.exists(name):
+                return False
+            StoredBlob.objects.filter(pk=blob.pk).update(refcount=F("refcount") + 1)
+        return True
+
+    def release(self, name) -> None:
+        """Снимает одну ссылку; последний — удаляет файл."""
+        if not is_content_addressed(name):
+            return
+        with transaction.atomic():
+            blob = StoredBlob.objects.select_for_update().filter(name=name).first()
+            if blob is None:
+                return
+            if blob.refcount > 1:
+                StoredBlob.objects.filter(pk=blob.pk).update(refcount=F("refcount") - 1)
+                return
+            blob.delete()
+            super().delete(name)
+
+    def delete(self, name):
+        if is_content_addressed(name):
+            self.release(name)
+        else:
+            super().delete(name)
+
+
+_storage = ContentAddressedStorage()
+
+
+def content_storage():
+    """Callable для FileField(storage=...): миграции хранят ссылку, а не объект."""
+    return _storage
+
+
+def track_file_field(model, field_name: str) -> None:
+    """Подключает подсчёт ссылок для FileField модели (удаление строки, замена файла)."""
+    uid = f"cas:{model._meta.label}.{field_name}"
+    if (model, field_name) not in TRACKED_FIELDS:
+        TRACKED_FIELDS.append((model, field_name))
+
+    def current_name(instance):
+        # __dict__, not getattr(): a deferred field must not cost a query here.
+        value = instance.__dict__.get(field_name)
+        return getattr(value, "name", value) or None
+
+    def remember(sender, instance, **kwargs):
+        instance.__dict__.setdefault("_cas_loaded", {})[field_name] = current_name(instance)
+
+    def replaced(sender, instance, created=False, raw=False, **kwargs):
+        loaded = instance.__dict__.setdefault("_cas_loaded", {})
+        old, new = loaded.get(field_name), current_name(instance)
+        loaded[field_name] = new
+        if raw or created or not old or old == new:
+            return
+        transaction.on_commit(lambda: _storage.release(old))
+
+    def deleted(sender, instance, **kwargs):
+        name = current_name(instance) or instance.__dict__.get("_cas_loaded", {}).get(field_name)
+        if name:
+            transaction.on_commit(lambda: _storage.release(name))
+
+    post_init.connect(remember, sender=model, weak=False, dispatch_uid=uid)
+    post_save.connect(replaced, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(deleted, sender=model, weak=False, dispatch_uid=uid)
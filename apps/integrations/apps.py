@@ -5,6 +5,11 @@ class IntegrationsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.integrations"
 
+    def ready(self):
+        from .metadata import registry
+
+        registry.load()
+
 
 
 
@@ -17,6 +17,42 @@ class BaseEmailAdapter(ABC):
         raise NotImplementedError
 
 
+class BaseMetadataProvider(ABC):
+    """
+    Источник метаданных книги/товара по штрихкоду (см. metadata.py).
+
+    fetch() возвращает список кандидатов
+    {"title", "description", "authors", "cover_url", "language", "match", "source"},
+    пустой список, если ничего не нашлось, и None при сбое источника.
+    """
+
+    name: str = ""
+    # Lower goes first when merging answers.
+    priority: int = 100
+    # Seconds per HTTP request and for the whole fetch() (several requests).
+    timeout: float = 6
+    budget: float = 8
+    # Consecutive failures that open the circuit, and how long it stays open.
+    breaker_failures: int = 5
+    breaker_reset: float = 30
+    # Key of LIBRARY_BARCODE_CACHE_TTL; defaults to name.
+    cache_source: str = ""
+    # Add results to the "candidates" list shown to the user.
+    exposes_candidates: bool = True
+    # Pick the best candidate by language/cover/title instead of the first one.
+    rank_candidates: bool = False
+
+    def applies(self, ids: dict) -> bool:
+        return bool(ids.get("isbn"))
+
+    def cache_key(self, ids: dict) -> str:
+        return ids["key"]
+
+    @abstractmethod
+    def fetch(self, ids: dict, budget) -> list | None:
+        raise NotImplementedError
+
+
 
 
 
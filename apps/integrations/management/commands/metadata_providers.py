@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from apps.integrations import metadata
+
+
+def _fmt(value, pattern="{:.0f}"):
+    if value is None:
+        return "-"
+    if value == float("inf"):
+        return "inf"
+    return pattern.format(value)
+
+
+class Command(BaseCommand):
+    help = "Источники метаданных по штрихкоду: вызовы, доля попаданий, задержки (по всем процессам)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--histogram", action="store_true", help="Показать корзины задержек.")
+        parser.add_argument("--reset", action="store_true", help="Обнулить счётчики.")
+
+    def handle(self, *args, **options):
+        providers = metadata.registry.all()
+        if options["reset"]:
+            for provider in providers:
+                metadata.reset_stats(provider.name)
+            self.stdout.write(self.style.SUCCESS("Счётчики обнулены."))
+            return
+
+        self.stdout.write(
+            f"{'provider':<18}{'calls':>8}{'hit':>8}{'miss':>8}{'error':>8}{'open':>8}"
+            f"{'hit%':>7}{'avg ms':>8}{'p50':>7}{'p95':>7}"
+        )
+        for provider in providers:
+            s = metadata.stats(provider.name)
+            hit_rate = s["hit_rate"] * 100 if s["hit_rate"] is not None else None
+            self.stdout.write(
+                f"{provider.name:<18}{s['calls']:>8}{s['hit']:>8}{s['miss']:>8}{s['error']:>8}{s['open']:>8}"
+                f"{_fmt(hit_rate):>7}{_fmt(s['avg_ms']):>8}{_fmt(s['p50_ms']):>7}{_fmt(s['p95_ms']):>7}"
+            )
+            if options["histogram"]:
+                buckets = [f"<={b}:{s[f'le_{b}']}" for b in metadata.LATENCY_BUCKETS] + [f">:{s['le_inf']}"]
+                self.stdout.write("    " + "  ".join(buckets))
@@ -0,0 +1,282 @@
+"""
+Реестр источников метаданных по штрихкоду/ISBN (OpenLibrary, Wikidata,
+Google Books, заглушки для нагрузочных тестов).
+
+Каждый вызов источника идёт через registry.call():
+
+- бюджет времени: каждый HTTP-запрос не дольше provider.timeout, а весь
+  fetch() — не дольше provider.budget;
+- circuit breaker: после breaker_failures сбоев подряд источник
+  пропускается breaker_reset секунд, затем пробуется один запрос;
+- метрики: исходы (hit/miss/error/open) и гистограмма задержек на
+  источник, в кэше default — общие для всех процессов
+  (`manage.py metadata_providers`).
+
+Состав источников — INTEGRATIONS_METADATA_PROVIDERS (пути к классам или
+(путь, kwargs)), отключить медленный — INTEGRATIONS_METADATA_DISABLED.
+"""
+
+import json
+import logging
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROVIDERS = [
+    "apps.integrations.providers.OpenLibraryProvider",
+    "apps.integrations.providers.WikidataIsbnProvider",
+    "apps.integrations.providers.GoogleBooksProvider",
+    "apps.integrations.providers.WikidataBarcodeProvider",
+]
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is "+inf".
+LATENCY_BUCKETS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)
+OUTCOMES = ("hit", "miss", "error", "open")
+STATS_VERSION = 1
+
+
+class Budget:
+    """Оставшееся время на fetch() одного источника."""
+
+    def __init__(self, seconds: float, request_timeout: float):
+        self.deadline = time.monotonic() + seconds
+        self.request_timeout = request_timeout
+
+    def remaining(self) -> float:
+        return max(0.0, self.deadline - time.monotonic())
+
+    @property
+    def exhausted(self) -> bool:
+        return self.remaining() <= 0
+
+    def get_json(self, url: str):
+        """JSON ответа или None при любой ошибке (сеть, таймаут, не-JSON, бюджет исчерпан)."""
+        timeout = min(self.request_timeout, self.remaining())
+        if timeout <= 0:
+            return None
+        return http_json(url, timeout)
+
+
+def http_json(url: str, timeout: float):
+    try:
+        req = urllib.request.Request(
+            url,
+            headers={
+                "User-Agent": "Geeker/1.0 (barcode lookup)",
+                "Accept": "application/json",
+            },
+        )
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            data = resp.read()
+        return json.loads(data.decode("utf-8") or "{}")
+    except Exception:
+        return None
+
+
+class CircuitBreaker:
+    """
+    closed -> open после failures сбоев подряд; через reset_after секунд
+    пропускается один пробный вызов (half-open): успех закрывает, сбой
+    снова открывает. Состояние — на процесс.
+    """
+
+    def __init__(self, failures: int, reset_after: float):
+        self.failures = max(1, int(failures))
+        self.reset_after = float(reset_after)
+        self._lock = threading.Lock()
+        self._errors = 0
+        self._opened_at = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_after:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record(self, ok: bool) -> None:
+        with self._lock:
+            self._probing = False
+            if ok:
+                self._errors = 0
+                self._opened_at = None
+                return
+            self._errors += 1
+            if self._opened_at is not None or self._errors >= self.failures:
+                self._opened_at = time.monotonic()
+
+
+# --- stats ---
+
+
+def _stats_key(name: str, field: str) -> str:
+    return f"integrations:metadata:v{STATS_VERSION}:{name}:{field}"
+
+
+def _stat_fields() -> list[str]:
+    return [*OUTCOMES, "sum_ms", *(f"le_{b}" for b in LATENCY_BUCKETS), "le_inf"]
+
+
+def _incr(key: str, delta: int = 1) -> None:
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        if not cache.add(key, delta, None):
+            cache.incr(key, delta)
+
+
+def record_call(name: str, outcome: str, elapsed: float | None) -> None:
+    try:
+        _incr(_stats_key(name, outcome))
+        if elapsed is not None:
+            ms = int(elapsed * 1000)
+            bucket = next((f"le_{b}" for b in LATENCY_BUCKETS if ms <= b), "le_inf")
+            _incr(_stats_key(name, bucket))
+            _incr(_stats_key(name, "sum_ms"), ms)
+    except Exception:
+        # Metrics must never break a lookup (e.g. Redis is down).
+        logger.debug("cannot record metadata provider stats", exc_info=True)
+
+
+def stats(name: str) -> dict:
+    """Счётчики источника: исходы, sum_ms, гистограмма, hit_rate и p50/p95 (верхняя граница корзины)."""
+    fields = _stat_fields()
+    raw = cache.get_many([_stats_key(name, f) for f in fields])
+    data = {f: int(raw.get(_stats_key(name, f)) or 0) for f in fields}
+    answered = data["hit"] + data["miss"]
+    calls = answered + data["error"]
+    data["calls"] = calls
+    data["hit_rate"] = data["hit"] / answered if answered else None
+    data["avg_ms"] = data["sum_ms"] / calls if calls else None
+    for q in (50, 95):
+        data[f"p{q}_ms"] = _percentile(data, q / 100)
+    return data
+
+
+def _percentile(data: dict, q: float):
+    counts = [(b, data[f"le_{b}"]) for b in LATENCY_BUCKETS] + [(None, data["le_inf"])]
+    total = sum(c for _, c in counts)
+    if not total:
+        return None
+    seen = 0
+    for bound, count in counts:
+        seen += count
+        if seen >= q * total:
+            return bound if bound is not None else float("inf")
+    return float("inf")
+
+
+def reset_stats(name: str) -> None:
+    cache.delete_many([_stats_key(name, f) for f in _stat_fields()])
+
+
+# --- registry ---
+
+
+class MetadataProviderRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._providers = {}
+        self._breakers = {}
+
+    def register(self, provider) -> None:
+        if not provider.name:
+            raise ValueError("Metadata provider needs a name.")
+        with self._lock:
+            self._providers[provider.name] = provider
+            self._breakers[provider.name] = CircuitBreaker(provider.breaker_failures, provider.breaker_reset)
+
+    def unregister(self, name: str) -> None:
+        with self._lock:
+            self._providers.pop(name, None)
+            self._breakers.pop(name, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._providers.clear()
+            self._breakers.clear()
+
+    def get(self, name: str):
+        return self._providers.get(name)
+
+    def breaker(self, name: str) -> CircuitBreaker | None:
+        return self._breakers.get(name)
+
+    def all(self) -> list:
+        return sorted(self._providers.values(), key=lambda p: (p.priority, p.name))
+
+    def providers(self, ids: dict) -> list:
+        """Включённые источники, подходящие для кода, в порядке приоритета."""
+        disabled = set(getattr(settings, "INTEGRATIONS_METADATA_DISABLED", []))
+        return [p for p in self.all() if p.name not in disabled and p.applies(ids)]
+
+    def call(self, provider, ids: dict):
+        """fetch() с бюджетом, circuit breaker'ом и метриками. None — сбой или источник пропущен."""
+        breaker = self._breakers.get(provider.name)
+        if breaker is not None and not breaker.allow():
+            record_call(provider.name, "open", None)
+            return None
+
+        budget = Budget(provider.budget, provider.timeout)
+        started = time.monotonic()
+        try:
+            value = provider.fetch(ids, budget)
+        except Exception:
+            logger.warning("metadata provider %s failed", provider.name, exc_info=True)
+            value = None
+        elapsed = time.monotonic() - started
+
+        if value is not None and elapsed > provider.budget:
+            logger.info("metadata provider %s over budget (%.2fs)", provider.name, elapsed)
+        if breaker is not None:
+            breaker.record(value is not None)
+        record_call(provider.name, "error" if value is None else ("hit" if value else "miss"), elapsed)
+        return value
+
+    def load(self, entries=None) -> None:
+        """Заполняет реестр из INTEGRATIONS_METADATA_PROVIDERS (или entries)."""
+        if entries is None:
+            entries = getattr(settings, "INTEGRATIONS_METADATA_PROVIDERS", DEFAULT_PROVIDERS)
+        providers = []
+        for entry in entries:
+            path, kwargs = (entry, {}) if isinstance(entry, str) else entry
+            providers.append(import_string(path)(**kwargs))
+        self.clear()
+        for provider in providers:
+            self.register(provider)
+
+    @contextmanager
+    def override(self, *providers):
+        """Временно подменяет все источники (нагрузочные тесты, работа без сети)."""
+        with self._lock:
+            saved = dict(self._providers), dict(self._breakers)
+        self.clear()
+        for provider in providers:
+            self.register(provider)
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._providers, self._breakers = saved
+
+
+registry = MetadataProviderRegistry()
@@ -0,0 +1,276 @@
+import random
+import time
+import urllib.parse
+
+from .base import BaseMetadataProvider
+
+
+def normalize_ident(x: str) -> str:
+    return (x or "").replace("-", "").strip()
+
+
+def upgrade_google_cover(u: str) -> str:
+    if not u:
+        return ""
+    u = u.replace("http://", "https://")
+    # Make google thumbnails less pixelated
+    if "books.google" in u and "zoom=" in u:
+        u = u.replace("zoom=0", "zoom=3").replace("zoom=1", "zoom=3").replace("zoom=2", "zoom=3")
+    u = u.replace("&edge=curl", "")
+    return u
+
+
+def pick_google_image(imgs: dict) -> str:
+    if not imgs:
+        return ""
+    for k in ("extraLarge", "large", "medium", "small", "thumbnail", "smallThumbnail"):
+        if imgs.get(k):
+            return upgrade_google_cover(str(imgs.get(k)))
+    return ""
+
+
+def commons_file_url(file_url: str, width: int = 900) -> str:
+    # Wikidata P18 usually returns "http(s)://commons.wikimedia.org/wiki/Special:FilePath/FILENAME"
+    if not file_url:
+        return ""
+    u = str(file_url).replace("http://", "https://")
+    # Ask Wikimedia to return a resized image (good quality, fast)
+    if "commons.wikimedia.org/wiki/Special:FilePath/" in u:
+        return u + ("?width=%d" % width)
+    return u
+
+
+class OpenLibraryProvider(BaseMetadataProvider):
+    """Best free source for ISBN; one exact record, not offered as a candidate."""
+
+    name = "openlibrary"
+    priority = 10
+    exposes_candidates = False
+
+    def fetch(self, ids, budget):
+        failed = False
+        for key_isbn in [ids["isbn13"], ids["isbn10"], ids["isbn"]]:
+            if not key_isbn:
+                continue
+            ol_url = "https://openlibrary.org/api/books?" + urllib.parse.urlencode(
+                {
+                    "bibkeys": f"ISBN:{key_isbn}",
+                    "format": "json",
+                    "jscmd": "data",
+                }
+            )
+            ol = budget.get_json(ol_url)
+            if ol is None:
+                failed = True
+                continue
+            rec = ol.get(f"ISBN:{key_isbn}") or {}
+            if rec:
+                desc = rec.get("notes") or rec.get("subtitle") or ""
+                if isinstance(desc, dict):
+                    desc = desc.get("value") or ""
+                cover = rec.get("cover") or {}
+                return [
+                    {
+                        "title": rec.get("title") or "",
+                        "description": str(desc or ""),
+                        "authors": [a.get("name") for a in rec.get("authors", []) if a and a.get("name")],
+                        "cover_url": cover.get("large") or cover.get("medium") or cover.get("small") or "",
+                        "language": "",
+                        "match": True,
+                        "source": "OpenLibrary",
+                    }
+                ]
+        return None if failed else []
+
+
+class _WikidataProvider(BaseMetadataProvider):
+    cache_source = "wikidata"
+
+    def _rows(self, where: str, budget):
+        q = f"""
+SELECT ?item ?itemLabel ?itemDescription ?pic WHERE {{
+  {where}
+  OPTIONAL {{ ?item wdt:P18 ?pic. }}
+  SERVICE wikibase:label {{ bd:serviceParam wikibase:language "ru,en". }}
+}}
+LIMIT 5
+""".strip()
+        url = "https://query.wikidata.org/sparql?" + urllib.parse.urlencode({"format": "json", "query": q})
+        data = budget.get_json(url)
+        if data is None:
+            return None
+        rows = ((data.get("results") or {}).get("bindings")) or []
+        out = []
+        for r in rows:
+            label = ((r.get("itemLabel") or {}).get("value")) or ""
+            desc = ((r.get("itemDescription") or {}).get("value")) or ""
+            pic = ((r.get("pic") or {}).get("value")) or ""
+            out.append(
+                {
+                    "title": label,
+                    "description": desc,
+                    "authors": [],
+                    "cover_url": commons_file_url(pic, 900),
+                    "language": "",
+                    "match": True,
+                    "source": "Wikidata",
+                }
+            )
+        return out
+
+
+class WikidataIsbnProvider(_WikidataProvider):
+    """Helps for comics/books where Google/OpenLibrary are messy."""
+
+    name = "wikidata_isbn"
+    priority = 20
+
+    def cache_key(self, ids):
+        return "isbn:" + ids["key"]
+
+    def fetch(self, ids, budget):
+        # P212 = ISBN-13, P957 = ISBN-10
+        parts = []
+        if ids["isbn13"]:
+            parts.append(f'?item wdt:P212 "{ids["isbn13"]}" .')
+        if ids["isbn10"]:
+            parts.append(f'?item wdt:P957 "{ids["isbn10"]}" .')
+        if not parts:
+            return []
+        # OR the patterns by UNION to catch either property.
+        return self._rows(" UNION ".join([f"{{ {p} }}" for p in parts]), budget)
+
+
+class WikidataBarcodeProvider(_WikidataProvider):
+    """Generic product lookup for non-ISBN items (miniatures, games, etc.)."""
+
+    name = "wikidata_barcode"
+    priority = 40
+
+    def applies(self, ids):
+        return not ids.get("isbn")
+
+    def cache_key(self, ids):
+        return "barcode:" + ids["key"]
+
+    def fetch(self, ids, budget):
+        # P3969 = product barcode (EAN/UPC/GTIN)
+        return self._rows(f'?item wdt:P3969 "{ids["code"]}" .', budget)
+
+
+class GoogleBooksProvider(BaseMetadataProvider):
+    name = "google"
+    priority = 30
+    rank_candidates = True
+
+    def _items(self, query: str, lang: str | None, budget):
+        params = {
+            "q": query,
+            "maxResults": 10,
+            "printType": "books",
+        }
+        if lang:
+            params["langRestrict"] = lang
+        gb = budget.get_json("https://www.googleapis.com/books/v1/volumes?" + urllib.parse.urlencode(params))
+        if gb is None:
+            return None
+        return gb.get("items") or []
+
+    def fetch(self, ids, budget):
+        isbn, isbn13, isbn10 = ids["isbn"], ids["isbn13"], ids["isbn10"]
+        want = {normalize_ident(isbn), normalize_ident(isbn13), normalize_ident(isbn10)}
+        want = {w for w in want if w}
+        query = f"isbn:{isbn13 or isbn10 or isbn}"
+
+        items = self._items(query, "ru", budget)
+        if not items:
+            fallback = self._items(query, None, budget)
+            if items is None and fallback is None:
+                return None
+            items = fallback or []
+
+        all_cands = []
+        for it in items:
+            info = (it or {}).get("volumeInfo") or {}
+            found = info.get("industryIdentifiers") or []
+            found_ids = {normalize_ident((ident or {}).get("identifier") or "") for ident in found}
+            found_ids = {x for x in found_ids if x}
+            imgs = info.get("imageLinks") or {}
+            match = bool(want and (found_ids & want))
+            c = {
+                "title": info.get("title") or "",
+                "description": str(info.get("description") or ""),
+                "authors": list(info.get("authors") or []),
+                "cover_url": pick_google_image(imgs),
+                "language": info.get("language") or "",
+                "match": match,
+            }
+            if c["title"]:
+                all_cands.append(c)
+
+        # Prefer exact ISBN matches; if none exist, still return top candidates so user can choose.
+        google_cands = [c for c in all_cands if c.get("match")] or all_cands
+        for c in google_cands:
+            c["source"] = "Google Books"
+        return google_cands
+
+
+class StubProvider(BaseMetadataProvider):
+    """
+    Локальный источник без сети: для нагрузочных тестов и работы офлайн.
+
+    records — {ключ (ISBN-13/штрихкод): [кандидаты]}; для остальных кодов
+    при synthesize=True выдумывается одна запись. latency — задержка
+    ответа в секундах (с разбросом jitter), failure_rate — доля сбоев.
+    """
+
+    exposes_candidates = True
+
+    def __init__(
+        self,
+        name="stub",
+        *,
+        priority=50,
+        records=None,
+        synthesize=True,
+        latency=0.0,
+        jitter=0.0,
+        failure_rate=0.0,
+        isbn_only=False,
+    ):
+        self.name = name
+        self.priority = priority
+        self.cache_source = name
+        self.records = records or {}
+        self.synthesize = synthesize
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.isbn_only = isbn_only
+
+    def applies(self, ids):
+        return bool(ids.get("isbn")) or not self.isbn_only
+
+    def fetch(self, ids, budget):
+        delay = max(0.0, self.latency + random.uniform(-self.jitter, self.jitter))
+        if delay > budget.remaining():
+            time.sleep(budget.remaining())
+            return None
+        time.sleep(delay)
+        if self.failure_rate and random.random() < self.failure_rate:
+            return None
+        if ids["key"] in self.records:
+            return [dict(c) for c in self.records[ids["key"]]]
+        if not self.synthesize:
+            return []
+        return [
+            {
+                "title": f"Stub {ids['key']}",
+                "description": "",
+                "authors": [],
+                "cover_url": "",
+                "language": "",
+                "match": True,
+                "source": self.name,
+            }
+        ]
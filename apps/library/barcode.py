@@ -0,0 +1,361 @@
+"""
+Поиск метаданных по штрихкоду/ISBN (BarcodeLookupView).
+
+Сначала проверяется локальный каталог (catalog.py, без сети), затем
+источники из реестра apps.integrations.metadata (OpenLibrary,
+Wikidata по ISBN и по штрихкоду товара, Google Books; таймауты, circuit
+breaker и метрики — там). Внешний запрос бывает по несколько секунд, а
+одно и то же издание сканируют много раз, поэтому ответ каждого
+источника кэшируется (кэш default — django-redis в проде) под
+нормализованным ключом (ISBN-13 или штрихкод):
+
+- у каждого источника свой TTL (LIBRARY_BARCODE_CACHE_TTL);
+- «ничего не нашлось» тоже кэшируется, но коротко (ключ "miss");
+- сбой сети не кэшируется вовсе;
+- при одновременных сканах одного кода во внешний сервис идёт один
+  запрос: остальные ждут его результата в кэше (блокировка через
+  cache.add).
+
+Источники опрашиваются параллельно в общем пуле потоков
+(LIBRARY_BARCODE_MAX_WORKERS): скан ждёт самый медленный из нужных
+источников, а не их сумму, и отвечает сразу, как только приоритетный
+источник дал название или пришло точное совпадение по ISBN.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+from apps.integrations import metadata
+
+from . import catalog
+
+logger = logging.getLogger(__name__)
+
+# v2: every source caches a list of candidates.
+CACHE_VERSION = 2
+# Lock lives a bit longer than the slowest source budget.
+LOCK_TIMEOUT = 20
+LOCK_POLL = 0.1
+# A scan waits at most the largest source budget plus this; slower sources keep running and fill the cache.
+LOOKUP_SLACK = 1.0
+# How long an exact ISBN match waits for higher-priority sources.
+EXACT_GRACE = 1.0
+
+DEFAULT_TTLS = {
+    "openlibrary": 7 * 24 * 3600,
+    "wikidata": 3 * 24 * 3600,
+    "google": 24 * 3600,
+    "miss": 3600,
+}
+
+
+def normalize_code(raw: str) -> str:
+    return "".join([c for c in (raw or "") if c.isdigit() or c.upper() == "X"])
+
+
+def is_isbn13(x: str) -> bool:
+    return len(x) == 13 and x.isdigit() and (x.startswith("978") or x.startswith("979"))
+
+
+def is_isbn10(x: str) -> bool:
+    if len(x) != 10:
+        return False
+    body, last = x[:9], x[9]
+    return body.isdigit() and (last.isdigit() or last.upper() == "X")
+
+
+def isbn13_to_isbn10(x: str) -> str:
+    # Only 978-prefix ISBN13 can be converted to ISBN10
+    if not (x and len(x) == 13 and x.isdigit() and x.startswith("978")):
+        return ""
+    core = x[3:12]  # 9 digits
+    s = 0
+    for i, ch in enumerate(core):
+        s += (10 - i) * int(ch)
+    r = 11 - (s % 11)
+    if r == 10:
+        check = "X"
+    elif r == 11:
+        check = "0"
+    else:
+        check = str(r)
+    return core + check
+
+
+def isbn10_to_isbn13(x: str) -> str:
+    if not is_isbn10(x):
+        return ""
+    core = "978" + x[:9]
+    s = sum((1 if i % 2 == 0 else 3) * int(ch) for i, ch in enumerate(core))
+    return core + str((10 - s % 10) % 10)
+
+
+def split_code(code: str) -> dict:
+    """code -> {"code", "isbn", "isbn13", "isbn10", "key"}; key — нормализованный ключ кэша."""
+    isbn = code if (is_isbn13(code) or is_isbn10(code)) else ""
+    isbn13 = isbn if is_isbn13(isbn) else ""
+    isbn10 = isbn if is_isbn10(isbn) else ""
+    if isbn13 and not isbn10:
+        isbn10 = isbn13_to_isbn10(isbn13)
+    key = isbn13 or isbn10_to_isbn13(isbn10) or code.upper()
+    return {"code": code, "isbn": isbn, "isbn13": isbn13, "isbn10": isbn10, "key": key}
+
+
+# --- cache ---
+
+
+def cache_ttl(source: str) -> int:
+    ttls = {**DEFAULT_TTLS, **getattr(settings, "LIBRARY_BARCODE_CACHE_TTL", {})}
+    return int(ttls.get(source, ttls["miss"]))
+
+
+def _cache_key(source: str, key: str) -> str:
+    return f"library:barcode:v{CACHE_VERSION}:{source}:{key}"
+
+
+def cached(source: str, key: str, fetch):
+    """
+    Результат fetch() из кэша или из источника.
+    Пустой результат живёт TTL "miss", None (сбой) не кэшируется.
+    """
+    cache_key = _cache_key(source, key)
+    hit = cache.get(cache_key)
+    if hit is not None:
+        return hit
+
+    lock_key = cache_key + ":lock"
+    if not cache.add(lock_key, 1, LOCK_TIMEOUT):
+        # Someone is already asking this source about this code: wait for their answer.
+        deadline = time.monotonic() + LOCK_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(LOCK_POLL)
+            hit = cache.get(cache_key)
+            if hit is not None:
+                return hit
+            if cache.get(lock_key) is None:
+                break  # the owner failed without caching; fetch ourselves
+        logger.info("barcode cache wait expired for %s", cache_key)
+        return fetch()
+
+    try:
+        value = fetch()
+        if value is not None:
+            cache.set(cache_key, value, cache_ttl(source) if value else cache_ttl("miss"))
+        return value
+    finally:
+        cache.delete(lock_key)
+
+
+# --- lookup ---
+
+
+def _rank(c):
+    lang_score = 1 if (c.get("language") or "").lower() == "ru" else 0
+    cover_score = 1 if c.get("cover_url") else 0
+    title_score = len(c.get("title") or "")
+    return (lang_score, cover_score, title_score)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def executor() -> ThreadPoolExecutor:
+    """Общий ограниченный пул на процесс: сканы не плодят потоки без предела."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = int(getattr(settings, "LIBRARY_BARCODE_MAX_WORKERS", 8))
+            _executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="barcode")
+    return _executor
+
+
+_batch_executor = None
+
+
+def batch_executor() -> ThreadPoolExecutor:
+    """
+    Отдельный пул для пакетного сканирования: lookup() сам ждёт задач в
+    executor(), и в одном ограниченном пуле они бы заблокировали друг друга.
+    """
+    global _batch_executor
+    with _executor_lock:
+        if _batch_executor is None:
+            workers = int(getattr(settings, "LIBRARY_BARCODE_BATCH_WORKERS", 4))
+            _batch_executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="barcode-batch")
+    return _batch_executor
+
+
+def _best(provider, value: list) -> dict:
+    # If multiple candidates exist (Google sometimes has duplicates/editions), pick best but also return list.
+    return max(value, key=_rank) if provider.rank_candidates else value[0]
+
+
+def _answers(provider, value) -> bool:
+    """Источник дал название — источники ниже по приоритету уже не нужны."""
+    return bool(value) and bool(_best(provider, value).get("title"))
+
+
+def _is_exact(value) -> bool:
+    """Точное совпадение по ISBN (запись OpenLibrary/Wikidata, кандидат Google с тем же ISBN)."""
+    return bool(value) and any(c.get("match") for c in value)
+
+
+def _settled(providers: list, results: dict) -> bool:
+    """Ответ уже не изменится: источник с названием готов, все выше по приоритету — тоже."""
+    for provider in providers:
+        if provider.name not in results:
+            return False
+        if _answers(provider, results[provider.name]):
+            return True
+    return True
+
+
+def fan_out(ids: dict) -> list:
+    """
+    Запускает подходящие источники реестра параллельно в общем пуле и
+    ждёт, пока ответ не определится (см. _settled), но не дольше самого
+    большого бюджета источника. Пришло точное совпадение по ISBN —
+    приоритетным источникам даётся ещё EXACT_GRACE. Опоздавшие запросы
+    дорабатывают в фоне и заполняют кэш.
+
+    Возвращает [(provider, результат или None)] в порядке приоритета.
+    """
+    providers = metadata.registry.providers(ids)
+    futures = {
+        executor().submit(
+            cached, p.cache_source or p.name, p.cache_key(ids), partial(metadata.registry.call, p, ids)
+        ): p.name
+        for p in providers
+    }
+    results = {}
+    started = time.monotonic()
+    budget = max((p.budget for p in providers), default=0) + LOOKUP_SLACK
+    exact_at = None
+    pending = set(futures)
+    while pending:
+        now = time.monotonic()
+        timeout = started + budget - now
+        if exact_at is not None:
+            timeout = min(timeout, exact_at + EXACT_GRACE - now)
+        if timeout <= 0:
+            break
+        done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in done:
+            name = futures[future]
+            try:
+                results[name] = future.result()
+            except Exception:
+                logger.warning("barcode source %s failed", name, exc_info=True)
+                results[name] = None
+        if _settled(providers, results):
+            break
+        if exact_at is None and any(_is_exact(value) for value in results.values()):
+            exact_at = time.monotonic()
+    if pending:
+        logger.info("barcode lookup %s: answered without %s", ids["key"], sorted(futures[f] for f in pending))
+    return [(p, results.get(p.name)) for p in providers]
+
+
+def lookup(code: str) -> dict:
+    """Ответ BarcodeLookupView (без "ok") для нормализованного кода."""
+    ids = split_code(code)
+    isbn = ids["isbn"]
+
+    title = ""
+    description = ""
+    cover_url = ""
+    authors = []
+    candidates = []
+
+    # The local catalogue answers without touching the network.
+    local = catalog.provider.fetch(ids)
+    sources = [(catalog.provider, local)] if local else fan_out(ids)
+
+    # Merge by priority: sources are consulted in order until one gives a title.
+    for provider, value in sources:
+        if not value:
+            continue
+        if provider.exposes_candidates:
+            candidates.extend(value)
+        best = _best(provider, value)
+        title = best.get("title") or ""
+        description = best.get("description") or ""
+        authors = list(best.get("authors") or []) or authors
+        cover_url = best.get("cover_url") or ""
+        if title:
+            break
+
+    # Cover quality fallback: try OpenLibrary covers CDN (often higher res) if we have ISBN.
+    if isbn and (not cover_url or "zoom=" in cover_url):
+        cover_url = f"https://covers.openlibrary.org/b/isbn/{isbn}-L.jpg?default=false"
+
+    return {
+        "code": code,
+        "isbn": isbn,
+        "title": title,
+        "description": description,
+        "cover_url": cover_url,
+        "cover_urls": cover_urls(cover_url, isbn, candidates),
+        "authors": authors,
+        "candidates": candidates[:5],
+    }
+
+
+def cover_urls(cover_url: str, isbn: str, candidates: list) -> list[str]:
+    urls = []
+    # Prefer explicit cover_url first
+    if cover_url:
+        urls.append(cover_url)
+    # Add OpenLibrary size fallbacks for this ISBN (some sizes may 404; frontend will try next)
+    if isbn:
+        urls.extend(
+            [
+                f"https://covers.openlibrary.org/b/isbn/{isbn}-L.jpg?default=false",
+                f"https://covers.openlibrary.org/b/isbn/{isbn}-M.jpg?default=false",
+                f"https://covers.openlibrary.org/b/isbn/{isbn}-S.jpg?default=false",
+            ]
+        )
+    # Add covers from candidates (Wikidata/Google) as additional fallbacks
+    for c in candidates[:8]:
+        u = (c or {}).get("cover_url") or ""
+        if u:
+            urls.append(u)
+    # De-dup while preserving order
+    return list(dict.fromkeys(urls))[:8]
+
+
+def _lookup_in_thread(code: str) -> dict:
+    try:
+        return lookup(code)
+    finally:
+        # The local catalogue query opened a connection in this pool thread.
+        connections.close_all()
+
+
+def lookup_many(codes):
+    """
+    Пакетный поиск: [(code, ответ lookup() или None при сбое)] по мере готовности.
+    Повторы в пакете ищутся один раз; уже закэшированные коды приходят первыми.
+    """
+    unique = list(dict.fromkeys(c for c in (normalize_code(raw) for raw in codes) if c))
+    futures = {batch_executor().submit(_lookup_in_thread, code): code for code in unique}
+    try:
+        for future in as_completed(futures):
+            code = futures[future]
+            try:
+                yield code, future.result()
+            except Exception:
+                logger.warning("batch barcode lookup failed for %s", code, exc_info=True)
+                yield code, None
+    finally:
+        # Client went away: don't run the lookups that haven't started yet.
+        for future in futures:
+            future.cancel()
@@ -0,0 +1,120 @@
+"""
+Пакетное сканирование полки: 50–200 штрихкодов подряд.
+
+- stream_lookups(): результаты barcode.lookup_many() в виде NDJSON или SSE
+  по мере готовности (BarcodeBatchLookupView);
+- create_items(): создание найденных предметов одной транзакцией через
+  bulk_create (BarcodeBatchCreateView). bulk_create не шлёт post_save,
+  поэтому поисковый индекс, подсказки и импорт обложек запускаются здесь
+  явно, после коммита.
+"""
+
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Max
+
+from . import barcode, image_proxy, search, suggest, tasks
+from .models import Item
+
+NDJSON = "application/x-ndjson"
+SSE = "text/event-stream"
+
+
+def max_codes() -> int:
+    return int(getattr(settings, "LIBRARY_BARCODE_BATCH_MAX", 200))
+
+
+def _encode(payload: dict, fmt: str, event: str = "result") -> str:
+    data = json.dumps(payload, cls=DjangoJSONEncoder, ensure_ascii=False)
+    if fmt == SSE:
+        return f"event: {event}\ndata: {data}\n\n"
+    return data + "\n"
+
+
+def stream_lookups(codes, fmt: str = NDJSON):
+    """Строки ответа: {"code", "ok", ...поля barcode_lookup} на каждый код, в конце {"done", "total", "found"}."""
+    total = found = 0
+    if fmt == SSE:
+        # Reconnecting would repeat the whole batch.
+        yield "retry: 0\n\n"
+    for code, result in barcode.lookup_many(codes):
+        total += 1
+        if result is None:
+            yield _encode({"code": code, "ok": False, "error": "lookup_failed"}, fmt)
+            continue
+        found += bool(result.get("title"))
+        yield _encode({"ok": True, **result}, fmt)
+    yield _encode({"done": True, "total": total, "found": found}, fmt, event="done")
+
+
+class BatchError(Exception):
+    def __init__(self, code: str, index: int | None = None):
+        super().__init__(code)
+        self.code = code
+        self.index = index
+
+
+def _metadata(row: dict) -> dict:
+    metadata = row.get("metadata") if isinstance(row.get("metadata"), dict) else {}
+    metadata = {str(k): str(v) for k, v in metadata.items()}
+    code = barcode.normalize_code(str(row.get("code") or ""))
+    if code:
+        metadata.setdefault("ISBN" if barcode.split_code(code)["isbn"] else "Штрих-код", code)
+    authors = row.get("authors")
+    if isinstance(authors, list) and authors:
+        metadata.setdefault("Автор", ", ".join(str(a) for a in authors if a))
+    return metadata
+
+
+def create_items(owner, collection, section, rows: list) -> list[Item]:
+    """Создаёт предметы из строк {title, description, code, authors, metadata, cover_url} одной транзакцией."""
+    if not rows:
+        raise BatchError("empty_items")
+    if len(rows) > max_codes():
+        raise BatchError("too_many_items")
+
+    title_max = Item._meta.get_field("title").max_length
+    items = []
+    covers = []
+    for idx, row in enumerate(rows):
+        if not isinstance(row, dict):
+            raise BatchError("bad_item", idx)
+        title = str(row.get("title") or "").strip()[:title_max]
+        if not title:
+            raise BatchError("empty_title", idx)
+        items.append(
+            Item(
+                collection=collection,
+                title=title,
+                description=str(row.get("description") or "").strip(),
+                metadata=_metadata(row),
+            )
+        )
+        url = str(row.get("cover_url") or "").strip()
+        try:
+            image_proxy.check_url(url)
+        except image_proxy.ProxyError:
+            url = ""
+        covers.append(url)
+
+    with transaction.atomic():
+        start = (Item.objects.filter(collection=collection).aggregate(Max("position")).get("position__max") or 0) + 1
+        for offset, item in enumerate(items):
+            item.position = start + offset
+        Item.objects.bulk_create(items)
+        if section is not None:
+            through = Item.sections.through
+            through.objects.bulk_create([through(item_id=item.pk, section_id=section.pk) for item in items])
+
+        ids = [item.pk for item in items]
+        transaction.on_commit(lambda: search.update_item_vectors(ids))
+        if suggest.is_enabled():
+            titles = {item.pk: item.title for item in items}
+            transaction.on_commit(lambda: suggest.update_entries(owner.pk, "item", titles))
+        for item, url in zip(items, covers):
+            if url:
+                transaction.on_commit(lambda pk=item.pk, url=url: tasks.enqueue_cover_import(pk, url))
+    return items
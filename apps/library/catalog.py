@@ -0,0 +1,239 @@
+"""
+Локальный каталог изданий для BarcodeLookupView.
+
+Большая часть сканов — известный «хвост» книг и комиксов, и даже с кэшем
+первый скан идёт во внешние сервисы. Каталог (CatalogEntry) загружается
+командой `import_catalog` из дампа изданий OpenLibrary или своего
+JSONL/CSV и проверяется до любого сетевого источника.
+
+Импорт потоковый: файл (в т. ч. .gz/.bz2) читается построчно, строки
+пишутся пачками через bulk_create(update_conflicts=True), так что
+многогигабайтный дамп загружается в ограниченной памяти.
+"""
+
+import bz2
+import csv
+import gzip
+import json
+import logging
+
+from django.db import transaction
+
+from apps.integrations.base import BaseMetadataProvider
+
+from . import barcode
+from .models import CatalogEntry
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("openlibrary", "jsonl", "csv")
+OPENLIBRARY_COVER = "https://covers.openlibrary.org/b/id/{}-L.jpg"
+
+_fields = {f.name: f for f in CatalogEntry._meta.get_fields()}
+TITLE_MAX = _fields["title"].max_length
+COVER_MAX = _fields["cover_url"].max_length
+DESCRIPTION_MAX = 2000
+
+
+def catalog_key(raw: str) -> str:
+    """Ключ каталога: ISBN-13 (ISBN-10 переводится), UPC-A дополняется до EAN-13."""
+    code = barcode.normalize_code(raw)
+    if not code:
+        return ""
+    if len(code) == 12 and code.isdigit():
+        code = "0" + code
+    return barcode.split_code(code)["key"]
+
+
+def find(code: str) -> dict | None:
+    """Кандидат в формате источников метаданных или None."""
+    key = catalog_key(code)
+    entry = CatalogEntry.objects.filter(code=key).first() if key else None
+    if entry is None:
+        return None
+    return {
+        "title": entry.title,
+        "description": entry.description,
+        "authors": list(entry.authors or []),
+        "cover_url": entry.cover_url,
+        "language": entry.language,
+        "match": True,
+        "source": entry.source or "catalog",
+    }
+
+
+class LocalCatalogProvider(BaseMetadataProvider):
+    """Каталог как источник для слияния в barcode.lookup (в реестр не входит: опрашивается первым и без пула)."""
+
+    name = "catalog"
+    priority = 0
+    exposes_candidates = False
+
+    def applies(self, ids):
+        return True
+
+    def fetch(self, ids, budget=None):
+        found = find(ids["code"])
+        return [found] if found else []
+
+
+provider = LocalCatalogProvider()
+
+
+# --- import ---
+
+
+def open_text(path: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace", newline="")
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rt", encoding="utf-8", errors="replace", newline="")
+    return open(path, "rt", encoding="utf-8", errors="replace", newline="")
+
+
+def detect_format(path: str) -> str:
+    name = path.lower().removesuffix(".gz").removesuffix(".bz2")
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".jsonl", ".ndjson", ".json")):
+        return "jsonl"
+    return "openlibrary"
+
+
+def _authors(value) -> list[str]:
+    if not value:
+        return []
+    if isinstance(value, str):
+        return [a.strip() for a in value.replace(";", "|").split("|") if a.strip()]
+    return [str(a.get("name") if isinstance(a, dict) else a).strip() for a in value if a]
+
+
+def _text(value) -> str:
+    if isinstance(value, dict):
+        value = value.get("value")
+    return str(value or "").strip()
+
+
+def _entry(code: str, record: dict, source: str) -> CatalogEntry | None:
+    key = catalog_key(code)
+    title = _text(record.get("title"))
+    if not key or not title:
+        return None
+    cover_url = _text(record.get("cover_url"))
+    return CatalogEntry(
+        code=key,
+        title=title[:TITLE_MAX],
+        description=_text(record.get("description"))[:DESCRIPTION_MAX],
+        authors=_authors(record.get("authors"))[:10],
+        cover_url=cover_url if len(cover_url) <= COVER_MAX else "",
+        language=_text(record.get("language"))[:16],
+        source=source,
+    )
+
+
+def parse_openlibrary(lines, source: str):
+    """
+    Дамп изданий OpenLibrary (ol_dump_editions_*.txt.gz): строки
+    type \\t key \\t revision \\t last_modified \\t JSON. Одно издание — по
+    записи на каждый его ISBN.
+    """
+    for line in lines:
+        parts = line.rstrip("\n").split("\t")
+        if len(parts) < 5 or parts[0] != "/type/edition":
+            continue
+        try:
+            doc = json.loads(parts[4])
+        except ValueError:
+            continue
+        codes = list(doc.get("isbn_13") or []) + list(doc.get("isbn_10") or [])
+        if not codes:
+            continue
+        title = _text(doc.get("title"))
+        if doc.get("subtitle"):
+            title = f"{title}: {_text(doc.get('subtitle'))}"
+        covers = [c for c in doc.get("covers") or [] if isinstance(c, int) and c > 0]
+        languages = doc.get("languages") or []
+        record = {
+            "title": title,
+            "description": doc.get("description") or "",
+            # Editions only reference author keys; the statement of responsibility is the readable part.
+            "authors": [doc["by_statement"]] if doc.get("by_statement") else [],
+            "cover_url": OPENLIBRARY_COVER.format(covers[0]) if covers else "",
+            "language": (languages[0].get("key") or "").rsplit("/", 1)[-1] if languages else "",
+        }
+        for code in codes:
+            entry = _entry(code, record, source)
+            if entry is not None:
+                yield entry
+
+
+def _record_code(record: dict) -> str:
+    for name in ("code", "isbn13", "isbn_13", "ean", "barcode", "isbn", "isbn10", "isbn_10"):
+        value = record.get(name)
+        if isinstance(value, list):
+            value = value[0] if value else ""
+        if value:
+            return str(value)
+    return ""
+
+
+def parse_jsonl(lines, source: str):
+    """По объекту на строку: code/isbn/ean, title, description, authors, cover_url, language."""
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(record, dict):
+            entry = _entry(_record_code(record), record, source)
+            if entry is not None:
+                yield entry
+
+
+def parse_csv(lines, source: str):
+    """CSV с заголовком; колонки те же, что у JSONL, authors — через «|» или «;»."""
+    for record in csv.DictReader(lines):
+        entry = _entry(_record_code(record), record, source)
+        if entry is not None:
+            yield entry
+
+
+PARSERS = {"openlibrary": parse_openlibrary, "jsonl": parse_jsonl, "csv": parse_csv}
+
+
+def _write(batch: dict, replace: bool) -> None:
+    objs = list(batch.values())
+    with transaction.atomic():
+        if replace:
+            CatalogEntry.objects.bulk_create(
+                objs,
+                update_conflicts=True,
+                unique_fields=["code"],
+                update_fields=["title", "description", "authors", "cover_url", "language", "source", "updated_at"],
+            )
+        else:
+            CatalogEntry.objects.bulk_create(objs, ignore_conflicts=True)
+
+
+def import_entries(entries, *, batch_size: int = 5000, replace: bool = True, progress=None) -> int:
+    """Пишет поток CatalogEntry пачками; в памяти — не больше одной пачки. Возвращает число строк."""
+    batch = {}
+    total = 0
+    for entry in entries:
+        # Same code twice in one INSERT ... ON CONFLICT is an error in PostgreSQL: last one wins.
+        batch[entry.code] = entry
+        if len(batch) >= batch_size:
+            _write(batch, replace)
+            total += len(batch)
+            batch = {}
+            if progress:
+                progress(total)
+    if batch:
+        _write(batch, replace)
+        total += len(batch)
+        if progress:
+            progress(total)
+    return total
@@ -0,0 +1,52 @@
+"""
+Импорт обложки по cover_url на сервере.
+
+Раньше обложка из поиска по штрихкоду шла три раза: источник -> браузер
+(FetchImageView), браузер -> файл в форме, форма -> сервер. Теперь форма
+отправляет только cover_url, а картинку скачивает Celery-задача
+(tasks.import_item_cover) тем же путём, что и прокси (image_proxy:
+ALLOWED_HOSTS, лимит размера, дисковый кэш), и делает её обложкой.
+"""
+
+import logging
+import mimetypes
+
+from django.core.files import File
+from django.db import transaction
+from django.db.models import Max
+
+from . import image_proxy
+from .models import Item, ItemMedia
+
+logger = logging.getLogger(__name__)
+
+
+def import_cover(item_id: int, url: str) -> ItemMedia | None:
+    """Скачивает url и добавляет как основную картинку предмета. ProxyError — если скачать не вышло."""
+    item = Item.objects.filter(pk=item_id).first()
+    if item is None:
+        return None
+
+    fh, content_type = image_proxy.open_image(url)
+    with fh:
+        ext = mimetypes.guess_extension(content_type) or ".jpg"
+        storage = ItemMedia._meta.get_field("file").storage
+        name = storage.save(f"items/cover{ext}", File(fh))
+
+    # Content-addressed name: a retried task finds the same file already attached.
+    existing = item.media.filter(file=name).first()
+    if existing is not None:
+        storage.delete(name)
+        return existing
+
+    with transaction.atomic():
+        position = (item.media.aggregate(Max("position")).get("position__max") or 0) + 1
+        item.media.update(is_primary=False)
+        media = ItemMedia.objects.create(
+            item=item,
+            file=name,
+            type=ItemMedia.MediaType.IMAGE,
+            is_primary=True,
+            position=position,
+        )
+    return media
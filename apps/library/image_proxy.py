@@ -0,0 +1,330 @@
+"""
+Прокси картинок для FetchImageView (обложка из поиска по штрихкоду -> загрузка).
+
+- Ответ источника не читается в память целиком: отдаётся потоково
+  (StreamingHttpResponse) кусками по CHUNK_SIZE, не больше
+  LIBRARY_IMAGE_PROXY_MAX_BYTES; Content-Length/ETag/Last-Modified
+  источника передаются клиенту.
+- Попутно картинка пишется в дисковый кэш (LIBRARY_IMAGE_PROXY_CACHE_DIR)
+  под sha256 от URL: <key>.bin + <key>.json с заголовками. Свежую запись
+  (LIBRARY_IMAGE_PROXY_FRESH_SECONDS) отдаём с диска без запроса,
+  устаревшую — после условного запроса (If-None-Match/If-Modified-Since):
+  304 -> с диска, сбой источника -> тоже с диска.
+- Тот же путь использует импорт обложки на сервере (open_image, см.
+  covers.py): картинка не гоняется через браузер.
+- Кэш — LRU по размеру (LIBRARY_IMAGE_PROXY_CACHE_MAX_BYTES): mtime записи
+  обновляется при каждой выдаче, при переполнении удаляются самые давние.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from django.conf import settings
+from django.http import FileResponse, StreamingHttpResponse
+
+logger = logging.getLogger(__name__)
+
+ALLOWED_HOSTS = {
+    "openlibrary.org",
+    "covers.openlibrary.org",
+    "books.google.com",
+    "books.googleusercontent.com",
+    "lh3.googleusercontent.com",
+    "upload.wikimedia.org",
+    "commons.wikimedia.org",
+}
+
+HTTP_TIMEOUT = 8
+CHUNK_SIZE = 64 * 1024
+# Eviction scans the whole directory: do it at most this often per process.
+EVICT_INTERVAL = 60
+# Evict down to this share of the cap, so the next few writes don't trigger it again.
+EVICT_TARGET = 0.9
+PASSTHROUGH_HEADERS = ("Content-Length", "ETag", "Last-Modified")
+# open_image keeps smaller covers in memory, bigger ones go to a temp file.
+SPOOL_MAX = 1024 * 1024
+
+
+class ProxyError(Exception):
+    """code — значение "error" в JSON-ответе."""
+
+    def __init__(self, code: str, status: int = 400):
+        super().__init__(code)
+        self.code = code
+        self.status = status
+
+
+def max_bytes() -> int:
+    return int(getattr(settings, "LIBRARY_IMAGE_PROXY_MAX_BYTES", 10 * 1024 * 1024))
+
+
+def cache_dir() -> str:
+    return str(getattr(settings, "LIBRARY_IMAGE_PROXY_CACHE_DIR", ""))
+
+
+def check_url(url: str) -> None:
+    """http(s) и хост из ALLOWED_HOSTS, иначе ProxyError."""
+    if not url:
+        raise ProxyError("empty_url")
+    try:
+        parsed = urllib.parse.urlparse(url)
+    except Exception:
+        raise ProxyError("bad_url")
+    if parsed.scheme not in ("http", "https"):
+        raise ProxyError("bad_scheme")
+    if (parsed.hostname or "").lower() not in ALLOWED_HOSTS:
+        raise ProxyError("host_not_allowed")
+
+
+# --- disk cache ---
+
+
+def _paths(url: str):
+    """(body, meta) пути записи или (None, None), если кэш выключен."""
+    root = cache_dir()
+    if not root:
+        return None, None
+    key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    base = os.path.join(root, key[:2], key)
+    return base + ".bin", base + ".json"
+
+
+def _read_meta(url: str):
+    body_path, meta_path = _paths(url)
+    if not meta_path:
+        return None
+    try:
+        with open(meta_path, encoding="utf-8") as fh:
+            meta = json.load(fh)
+        if meta.get("url") != url or os.path.getsize(body_path) != meta.get("size"):
+            return None
+    except (OSError, ValueError):
+        return None
+    return meta
+
+
+def _write_meta(url: str, meta: dict) -> None:
+    _, meta_path = _paths(url)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(meta_path), suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as fh:
+        json.dump(meta, fh)
+    os.replace(tmp, meta_path)
+
+
+def _touch(url: str) -> None:
+    body_path, _ = _paths(url)
+    try:
+        os.utime(body_path)
+    except OSError:
+        pass
+
+
+def _is_fresh(meta: dict) -> bool:
+    fresh = int(getattr(settings, "LIBRARY_IMAGE_PROXY_FRESH_SECONDS", 24 * 3600))
+    return time.time() - float(meta.get("fetched_at") or 0) < fresh
+
+
+_evict_lock = threading.Lock()
+_last_evict = 0.0
+
+
+def evict(force: bool = False) -> int:
+    """Удаляет самые давно выданные записи, пока кэш больше лимита. Возвращает число удалённых."""
+    global _last_evict
+    root = cache_dir()
+    limit = int(getattr(settings, "LIBRARY_IMAGE_PROXY_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+    with _evict_lock:
+        now = time.monotonic()
+        if not root or (not force and now - _last_evict < EVICT_INTERVAL):
+            return 0
+        _last_evict = now
+
+    entries = []
+    total = 0
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            if not name.endswith(".bin"):
+                continue
+            path = os.path.join(dirpath, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+    if total <= limit:
+        return 0
+
+    removed = 0
+    for _, size, path in sorted(entries):
+        if total <= limit * EVICT_TARGET:
+            break
+        for victim in (path[:-4] + ".json", path):
+            try:
+                os.unlink(victim)
+            except OSError:
+                pass
+        total -= size
+        removed += 1
+    logger.info("image proxy cache: evicted %s entries", removed)
+    return removed
+
+
+# --- responses ---
+
+
+def _cached_response(url: str, meta: dict):
+    body_path, _ = _paths(url)
+    try:
+        fh = open(body_path, "rb")
+    except OSError:
+        return None
+    _touch(url)
+    response = FileResponse(fh, content_type=meta.get("content_type") or "application/octet-stream")
+    for header in ("ETag", "Last-Modified"):
+        if meta.get(header):
+            response[header] = meta[header]
+    response["X-Proxy-Cache"] = "HIT"
+    return response
+
+
+def _open_upstream(url: str, meta):
+    headers = {
+        "User-Agent": "Geeker/1.0 (image proxy)",
+        "Accept": "image/*,*/*;q=0.8",
+    }
+    if meta:
+        if meta.get("ETag"):
+            headers["If-None-Match"] = meta["ETag"]
+        if meta.get("Last-Modified"):
+            headers["If-Modified-Since"] = meta["Last-Modified"]
+    req = urllib.request.Request(url, headers=headers)
+    return urllib.request.urlopen(req, timeout=HTTP_TIMEOUT)
+
+
+def _stream(url: str, resp, limit: int):
+    """Куски ответа источника; параллельно — во временный файл кэша, который публикуется только целиком."""
+    body_path, _ = _paths(url)
+    tmp = None
+    if body_path:
+        try:
+            os.makedirs(os.path.dirname(body_path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(body_path), suffix=".tmp")
+            tmp = os.fdopen(fd, "wb")
+        except OSError:
+            logger.warning("image proxy cache is not writable", exc_info=True)
+            tmp = None
+
+    size = 0
+    complete = False
+    try:
+        while True:
+            chunk = resp.read(CHUNK_SIZE)
+            if not chunk:
+                complete = True
+                break
+            size += len(chunk)
+            if size > limit:
+                # Headers are already sent: aborting the stream is the only way to signal it.
+                logger.warning("image proxy: %s is over %s bytes, aborted", url, limit)
+                raise ProxyError("too_large", status=413)
+            if tmp is not None:
+                tmp.write(chunk)
+            yield chunk
+    finally:
+        resp.close()
+        if tmp is not None:
+            tmp.close()
+            if complete:
+                os.replace(tmp_path, body_path)
+                _write_meta(
+                    url,
+                    {
+                        "url": url,
+                        "size": size,
+                        "content_type": resp.headers.get("Content-Type") or "application/octet-stream",
+                        "ETag": resp.headers.get("ETag") or "",
+                        "Last-Modified": resp.headers.get("Last-Modified") or "",
+                        "fetched_at": time.time(),
+                    },
+                )
+                evict()
+            else:
+                os.unlink(tmp_path)
+
+
+def fetch(url: str):
+    """Ответ для FetchImageView (url уже проверен check_url); ProxyError — если отдать нечего."""
+    meta = _read_meta(url)
+    if meta and _is_fresh(meta):
+        response = _cached_response(url, meta)
+        if response is not None:
+            return response
+
+    try:
+        resp = _open_upstream(url, meta)
+    except urllib.error.HTTPError as exc:
+        if exc.code == 304 and meta:
+            meta["fetched_at"] = time.time()
+            _write_meta(url, meta)
+            response = _cached_response(url, meta)
+            if response is not None:
+                response["X-Proxy-Cache"] = "REVALIDATED"
+                return response
+        exc.close()
+        raise ProxyError("fetch_failed")
+    except Exception:
+        # Stale copy beats an error: the upstream is only a cover source.
+        response = _cached_response(url, meta) if meta else None
+        if response is not None:
+            response["X-Proxy-Cache"] = "STALE"
+            return response
+        raise ProxyError("fetch_failed")
+
+    limit = max_bytes()
+    length = resp.headers.get("Content-Length")
+    if length and length.isdigit() and int(length) > limit:
+        resp.close()
+        raise ProxyError("too_large", status=413)
+
+    response = StreamingHttpResponse(
+        _stream(url, resp, limit),
+        content_type=resp.headers.get("Content-Type") or "application/octet-stream",
+    )
+    for header in PASSTHROUGH_HEADERS:
+        if resp.headers.get(header):
+            response[header] = resp.headers[header]
+    response["X-Proxy-Cache"] = "MISS"
+    return response
+
+
+def open_image(url: str):
+    """
+    Картинка целиком для импорта на сервере: (файл, content_type).
+    Тот же путь, что у FetchImageView (лимит, дисковый кэш); файл — во
+    временном SpooledTemporaryFile, закрывает вызывающий.
+    """
+    check_url(url)
+    response = fetch(url)
+    content_type = response["Content-Type"].split(";")[0].strip().lower()
+    out = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX)
+    try:
+        if not content_type.startswith("image/"):
+            raise ProxyError("not_image")
+        for chunk in response.streaming_content:
+            out.write(chunk)
+    except BaseException:
+        out.close()
+        raise
+    finally:
+        response.close()
+    out.seek(0)
+    return out, content_type
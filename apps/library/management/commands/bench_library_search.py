@@ -0,0 +1,123 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVector
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Q
+
+from apps.library import search
+from apps.library.models import Collection, Item, Section
+
+BENCH_USERNAME = "bench_search"
+
+WORDS = [
+    "Batman", "Superman", "Spider-Man", "Watchmen", "Sandman", "Hellboy", "Zelda", "Metroid",
+    "Castlevania", "Witcher", "Diablo", "Starcraft", "Dune", "Foundation", "Hyperion",
+    "Человек-паук", "Хранители", "Ведьмак", "Сталкер", "Метро", "Пикник", "Солярис", "Дюна",
+    "Год", "Первый", "Возвращение", "Тёмный", "Рыцарь", "Legend", "Origins", "Deluxe", "Edition",
+]
+
+# Exact words, prefixes and typos, as typed into the "q" box.
+DEFAULT_QUERIES = ["Batman", "batm", "Btaman", "Ведьмак", "ведьм", "Witcher 3", "Хранитли", "dune"]
+
+
+def percentile(values, p: float) -> float:
+    values = sorted(values)
+    k = max(0, min(len(values) - 1, int(round(p / 100 * (len(values) - 1)))))
+    return values[k]
+
+
+class Command(BaseCommand):
+    help = (
+        "Замер задержки поиска в библиотеке (icontains / полнотекстовый / +pg_trgm) "
+        "на синтетическом наборе предметов. Только PostgreSQL."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--items", type=int, default=1_000_000, help="Размер набора при --seed.")
+        parser.add_argument("--seed", action="store_true", help="Пересоздать синтетический набор.")
+        parser.add_argument("--runs", type=int, default=50, help="Повторов на каждый запрос.")
+        parser.add_argument("--query", action="append", dest="queries", help="Свой запрос (можно несколько).")
+
+    def handle(self, *args, **options):
+        if not search.is_supported():
+            raise CommandError("Бенчмарк рассчитан на PostgreSQL (pg_trgm, tsvector).")
+
+        user, _ = get_user_model().objects.get_or_create(username=BENCH_USERNAME)
+        if options["seed"]:
+            self._seed(user, options["items"])
+
+        section = Section.objects.filter(owner=user).select_related("collection").first()
+        if not section:
+            raise CommandError("Нет набора данных: запустите с --seed.")
+
+        base = Item.objects.filter(collection=section.collection, collection__owner=user)
+        total = base.count()
+        self.stdout.write(f"items: {total}, trigram threshold: {search.trigram_threshold()}")
+
+        modes = {
+            "icontains": lambda q: base.filter(Q(title__icontains=q) | Q(description__icontains=q)).order_by(
+                "-created_at", "-id"
+            ),
+            "fulltext": lambda q: search.filter_by_text(base, q, trigram_field=None)[0].order_by("-search_rank"),
+            "fulltext+trgm": lambda q: search.filter_by_text(base, q)[0].order_by("-search_rank"),
+        }
+        runs = max(1, options["runs"])
+        header = f"{'mode':<14} {'query':<12} {'hits':>5} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}"
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        for name, build in modes.items():
+            all_timings = []
+            for q in options["queries"] or DEFAULT_QUERIES:
+                timings = []
+                hits = 0
+                for _ in range(runs):
+                    started = time.perf_counter()
+                    hits = len(list(build(q)[:24]))
+                    timings.append((time.perf_counter() - started) * 1000)
+                all_timings.extend(timings)
+                self.stdout.write(
+                    f"{name:<14} {q[:12]:<12} {hits:>5} {statistics.median(timings):>8.1f} "
+                    f"{percentile(timings, 95):>8.1f} {max(timings):>8.1f}"
+                )
+            self.stdout.write(self.style.SUCCESS(f"{name}: p95 over all queries {percentile(all_timings, 95):.1f} ms"))
+
+    def _seed(self, user, count: int):
+        Section.objects.filter(owner=user).delete()
+        Collection.objects.filter(owner=user).delete()
+        collection = Collection.objects.create(owner=user, title="Bench")
+        Section.objects.create(owner=user, name="Bench", collection=collection)
+
+        rnd = random.Random(42)
+        batch_size = 5000
+        made = 0
+        while made < count:
+            n = min(batch_size, count - made)
+            batch = [
+                Item(
+                    collection=collection,
+                    title=" ".join(rnd.sample(WORDS, 3)) + f" #{made + i}",
+                    description=" ".join(rnd.choices(WORDS, k=12)),
+                    position=made + i,
+                )
+                for i in range(n)
+            ]
+            with transaction.atomic():
+                Item.objects.bulk_create(batch, batch_size=batch_size)
+            made += n
+            self.stdout.write(f"seeded {made}/{count}")
+
+        # Signals don't fire for bulk_create: build the vectors in one pass per config.
+        vector = None
+        for config in search.SEARCH_CONFIGS:
+            part = SearchVector("title", config=config, weight="A") + SearchVector(
+                "description", config=config, weight="C"
+            )
+            vector = part if vector is None else vector + part
+        Item.objects.filter(collection=collection).update(search_vector=vector)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE library_item")
+        self.stdout.write(self.style.SUCCESS(f"seeded {count} items"))
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from apps.library import tasks, thumbnails
+from apps.library.models import ItemMedia
+
+
+class Command(BaseCommand):
+    help = "Строит WebP/JPEG-варианты картинок предметов (по умолчанию — ставит задачи в Celery)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--missing",
+            action="store_true",
+            help="Только картинки без готовых вариантов.",
+        )
+        parser.add_argument(
+            "--sync",
+            action="store_true",
+            help="Строить в этом процессе, без Celery.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options["batch_size"])
+        qs = ItemMedia.objects.filter(type=ItemMedia.MediaType.IMAGE).order_by("pk")
+        if options["missing"]:
+            qs = qs.exclude(variants_status=ItemMedia.VariantsStatus.READY)
+
+        done = 0
+        last_pk = 0
+        while True:
+            ids = list(qs.filter(pk__gt=last_pk).values_list("pk", flat=True)[:batch_size])
+            if not ids:
+                break
+            for pk in ids:
+                # A full rebuild (e.g. new widths) must not copy a sibling's stale set.
+                if options["sync"]:
+                    thumbnails.build_variants(pk, reuse=options["missing"])
+                else:
+                    tasks.build_media_variants.delay(pk, reuse=options["missing"])
+            done += len(ids)
+            last_pk = ids[-1]
+            self.stdout.write(f"media: {done}")
+        self.stdout.write(self.style.SUCCESS(f"media: обработано {done}"))
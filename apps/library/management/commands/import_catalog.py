@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.library import catalog
+from apps.library.models import CatalogEntry
+
+
+class Command(BaseCommand):
+    help = "Загружает каталог изданий (дамп OpenLibrary, JSONL или CSV; можно .gz/.bz2) для поиска по штрихкоду без сети."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=catalog.FORMATS, help="По умолчанию — по расширению файла.")
+        parser.add_argument("--source", default="", help="Метка источника (по умолчанию — формат).")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--keep-existing",
+            action="store_true",
+            help="Не перезаписывать уже загруженные коды.",
+        )
+        parser.add_argument(
+            "--clear",
+            action="store_true",
+            help="Удалить записи с этой меткой источника перед загрузкой.",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"] or catalog.detect_format(path)
+        source = (options["source"] or fmt)[:32]
+
+        if options["clear"]:
+            deleted, _ = CatalogEntry.objects.filter(source=source).delete()
+            self.stdout.write(f"удалено: {deleted}")
+
+        try:
+            lines = catalog.open_text(path)
+        except OSError as exc:
+            raise CommandError(f"Не удалось открыть {path}: {exc}")
+
+        with lines:
+            total = catalog.import_entries(
+                catalog.PARSERS[fmt](lines, source),
+                batch_size=max(1, options["batch_size"]),
+                replace=not options["keep_existing"],
+                progress=lambda n: self.stdout.write(f"catalog: {n}"),
+            )
+        self.stdout.write(self.style.SUCCESS(f"catalog: загружено {total} ({fmt}, {source})"))
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.library import search
+from apps.library.models import Collection, Item
+
+
+class Command(BaseCommand):
+    help = "Пересобирает search_vector для существующих коллекций и предметов."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--only",
+            choices=["items", "collections"],
+            help="Пересобрать только предметы или только коллекции.",
+        )
+        parser.add_argument(
+            "--missing",
+            action="store_true",
+            help="Только строки с пустым search_vector.",
+        )
+
+    def handle(self, *args, **options):
+        if not search.is_supported():
+            raise CommandError("Полнотекстовый поиск доступен только на PostgreSQL.")
+
+        batch_size = max(1, options["batch_size"])
+        targets = [
+            ("items", Item, search.update_item_vectors),
+            ("collections", Collection, search.update_collection_vectors),
+        ]
+        for name, model, update in targets:
+            if options["only"] and options["only"] != name:
+                continue
+            qs = model.objects.order_by("pk")
+            if options["missing"]:
+                qs = qs.filter(search_vector__isnull=True)
+
+            done = 0
+            last_pk = 0
+            while True:
+                ids = list(qs.filter(pk__gt=last_pk).values_list("pk", flat=True)[:batch_size])
+                if not ids:
+                    break
+                with transaction.atomic():
+                    done += update(ids)
+                last_pk = ids[-1]
+                self.stdout.write(f"{name}: {done}")
+            self.stdout.write(self.style.SUCCESS(f"{name}: обновлено {done}"))
@@ -0,0 +1,21 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.library import suggest
+
+
+class Command(BaseCommand):
+    help = "Пересобирает индекс подсказок (Redis) для всех или выбранных владельцев."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--owner", type=int, action="append", dest="owners", help="id владельца (можно несколько).")
+
+    def handle(self, *args, **options):
+        if not suggest.is_enabled():
+            raise CommandError("Индекс подсказок хранится в Redis: нужен кэш django-redis.")
+
+        owners = options["owners"] or get_user_model().objects.order_by("pk").values_list("pk", flat=True)
+        for owner_id in owners:
+            total = suggest.rebuild_owner(owner_id)
+            self.stdout.write(f"owner {owner_id}: {total}")
+        self.stdout.write(self.style.SUCCESS("Готово."))
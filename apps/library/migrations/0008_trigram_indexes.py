@@ -0,0 +1,38 @@
+# Generated by Django 5.1.2 on 2026-10-18
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("library", "0007_section_description_max_50"),
+    ]
+
+    operations = [
+        # No-op outside PostgreSQL, so the SQLite dev settings keep migrating.
+        TrigramExtension(),
+        migrations.AlterModelOptions(
+            name="itemmedia",
+            options={"ordering": ["-is_primary", "position", "id"]},
+        ),
+        migrations.AddIndex(
+            model_name="collection",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["title"], name="library_coll_title_trgm", opclasses=["gin_trgm_ops"]
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="item",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["title"], name="library_item_title_trgm", opclasses=["gin_trgm_ops"]
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="section",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["name"], name="library_section_name_trgm", opclasses=["gin_trgm_ops"]
+            ),
+        ),
+    ]
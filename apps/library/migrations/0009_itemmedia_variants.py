@@ -0,0 +1,58 @@
+# Generated by Django 5.1.2 on 2026-10-18
+
+import apps.library.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("library", "0008_trigram_indexes"),
+    ]
+
+    operations = [
+        # Existing uploads have no variants yet: keep serving the original
+        # (build_media_variants --missing backfills them), new rows start as pending.
+        migrations.AddField(
+            model_name="itemmedia",
+            name="variants_status",
+            field=models.CharField(
+                choices=[("pending", "Pending"), ("ready", "Ready"), ("original", "Original only")],
+                default="original",
+                max_length=10,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="itemmedia",
+            name="variants_status",
+            field=models.CharField(
+                choices=[("pending", "Pending"), ("ready", "Ready"), ("original", "Original only")],
+                default="pending",
+                max_length=10,
+            ),
+        ),
+        migrations.CreateModel(
+            name="ItemMediaVariant",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("width", models.PositiveIntegerField()),
+                ("height", models.PositiveIntegerField()),
+                ("format", models.CharField(choices=[("webp", "WebP"), ("jpeg", "JPEG")], max_length=4)),
+                ("file", models.FileField(upload_to=apps.library.models.item_media_variant_upload_to)),
+                (
+                    "media",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="variants",
+                        to="library.itemmedia",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["width", "id"],
+                "constraints": [
+                    models.UniqueConstraint(fields=("media", "format", "width"), name="library_media_variant_uniq")
+                ],
+            },
+        ),
+    ]
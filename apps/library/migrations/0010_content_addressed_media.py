@@ -0,0 +1,26 @@
+# Generated by Django 5.1.2 on 2026-10-18
+
+import apps.core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0002_storedblob"),
+        ("library", "0009_itemmedia_variants"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="itemmedia",
+            name="file",
+            field=models.FileField(storage=apps.core.storage.content_storage, upload_to="items/"),
+        ),
+        migrations.AlterField(
+            model_name="section",
+            name="cover",
+            field=models.ImageField(
+                blank=True, null=True, storage=apps.core.storage.content_storage, upload_to="sections/"
+            ),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.2 on 2026-10-18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("library", "0010_content_addressed_media"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CatalogEntry",
+            fields=[
+                ("code", models.CharField(max_length=32, primary_key=True, serialize=False)),
+                ("title", models.CharField(max_length=500)),
+                ("description", models.TextField(blank=True)),
+                ("authors", models.JSONField(blank=True, default=list)),
+                ("cover_url", models.URLField(blank=True, max_length=500)),
+                ("language", models.CharField(blank=True, max_length=16)),
+                ("source", models.CharField(blank=True, max_length=32)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.2 on 2026-10-18
+
+import apps.core.storage
+import apps.library.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("library", "0011_catalogentry"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="itemmediavariant",
+            name="file",
+            field=models.FileField(
+                storage=apps.core.storage.content_storage, upload_to=apps.library.models.item_media_variant_upload_to
+            ),
+        ),
+    ]
@@ -4,6 +4,7 @@ from django.utils.text import slugify
 from django.contrib.postgres.indexes import GinIndex
 from django.contrib.postgres.search import SearchVectorField
 from apps.core.models import TimeStampedModel
+from apps.core.storage import content_storage
 
 
 class Tag(models.Model):
@@ -51,6 +52,7 @@ class Collection(TimeStampedModel):
         indexes = [
             models.Index(fields=["owner", "visibility"]),
             GinIndex(fields=["search_vector"]),
+            GinIndex(fields=["title"], name="library_coll_title_trgm", opclasses=["gin_trgm_ops"]),
         ]
         ordering = ["-created_at"]
 
@@ -71,9 +73,8 @@ class Section(models.Model):
     )
     name = models.CharField(max_length=100)
     slug = models.SlugField(max_length=120, db_index=True)
-<<<<<<< HEAD
     description = models.CharField(max_length=50, blank=True)
-    cover = models.ImageField(upload_to="sections/", blank=True, null=True)
+    cover = models.ImageField(upload_to="sections/", blank=True, null=True, storage=content_storage)
 
     # Internal mapping: each Section owns a single Collection (hidden in UI)
     collection = models.OneToOneField(
@@ -83,18 +84,18 @@ class Section(models.Model):
         null=True,
         blank=True,
     )
-=======
->>>>>>> c3b89d27ec563af11f9e50443796471accc02753
 
     class Meta:
         unique_together = ("owner", "slug")
         ordering = ["name"]
+        indexes = [
+            GinIndex(fields=["name"], name="library_section_name_trgm", opclasses=["gin_trgm_ops"]),
+        ]
 
     def __str__(self) -> str:
         return self.name
 
     def save(self, *args, **kwargs):
-<<<<<<< HEAD
         # IMPORTANT: allow unicode so Cyrillic doesn't collapse to empty slug.
         # Also ensure uniqueness per owner (unique_together owner+slug).
         if not self.slug:
@@ -105,10 +106,6 @@ class Section(models.Model):
                 candidate = f"{base}-{n}"
                 n += 1
             self.slug = candidate
-=======
-        if not self.slug:
-            self.slug = slugify(self.name)
->>>>>>> c3b89d27ec563af11f9e50443796471accc02753
         super().save(*args, **kwargs)
 
 
@@ -133,6 +130,7 @@ class Item(TimeStampedModel):
         indexes = [
             models.Index(fields=["collection", "position"]),
             GinIndex(fields=["search_vector"]),
+            GinIndex(fields=["title"], name="library_item_title_trgm", opclasses=["gin_trgm_ops"]),
         ]
 
     def __str__(self) -> str:
@@ -154,13 +152,19 @@ class ItemMedia(TimeStampedModel):
         VIDEO = "video", "Video"
         FILE = "file", "File"
 
+    class VariantsStatus(models.TextChoices):
+        PENDING = "pending", "Pending"
+        READY = "ready", "Ready"
+        # no variants (not an image, unreadable, or uploaded before the pipeline)
+        ORIGINAL = "original", "Original only"
+
     item = models.ForeignKey(
         Item,
         on_delete=models.CASCADE,
         related_name="media",
         db_index=True,
     )
-    file = models.FileField(upload_to="items/")
+    file = models.FileField(upload_to="items/", storage=content_storage)
     type = models.CharField(
         max_length=10,
         choices=MediaType.choices,
@@ -168,14 +172,15 @@ class ItemMedia(TimeStampedModel):
     )
     is_primary = models.BooleanField(default=False)
     position = models.PositiveIntegerField(default=0)
+    variants_status = models.CharField(
+        max_length=10,
+        choices=VariantsStatus.choices,
+        default=VariantsStatus.PENDING,
+    )
 
     class Meta:
-<<<<<<< HEAD
         # Always show cover first, then keep user's order
         ordering = ["-is_primary", "position", "id"]
-=======
-        ordering = ["position"]
->>>>>>> c3b89d27ec563af11f9e50443796471accc02753
         indexes = [
             models.Index(fields=["item", "position"]),
         ]
@@ -183,6 +188,84 @@ class ItemMedia(TimeStampedModel):
     def __str__(self) -> str:
         return f"{self.type} for {self.item}"
 
+    # Helpers for templates; expect prefetch_related("media__variants").
+
+    @property
+    def is_pending(self) -> bool:
+        return self.variants_status == self.VariantsStatus.PENDING
+
+    @property
+    def has_variants(self) -> bool:
+        return self.variants_status == self.VariantsStatus.READY
+
+    def _srcset(self, fmt: str) -> str:
+        return ", ".join(f"{v.file.url} {v.width}w" for v in self.variants.all() if v.format == fmt)
+
+    @property
+    def webp_srcset(self) -> str:
+        return self._srcset(ItemMediaVariant.Format.WEBP)
+
+    @property
+    def jpeg_srcset(self) -> str:
+        return self._srcset(ItemMediaVariant.Format.JPEG)
+
+    @property
+    def fallback_url(self) -> str:
+        """Самый маленький JPEG — src для браузеров без srcset."""
+        jpegs = [v for v in self.variants.all() if v.format == ItemMediaVariant.Format.JPEG]
+        return min(jpegs, key=lambda v: v.width).file.url if jpegs else self.file.url
+
+
+def item_media_variant_upload_to(instance, filename: str) -> str:
+    return f"items/variants/{instance.media_id}/{filename}"
+
+
+class ItemMediaVariant(models.Model):
+    """Уменьшенная копия ItemMedia (строится Celery-задачей build_media_variants)."""
+
+    class Format(models.TextChoices):
+        WEBP = "webp", "WebP"
+        JPEG = "jpeg", "JPEG"
+
+    media = models.ForeignKey(
+        ItemMedia,
+        on_delete=models.CASCADE,
+        related_name="variants",
+    )
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    format = models.CharField(max_length=4, choices=Format.choices)
+    file = models.FileField(upload_to=item_media_variant_upload_to, storage=content_storage)
+
+    class Meta:
+        ordering = ["width", "id"]
+        constraints = [
+            models.UniqueConstraint(fields=["media", "format", "width"], name="library_media_variant_uniq"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.format} {self.width}w for media {self.media_id}"
+
+
+class CatalogEntry(models.Model):
+    """
+    Локальный каталог изданий (manage.py import_catalog): штрихкод из него
+    распознаётся без внешних запросов. code — ISBN-13 или EAN-13.
+    """
+
+    code = models.CharField(max_length=32, primary_key=True)
+    title = models.CharField(max_length=500)
+    description = models.TextField(blank=True)
+    authors = models.JSONField(default=list, blank=True)
+    cover_url = models.URLField(max_length=500, blank=True)
+    language = models.CharField(max_length=16, blank=True)
+    source = models.CharField(max_length=32, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"{self.code} {self.title}"
+
+
 
 
 
@@ -0,0 +1,174 @@
+"""
+Полнотекстовый поиск по коллекциям и предметам.
+
+`search_vector` собирается из названия, описания, тегов и значений `metadata`
+сразу в двух конфигурациях PostgreSQL — russian и english, поэтому находятся
+словоформы обоих языков. Векторы обновляются сигналами (см. signals.py),
+для существующих строк есть команда `rebuild_search_index`.
+
+Частичные и опечатанные названия ловит pg_trgm: по `title`/`name` ищется
+word_similarity через GIN-индекс `gin_trgm_ops`, порог задаётся настройкой
+LIBRARY_TRIGRAM_THRESHOLD.
+
+На SQLite (dev-настройки) ни того, ни другого нет — там остаётся icontains.
+"""
+
+from django.conf import settings
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    TrigramWordSimilarity,
+)
+from django.db import connections
+from django.db.models import F, Q, TextField, Value
+from django.db.models.functions import Greatest
+
+from .models import Collection, Item
+
+SEARCH_CONFIGS = ("russian", "english")
+
+
+def is_supported(using: str = "default") -> bool:
+    return connections[using].vendor == "postgresql"
+
+
+def trigram_threshold() -> float:
+    return float(getattr(settings, "LIBRARY_TRIGRAM_THRESHOLD", 0.3))
+
+
+def _apply_trigram_threshold(using: str) -> None:
+    """
+    Оператор `%>` (он и использует индекс) сравнивает с
+    pg_trgm.word_similarity_threshold, а не с порогом из запроса, поэтому
+    выставляем его один раз на каждое физическое соединение.
+    """
+    conn = connections[using]
+    conn.ensure_connection()
+    threshold = trigram_threshold()
+    marker = (id(conn.connection), threshold)
+    if getattr(conn, "_library_trgm_threshold", None) == marker:
+        return
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT set_config('pg_trgm.word_similarity_threshold', %s, false)", [str(threshold)])
+    conn._library_trgm_threshold = marker
+
+
+def _metadata_text(value) -> str:
+    # Only values are indexed: keys are user-defined labels ("Автор", "Год"),
+    # searching by them would match almost every item.
+    if isinstance(value, dict):
+        return " ".join(_metadata_text(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return " ".join(_metadata_text(v) for v in value)
+    if value is None or isinstance(value, bool):
+        return ""
+    return str(value)
+
+
+def _build_vector(parts):
+    """parts: [(text, weight)] -> SearchVector expression (or None if all empty)."""
+    vector = None
+    for text, weight in parts:
+        text = (text or "").strip()
+        if not text:
+            continue
+        for config in SEARCH_CONFIGS:
+            v = SearchVector(Value(text, output_field=TextField()), config=config, weight=weight)
+            vector = v if vector is None else vector + v
+    return vector
+
+
+def item_vector(item: Item):
+    tags = " ".join(t.name for t in item.tags.all())
+    return _build_vector(
+        [
+            (item.title, "A"),
+            (tags, "B"),
+            (item.description, "C"),
+            (_metadata_text(item.metadata), "D"),
+        ]
+    )
+
+
+def collection_vector(collection: Collection):
+    tags = " ".join(t.name for t in collection.tags.all())
+    return _build_vector(
+        [
+            (collection.title, "A"),
+            (tags, "B"),
+            (collection.description, "C"),
+        ]
+    )
+
+
+def update_item_vectors(item_ids) -> int:
+    item_ids = [pk for pk in item_ids if pk]
+    if not item_ids or not is_supported():
+        return 0
+    updated = 0
+    for item in Item.objects.filter(pk__in=item_ids).prefetch_related("tags"):
+        updated += Item.objects.filter(pk=item.pk).update(search_vector=item_vector(item))
+    return updated
+
+
+def update_collection_vectors(collection_ids) -> int:
+    collection_ids = [pk for pk in collection_ids if pk]
+    if not collection_ids or not is_supported():
+        return 0
+    updated = 0
+    for collection in Collection.objects.filter(pk__in=collection_ids).prefetch_related("tags"):
+        updated += Collection.objects.filter(pk=collection.pk).update(
+            search_vector=collection_vector(collection)
+        )
+    return updated
+
+
+def build_query(text: str):
+    query = None
+    for config in SEARCH_CONFIGS:
+        q = SearchQuery(text, config=config, search_type="websearch")
+        query = q if query is None else query | q
+    return query
+
+
+def _icontains(qs, text: str, fields):
+    cond = Q()
+    for field in fields:
+        cond |= Q(**{f"{field}__icontains": text})
+    return qs.filter(cond)
+
+
+def filter_by_text(qs, text: str, fallback_fields=("title", "description"), trigram_field="title"):
+    """
+    Фильтрует queryset Item/Collection по строке поиска: полнотекстовое
+    совпадение или похожее по триграммам название.
+
+    Возвращает (qs, ranked): при ranked=True у строк есть аннотация
+    `search_rank` для сортировки по релевантности.
+    """
+    text = (text or "").strip()
+    if not text:
+        return qs, False
+    if not is_supported(qs.db):
+        return _icontains(qs, text, fallback_fields), False
+    query = build_query(text)
+    cond = Q(search_vector=query)
+    rank = SearchRank(F("search_vector"), query)
+    if trigram_field:
+        _apply_trigram_threshold(qs.db)
+        cond |= Q(**{f"{trigram_field}__trigram_word_similar": text})
+        rank = Greatest(rank, TrigramWordSimilarity(text, trigram_field))
+    return qs.filter(cond).annotate(search_rank=rank), True
+
+
+def filter_sections(qs, text: str):
+    """Поиск разделов: похожее название (pg_trgm) или подстрока в описании."""
+    text = (text or "").strip()
+    if not text:
+        return qs, False
+    if not is_supported(qs.db):
+        return _icontains(qs, text, ("name", "description")), False
+    _apply_trigram_threshold(qs.db)
+    qs = qs.filter(Q(name__trigram_word_similar=text) | Q(description__icontains=text))
+    return qs.annotate(search_rank=TrigramWordSimilarity(text, "name")), True
@@ -0,0 +1,170 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from apps.core.storage import is_content_addressed, track_file_field
+
+from . import search, suggest, tasks
+from .models import Collection, Item, ItemMedia, ItemMediaVariant, Section, Tag
+
+ITEM_INDEXED_FIELDS = {"title", "description", "metadata"}
+COLLECTION_INDEXED_FIELDS = {"title", "description"}
+
+
+def _touches(update_fields, indexed: set) -> bool:
+    return update_fields is None or bool(indexed & set(update_fields))
+
+
+@receiver(post_save, sender=Item)
+def item_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or not _touches(update_fields, ITEM_INDEXED_FIELDS):
+        return
+    pk = instance.pk
+    transaction.on_commit(lambda: search.update_item_vectors([pk]))
+
+
+@receiver(post_save, sender=Collection)
+def collection_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or not _touches(update_fields, COLLECTION_INDEXED_FIELDS):
+        return
+    pk = instance.pk
+    transaction.on_commit(lambda: search.update_collection_vectors([pk]))
+
+
+@receiver(post_save, sender=Tag)
+def tag_saved(sender, instance, created=False, raw=False, **kwargs):
+    # A renamed tag changes the text of everything it is attached to.
+    if raw or created:
+        return
+    item_ids = list(instance.items.values_list("pk", flat=True))
+    collection_ids = list(instance.collections.values_list("pk", flat=True))
+    transaction.on_commit(lambda: search.update_item_vectors(item_ids))
+    transaction.on_commit(lambda: search.update_collection_vectors(collection_ids))
+
+
+def _changed_ids(instance, action, reverse, pk_set):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return []
+    if reverse:
+        # instance is a Tag, pk_set holds the items/collections
+        return list(pk_set or [])
+    return [instance.pk]
+
+
+@receiver(m2m_changed, sender=Item.tags.through)
+def item_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    ids = _changed_ids(instance, action, reverse, pk_set)
+    if ids:
+        transaction.on_commit(lambda: search.update_item_vectors(ids))
+
+
+@receiver(m2m_changed, sender=Collection.tags.through)
+def collection_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    ids = _changed_ids(instance, action, reverse, pk_set)
+    if ids:
+        transaction.on_commit(lambda: search.update_collection_vectors(ids))
+
+
+# --- typeahead index (suggest.py) ---
+
+
+def _item_owner_id(item) -> int | None:
+    return Collection.objects.filter(pk=item.collection_id).values_list("owner_id", flat=True).first()
+
+
+@receiver(post_save, sender=Item)
+def item_saved_suggest(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or not suggest.is_enabled() or not _touches(update_fields, {"title"}):
+        return
+    owner_id, pk, title = _item_owner_id(instance), instance.pk, instance.title
+    transaction.on_commit(lambda: suggest.update_entries(owner_id, "item", {pk: title}))
+
+
+@receiver(pre_delete, sender=Item)
+def item_deleting_suggest(sender, instance, **kwargs):
+    # Owner must be read before a cascading delete removes the collection.
+    if not suggest.is_enabled():
+        return
+    instance._suggest_owner_id = _item_owner_id(instance)
+
+
+@receiver(post_delete, sender=Item)
+def item_deleted_suggest(sender, instance, **kwargs):
+    owner_id, pk = getattr(instance, "_suggest_owner_id", None), instance.pk
+    if not owner_id:
+        return
+    transaction.on_commit(lambda: suggest.update_entries(owner_id, "item", {pk: ""}))
+    transaction.on_commit(lambda: suggest.sync_owner_tags(owner_id))
+
+
+@receiver(post_save, sender=Section)
+def section_saved_suggest(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or not suggest.is_enabled() or not _touches(update_fields, {"name"}):
+        return
+    owner_id, pk, name = instance.owner_id, instance.pk, instance.name
+    transaction.on_commit(lambda: suggest.update_entries(owner_id, "section", {pk: name}))
+
+
+@receiver(post_delete, sender=Section)
+def section_deleted_suggest(sender, instance, **kwargs):
+    if not suggest.is_enabled():
+        return
+    owner_id, pk = instance.owner_id, instance.pk
+    transaction.on_commit(lambda: suggest.update_entries(owner_id, "section", {pk: ""}))
+
+
+@receiver(m2m_changed, sender=Item.tags.through)
+@receiver(m2m_changed, sender=Collection.tags.through)
+def tags_changed_suggest(sender, instance, action, reverse, pk_set, model, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear") or not suggest.is_enabled():
+        return
+    if reverse:
+        owners = model.objects.filter(pk__in=pk_set or [])
+        if model is Item:
+            owners = owners.values_list("collection__owner_id", flat=True)
+        else:
+            owners = owners.values_list("owner_id", flat=True)
+        owner_ids = set(owners)
+    elif isinstance(instance, Item):
+        owner_ids = {_item_owner_id(instance)}
+    else:
+        owner_ids = {instance.owner_id}
+    for owner_id in owner_ids:
+        transaction.on_commit(lambda owner_id=owner_id: suggest.sync_owner_tags(owner_id))
+
+
+@receiver(post_save, sender=Tag)
+def tag_saved_suggest(sender, instance, created=False, raw=False, **kwargs):
+    if raw or created or not suggest.is_enabled():
+        return
+    owner_ids = set(instance.items.values_list("collection__owner_id", flat=True))
+    owner_ids |= set(instance.collections.values_list("owner_id", flat=True))
+    for owner_id in owner_ids:
+        transaction.on_commit(lambda owner_id=owner_id: suggest.sync_owner_tags(owner_id))
+
+
+# --- image variants (thumbnails.py) ---
+
+
+@receiver(post_save, sender=ItemMedia)
+def item_media_saved(sender, instance, created=False, raw=False, **kwargs):
+    if raw or not created:
+        return
+    pk = instance.pk
+    transaction.on_commit(lambda: tasks.enqueue_media_variants(pk))
+
+
+@receiver(post_delete, sender=ItemMediaVariant)
+def item_media_variant_deleted(sender, instance, **kwargs):
+    # Variants built before content-addressed storage: nobody else references them.
+    # cas/ names are released by track_file_field like any other upload.
+    file = instance.file
+    if file and not is_content_addressed(file.name):
+        transaction.on_commit(lambda: file.delete(save=False))
+
+
+# --- content-addressed uploads (apps/core/storage.py) ---
+
+track_file_field(ItemMedia, "file")
+track_file_field(ItemMediaVariant, "file")
+track_file_field(Section, "cover")
@@ -0,0 +1,214 @@
+"""
+Подсказки для строки поиска библиотеки (typeahead).
+
+Индекс живёт в Redis, по отсортированному множеству на владельца и вид
+(предметы, разделы, теги): иначе сотня подходящих названий предметов
+вытеснила бы из выдачи разделы и теги. У всех элементов score 0, поэтому
+ZRANGEBYLEX выбирает их по префиксу — по запросу на вид в одном
+pipeline. Элемент — "нормализованный текст\\0вид\\0id\\0название";
+текст кладётся начиная с каждого слова (до MAX_WORDS), чтобы "one"
+находило "Batman: Year One".
+
+Рядом лежат хэши refs (вид -> {id: json списка элементов}), чтобы при
+переименовании/удалении убрать старые элементы, и счётчик версии — он
+отдаётся как ETag.
+
+Без django-redis (dev-настройки с LocMemCache) подсказки берутся из БД
+через istartswith.
+"""
+
+import json
+import logging
+
+from django.conf import settings
+from django.db.models import Q
+
+from .models import Item, Section, Tag
+
+logger = logging.getLogger(__name__)
+
+SEP = "\x00"
+MAX_WORDS = 6
+KINDS = ("item", "section", "tag")
+
+
+def is_enabled() -> bool:
+    return "django_redis" in settings.CACHES["default"]["BACKEND"]
+
+
+def _redis():
+    from django_redis import get_redis_connection
+
+    return get_redis_connection("default")
+
+
+def _key(owner_id: int, kind: str) -> str:
+    return f"library:suggest:{owner_id}:{kind}"
+
+
+def _refs_key(owner_id: int, kind: str) -> str:
+    return f"library:suggest:{owner_id}:refs:{kind}"
+
+
+def _version_key(owner_id: int) -> str:
+    return f"library:suggest:{owner_id}:ver"
+
+
+def normalize(text: str) -> str:
+    return " ".join((text or "").casefold().replace("ё", "е").split())
+
+
+def _members(kind: str, pk: int, display: str) -> list[str]:
+    display = (display or "").replace(SEP, " ").strip()[:255]
+    words = normalize(display).split(" ")
+    if not display or not words[0]:
+        return []
+    return [SEP.join([" ".join(words[i:]), kind, str(pk), display]) for i in range(min(len(words), MAX_WORDS))]
+
+
+def _replace(pipe, r, owner_id: int, kind: str, entries: dict) -> None:
+    """entries: {pk: display or ""} — "" removes the entry."""
+    refs_key = _refs_key(owner_id, kind)
+    pks = list(entries)
+    old = r.hmget(refs_key, [str(pk) for pk in pks]) if pks else []
+    stale = []
+    for raw in old:
+        if raw:
+            stale.extend(json.loads(raw))
+    if stale:
+        pipe.zrem(_key(owner_id, kind), *stale)
+    for pk, display in entries.items():
+        new = _members(kind, pk, display)
+        if new:
+            pipe.zadd(_key(owner_id, kind), {m: 0 for m in new})
+            pipe.hset(refs_key, str(pk), json.dumps(new))
+        else:
+            pipe.hdel(refs_key, str(pk))
+
+
+def update_entries(owner_id: int, kind: str, entries: dict) -> None:
+    if not owner_id or not entries or not is_enabled():
+        return
+    try:
+        r = _redis()
+        pipe = r.pipeline()
+        _replace(pipe, r, owner_id, kind, entries)
+        pipe.incr(_version_key(owner_id))
+        pipe.execute()
+    except Exception:
+        # Подсказки — вспомогательный индекс: не роняем сохранение из-за Redis.
+        logger.warning("suggest index update failed for owner %s", owner_id, exc_info=True)
+
+
+def owner_tags(owner_id: int) -> dict:
+    return dict(
+        Tag.objects.filter(Q(items__collection__owner_id=owner_id) | Q(collections__owner_id=owner_id))
+        .distinct()
+        .values_list("pk", "name")
+    )
+
+
+def sync_owner_tags(owner_id: int) -> None:
+    """Теги глобальные, поэтому набор тегов владельца пересчитывается из БД целиком."""
+    if not owner_id or not is_enabled():
+        return
+    try:
+        current = owner_tags(owner_id)
+        indexed = {int(pk) for pk in _redis().hkeys(_refs_key(owner_id, "tag"))}
+    except Exception:
+        logger.warning("suggest tag sync failed for owner %s", owner_id, exc_info=True)
+        return
+    entries = {pk: "" for pk in indexed - set(current)}
+    entries.update(current)
+    update_entries(owner_id, "tag", entries)
+
+
+def rebuild_owner(owner_id: int, batch_size: int = 1000) -> int:
+    r = _redis()
+    r.delete(*[_key(owner_id, kind) for kind in KINDS], *[_refs_key(owner_id, kind) for kind in KINDS])
+    sources = [
+        ("item", Item.objects.filter(collection__owner_id=owner_id).values_list("pk", "title").iterator()),
+        ("section", Section.objects.filter(owner_id=owner_id).values_list("pk", "name").iterator()),
+        ("tag", owner_tags(owner_id).items()),
+    ]
+    total = 0
+    for kind, rows in sources:
+        pipe = r.pipeline()
+        pending = 0
+        for pk, display in rows:
+            members = _members(kind, pk, display)
+            if not members:
+                continue
+            pipe.zadd(_key(owner_id, kind), {m: 0 for m in members})
+            pipe.hset(_refs_key(owner_id, kind), str(pk), json.dumps(members))
+            pending += 1
+            total += 1
+            if pending >= batch_size:
+                pipe.execute()
+                pending = 0
+        pipe.execute()
+    r.incr(_version_key(owner_id))
+    return total
+
+
+def index_version(owner_id: int):
+    """Версия индекса владельца (для ETag) или None, если Redis не используется."""
+    if not is_enabled():
+        return None
+    try:
+        return int(_redis().get(_version_key(owner_id)) or 0)
+    except Exception:
+        return None
+
+
+def _suggest_from_db(owner_id: int, prefix: str, limit: int) -> dict:
+    items = (
+        Item.objects.filter(collection__owner_id=owner_id, title__istartswith=prefix)
+        .order_by("title", "id")
+        .values_list("pk", "title")[:limit]
+    )
+    sections = (
+        Section.objects.filter(owner_id=owner_id, name__istartswith=prefix)
+        .order_by("name", "id")
+        .values_list("pk", "name")[:limit]
+    )
+    tags = [(pk, name) for pk, name in sorted(owner_tags(owner_id).items(), key=lambda t: t[1])]
+    tags = [(pk, name) for pk, name in tags if normalize(name).startswith(normalize(prefix))][:limit]
+    return {
+        "items": [{"id": pk, "title": title} for pk, title in items],
+        "sections": [{"id": pk, "title": name} for pk, name in sections],
+        "tags": [{"id": pk, "title": name} for pk, name in tags],
+    }
+
+
+def suggest(owner_id: int, prefix: str, limit: int = 8) -> dict:
+    norm = normalize(prefix)
+    result = {"items": [], "sections": [], "tags": []}
+    if not norm:
+        return result
+    if not is_enabled():
+        return _suggest_from_db(owner_id, prefix.strip(), limit)
+
+    start = ("[" + norm).encode("utf-8")
+    # 0xFF never occurs in UTF-8, so it closes the range for any continuation.
+    stop = start + b"\xff"
+    try:
+        pipe = _redis().pipeline(transaction=False)
+        for kind in KINDS:
+            # Overfetch: one title is stored under several word offsets.
+            pipe.zrangebylex(_key(owner_id, kind), start, stop, start=0, num=limit * 3)
+        raw = pipe.execute()
+    except Exception:
+        logger.warning("suggest lookup failed for owner %s", owner_id, exc_info=True)
+        return _suggest_from_db(owner_id, prefix.strip(), limit)
+
+    for kind, members in zip(KINDS, raw):
+        bucket = result[kind + "s"]
+        seen = set()
+        for member in members:
+            _, _, pk, display = member.decode("utf-8").split(SEP, 3)
+            if pk in seen or len(bucket) >= limit:
+                continue
+            seen.add(pk)
+            bucket.append({"id": int(pk), "title": display})
+    return result
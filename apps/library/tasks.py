@@ -0,0 +1,45 @@
+import logging
+
+from celery import shared_task
+
+from . import covers, image_proxy, thumbnails
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True, ignore_result=True, max_retries=3)
+def build_media_variants(self, media_id: int, reuse: bool = True) -> None:
+    try:
+        thumbnails.build_variants(media_id, reuse=reuse)
+    except OSError as exc:
+        if self.request.retries >= self.max_retries:
+            thumbnails.serve_original(media_id)
+            raise
+        raise self.retry(exc=exc, countdown=2**self.request.retries)
+
+
+def enqueue_media_variants(media_id: int) -> None:
+    """Ставит задачу; недоступный брокер не должен ронять загрузку картинки."""
+    try:
+        build_media_variants.delay(media_id)
+    except Exception:
+        logger.warning("cannot enqueue variants for item media %s", media_id, exc_info=True)
+        thumbnails.serve_original(media_id)
+
+
+@shared_task(bind=True, ignore_result=True, max_retries=3)
+def import_item_cover(self, item_id: int, url: str) -> None:
+    try:
+        covers.import_cover(item_id, url)
+    except image_proxy.ProxyError as exc:
+        if exc.code != "fetch_failed":
+            logger.info("cover %s for item %s rejected: %s", url, item_id, exc.code)
+            return
+        raise self.retry(exc=exc, countdown=30 * (self.request.retries + 1))
+
+
+def enqueue_cover_import(item_id: int, url: str) -> None:
+    try:
+        import_item_cover.delay(item_id, url)
+    except Exception:
+        logger.warning("cannot enqueue cover import for item %s", item_id, exc_info=True)
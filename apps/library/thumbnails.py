@@ -0,0 +1,169 @@
+"""
+Уменьшенные копии картинок предметов (ItemMedia) для карточек.
+
+Оригиналы бывают по 5–20 МБ, а в сетке из 24 карточек нужны картинки
+шириной 300–600 px. Для каждой картинки строятся варианты
+LIBRARY_MEDIA_VARIANT_WIDTHS в WebP и JPEG; шаблоны отдают их через
+srcset (см. library/_media_img.html), а пока варианты не готовы —
+заглушку.
+
+Строится в Celery (tasks.build_media_variants), запускается сигналом
+после сохранения ItemMedia. Для старых загрузок — команда
+`build_media_variants --missing`.
+
+Варианты лежат в контентно-адресуемом хранилище, как и оригиналы. Если
+тот же файл (одна обложка на все экземпляры книги) уже есть у другой
+ItemMedia с готовыми вариантами, картинка не декодируется заново: новые
+строки ссылаются на те же файлы (storage.retain).
+"""
+
+import io
+import logging
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+
+from apps.core.storage import content_storage, is_content_addressed
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .models import ItemMedia, ItemMediaVariant
+
+logger = logging.getLogger(__name__)
+
+SAVE_OPTIONS = {
+    ItemMediaVariant.Format.WEBP: ("WEBP", {"quality": 80, "method": 4}),
+    ItemMediaVariant.Format.JPEG: ("JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+
+def variant_widths() -> list[int]:
+    return sorted({int(w) for w in getattr(settings, "LIBRARY_MEDIA_VARIANT_WIDTHS", [320, 640, 1280]) if int(w) > 0})
+
+
+def target_widths(original_width: int) -> list[int]:
+    """Не увеличиваем: ширины больше оригинала отбрасываются, но одна копия есть всегда."""
+    widths = [w for w in variant_widths() if w < original_width]
+    return widths or [min(original_width, variant_widths()[0])]
+
+
+def _load(field_file) -> Image.Image:
+    field_file.open("rb")
+    try:
+        img = Image.open(field_file)
+        # JPEG decoder can downscale by 1/2..1/8 while decoding: much cheaper than a full decode.
+        img.draft("RGB", (variant_widths()[-1], variant_widths()[-1]))
+        img = ImageOps.exif_transpose(img)
+        img.load()
+    finally:
+        field_file.close()
+    if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+        background = Image.new("RGB", img.size, (255, 255, 255))
+        background.paste(img.convert("RGBA"), mask=img.convert("RGBA").getchannel("A"))
+        return background
+    return img.convert("RGB")
+
+
+def _encode(img: Image.Image, fmt: str) -> bytes:
+    pil_format, options = SAVE_OPTIONS[fmt]
+    buf = io.BytesIO()
+    img.save(buf, pil_format, **options)
+    return buf.getvalue()
+
+
+def _mark(media_id: int, status: str) -> None:
+    # update() instead of save(): no post_save, so the signal doesn't re-enqueue.
+    ItemMedia.objects.filter(pk=media_id).update(variants_status=status)
+
+
+def serve_original(media_id: int) -> None:
+    """
+    Показывать оригинал, пока вариантов нет (задачу не удалось поставить или
+    она исчерпала повторы): иначе шаблон держит заглушку. build_media_variants
+    потом может довести до READY.
+    """
+    _mark(media_id, ItemMedia.VariantsStatus.ORIGINAL)
+
+
+def _sibling_variants(media: ItemMedia) -> list[ItemMediaVariant]:
+    """Готовые варианты другой ItemMedia с тем же файлом (одна из них, если таких несколько)."""
+    if not is_content_addressed(media.file.name):
+        return []
+    sibling_id = (
+        ItemMedia.objects.filter(file=media.file.name, variants_status=ItemMedia.VariantsStatus.READY)
+        .exclude(pk=media.pk)
+        .values_list("pk", flat=True)
+        .first()
+    )
+    if sibling_id is None:
+        return []
+    return list(ItemMediaVariant.objects.filter(media_id=sibling_id))
+
+
+def _reuse_variants(media_id: int, siblings: list[ItemMediaVariant]) -> bool:
+    """Копирует строки вариантов соседа; False — какого-то файла уже нет, надо строить."""
+    storage = content_storage()
+    try:
+        with transaction.atomic():
+            for variant in ItemMediaVariant.objects.filter(media_id=media_id):
+                variant.delete()
+            for sibling in siblings:
+                # +1 commits together with the row: a rollback can't leave the count inflated.
+                if not storage.retain(sibling.file.name):
+                    raise LookupError(sibling.file.name)
+                ItemMediaVariant.objects.create(
+                    media_id=media_id,
+                    width=sibling.width,
+                    height=sibling.height,
+                    format=sibling.format,
+                    file=sibling.file.name,
+                )
+            _mark(media_id, ItemMedia.VariantsStatus.READY)
+    except LookupError:
+        return False
+    return True
+
+
+def build_variants(media_id: int, reuse: bool = True) -> int:
+    """
+    Строит (или перестраивает) варианты одной картинки. Возвращает число файлов.
+    reuse=False — не брать варианты соседа (полная перестройка после смены ширин).
+    """
+    media = ItemMedia.objects.filter(pk=media_id).first()
+    if media is None:
+        return 0
+    if media.type != ItemMedia.MediaType.IMAGE or not media.file:
+        _mark(media_id, ItemMedia.VariantsStatus.ORIGINAL)
+        return 0
+
+    siblings = _sibling_variants(media) if reuse else []
+    if siblings and _reuse_variants(media_id, siblings):
+        return len(siblings)
+
+    try:
+        img = _load(media.file)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, ValueError):
+        logger.warning("cannot build variants for item media %s", media_id, exc_info=True)
+        _mark(media_id, ItemMedia.VariantsStatus.ORIGINAL)
+        return 0
+
+    # Widest first, each step resized from the previous one (cheaper than from the original).
+    rendered = []
+    current = img
+    for width in sorted(target_widths(img.width), reverse=True):
+        height = max(1, round(current.height * width / current.width))
+        current = current.resize((width, height), Image.Resampling.LANCZOS) if width != current.width else current
+        for fmt in SAVE_OPTIONS:
+            rendered.append((width, height, fmt, _encode(current, fmt)))
+
+    old = list(ItemMediaVariant.objects.filter(media_id=media_id))
+    with transaction.atomic():
+        for variant in old:
+            variant.delete()
+        for width, height, fmt, data in rendered:
+            variant = ItemMediaVariant(media_id=media_id, width=width, height=height, format=fmt)
+            ext = "jpg" if fmt == ItemMediaVariant.Format.JPEG else fmt
+            variant.file.save(f"{width}.{ext}", ContentFile(data), save=False)
+            variant.save()
+        _mark(media_id, ItemMedia.VariantsStatus.READY)
+    return len(rendered)
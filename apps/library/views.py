@@ -1,149 +1,133 @@
 from django.contrib.auth.mixins import LoginRequiredMixin
-<<<<<<< HEAD
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView, View
-from django.urls import reverse_lazy
-from django.db.models import Q
+from django.urls import reverse, reverse_lazy
+from django.db import transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
 from .models import Collection, Item, Section
 from .forms import SectionForm, CollectionForm, ItemInlineForm, ItemForm
+from . import barcode, batch, image_proxy, search, suggest, tasks
+from apps.core.pagination import CursorPaginationMixin, wants_json
 from django.shortcuts import redirect
-from django.http import JsonResponse
-from django.http import HttpResponse
+from django.http import JsonResponse, StreamingHttpResponse
+from django.http import HttpResponseNotModified
 from django.shortcuts import get_object_or_404
 from django.utils.http import url_has_allowed_host_and_scheme
 from django.views.decorators.csrf import csrf_protect
 from django.utils.decorators import method_decorator
+from django.utils.cache import patch_cache_control
 
 import json
-import urllib.request
 import urllib.parse
-import urllib.error
-=======
-from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
-from django.urls import reverse_lazy
-from django.db.models import Q
-from .models import Collection, Item, Section
-from .forms import SectionForm, CollectionForm, ItemInlineForm
->>>>>>> c3b89d27ec563af11f9e50443796471accc02753
 
 
-class HomeView(LoginRequiredMixin, ListView):
+def item_ordering(order: str, ranked: bool = False) -> list[str]:
+    """
+    Общая сортировка предметов для домашней и страницы раздела.
+    При активном поиске режим по умолчанию ("recent") ставит выше самые релевантные.
+    """
+    if order == "oldest":
+        return ["created_at", "id"]
+    if order == "az":
+        return ["title", "id"]
+    if order == "za":
+        return ["-title", "id"]
+    if ranked:
+        return ["-search_rank", "-created_at", "-id"]
+    return ["-created_at", "-id"]
+
+
+def order_items(qs, order: str, ranked: bool = False):
+    return qs.order_by(*item_ordering(order, ranked))
+
+
+class HomeView(LoginRequiredMixin, CursorPaginationMixin, ListView):
     """
-<<<<<<< HEAD
     Главная вкладка библиотеки: список разделов (пользователь создаёт вручную).
     Можно выбрать несколько разделов — они разворачиваются и показывают предметы.
+    Разделы листаются курсором (library.js догружает их при прокрутке).
     """
 
     model = Section
     template_name = "library/home.html"
     context_object_name = "sections"
     paginate_by = 60
+    cursor_items_template = "library/_section_cards.html"
 
     def get_queryset(self):
         user = self.request.user
         qs = Section.objects.filter(owner=user).select_related("collection")
         query = (self.request.GET.get("q") or "").strip()
-        if query:
-            qs = qs.filter(Q(name__icontains=query) | Q(description__icontains=query))
+        qs, ranked = search.filter_sections(qs, query)
+        if ranked:
+            return qs.order_by("-search_rank", "name", "id")
         return qs.order_by("name", "id")
 
-    def _items_for_section(self, section, query: str, order: str):
-        qs = (
-            Item.objects.filter(collection=section.collection, collection__owner=self.request.user)
-            .select_related("collection")
-            .prefetch_related("media", "sections")
-        )
-        if query:
-            qs = qs.filter(Q(title__icontains=query) | Q(description__icontains=query))
-        if order == "oldest":
-            qs = qs.order_by("created_at", "id")
-        elif order == "az":
-            qs = qs.order_by("title", "id")
-        elif order == "za":
-            qs = qs.order_by("-title", "id")
-        else:
-            qs = qs.order_by("-created_at", "-id")
-=======
-    Главная вкладка библиотеки: карточки предметов с фильтрами по разделам
-    и поиском.
-    """
-
-    model = Item
-    template_name = "library/home.html"
-    context_object_name = "items"
-    paginate_by = 20
-
-    def get_queryset(self):
-        user = self.request.user
+    ITEMS_PER_SECTION = 24
+
+    def _items_for_sections(self, sections, query: str, order: str) -> dict:
+        """
+        Первые ITEMS_PER_SECTION предметов каждого раздела одним запросом:
+        ROW_NUMBER() по collection_id в нужной сортировке, затем фильтр по номеру.
+        Медиа (с вариантами для srcset) и разделы подтягиваются prefetch'ем на всех.
+        Итого 4 запроса при любом числе раскрытых разделов и любой сортировке.
+        """
+        collection_ids = [s.collection_id for s in sections if s.collection_id]
+        if not collection_ids:
+            return {}
+        qs = Item.objects.filter(collection_id__in=collection_ids, collection__owner=self.request.user)
+        qs, ranked = search.filter_by_text(qs, query)
+        ordering = item_ordering(order, ranked)
         qs = (
-            Item.objects.filter(collection__owner=user, collection__is_archived=False)
+            qs.annotate(
+                section_row=Window(RowNumber(), partition_by=[F("collection_id")], order_by=ordering)
+            )
+            .filter(section_row__lte=self.ITEMS_PER_SECTION)
             .select_related("collection")
-            .prefetch_related("media", "sections")
+            .prefetch_related("media__variants", "sections")
+            .order_by("collection_id", "section_row")
         )
-
-        # Простой/расширенный поиск
-        query = self.request.GET.get("q")
-        if query:
-            if self.request.GET.get("search_in_description") == "on":
-                qs = qs.filter(description__icontains=query)
-            else:
-                qs = qs.filter(Q(title__icontains=query) | Q(description__icontains=query))
-
-        # Фильтр по разделам (можно выбрать несколько)
-        section_ids = self.request.GET.getlist("sections")
-        if section_ids:
-            qs = qs.filter(sections__id__in=section_ids).distinct()
-
-        # Сортировка
-        order = self.request.GET.get("order")
-        if order == "recent":
-            qs = qs.order_by("-created_at")
-        elif order == "oldest":
-            qs = qs.order_by("created_at")
-        elif order == "az":
-            qs = qs.order_by("title")
-        elif order == "za":
-            qs = qs.order_by("-title")
-
->>>>>>> c3b89d27ec563af11f9e50443796471accc02753
-        return qs
+        grouped = {}
+        for item in qs:
+            grouped.setdefault(item.collection_id, []).append(item)
+        return grouped
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
-<<<<<<< HEAD
         query = (self.request.GET.get("q") or "").strip()
         ctx["query"] = query
         ctx["advanced"] = self.request.GET.get("advanced") == "on"
         ctx["current_order"] = self.request.GET.get("order", "recent")
         ctx["selected_sections"] = [int(s) for s in self.request.GET.getlist("sections") if s.isdigit()]
+        if wants_json(self.request):
+            # Догрузка карточек разделов: раскрытые разделы уже на странице.
+            return ctx
 
         selected_ids = set(ctx["selected_sections"])
-        expanded = []
-        for s in ctx["sections"]:
-            if s.id in selected_ids:
-                expanded.append(
-                    {
-                        "section": s,
-                        "items": self._items_for_section(s, query, ctx["current_order"])[:24],
-                    }
-                )
-        ctx["expanded_sections"] = expanded
+        selected = [s for s in ctx["sections"] if s.id in selected_ids]
+        items_by_collection = self._items_for_sections(selected, query, ctx["current_order"])
+        ctx["expanded_sections"] = [
+            {"section": s, "items": items_by_collection.get(s.collection_id, [])} for s in selected
+        ]
         return ctx
 
 
-class CollectionListView(LoginRequiredMixin, ListView):
+class CollectionListView(LoginRequiredMixin, CursorPaginationMixin, ListView):
     model = Collection
     template_name = "library/collection_list.html"
     context_object_name = "collections"
     paginate_by = 20
+    cursor_items_template = "library/_collection_cards.html"
 
     def get_queryset(self):
         qs = Collection.objects.filter(owner=self.request.user).prefetch_related("tags")
         q = (self.request.GET.get("q") or "").strip()
-        if q:
-            qs = qs.filter(Q(title__icontains=q) | Q(description__icontains=q))
+        qs, ranked = search.filter_by_text(qs, q)
         archived = self.request.GET.get("archived")
         if archived != "on":
             qs = qs.filter(is_archived=False)
+        if ranked:
+            return qs.order_by("-search_rank", "-created_at", "-id")
         return qs.order_by("-created_at", "-id")
 
     def get_context_data(self, **kwargs):
@@ -153,21 +137,6 @@ class CollectionListView(LoginRequiredMixin, ListView):
         return ctx
 
 
-=======
-        user = self.request.user
-        ctx["sections"] = Section.objects.filter(owner=user)
-        ctx["selected_sections"] = [int(s) for s in self.request.GET.getlist("sections") if s.isdigit()]
-        ctx["current_order"] = self.request.GET.get("order", "recent")
-        ctx["query"] = self.request.GET.get("q", "")
-        ctx["advanced"] = self.request.GET.get("advanced") == "on"
-        return ctx
-
-
-class CollectionListView(HomeView):
-    template_name = "library/collection_list.html"
-
-
->>>>>>> c3b89d27ec563af11f9e50443796471accc02753
 class CollectionDetailView(LoginRequiredMixin, DetailView):
     model = Collection
     template_name = "library/collection_detail.html"
@@ -175,18 +144,15 @@ class CollectionDetailView(LoginRequiredMixin, DetailView):
     def get_queryset(self):
         return (
             Collection.objects.select_related("owner")
-            .prefetch_related("items__media", "tags")
+            .prefetch_related("items__media__variants", "tags")
             .filter(owner=self.request.user)
         )
 
-<<<<<<< HEAD
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
         ctx["user_sections"] = Section.objects.filter(owner=self.request.user).select_related("collection").order_by("name", "id")
         return ctx
 
-=======
->>>>>>> c3b89d27ec563af11f9e50443796471accc02753
 
 class CollectionCreateView(LoginRequiredMixin, CreateView):
     """
@@ -242,7 +208,6 @@ class CollectionCreateView(LoginRequiredMixin, CreateView):
 
         images = self.request.FILES.getlist("images")
         from .models import ItemMedia
-<<<<<<< HEAD
         primary_upload_idx = self.request.POST.get("primary_upload_idx") or ""
         try:
             primary_idx = int(primary_upload_idx)
@@ -250,19 +215,11 @@ class CollectionCreateView(LoginRequiredMixin, CreateView):
             primary_idx = 0
 
         for idx, image in enumerate(images[:10]):
-=======
-
-        for idx, image in enumerate(images[:5]):
->>>>>>> c3b89d27ec563af11f9e50443796471accc02753
             ItemMedia.objects.create(
                 item=item,
                 file=image,
                 type=ItemMedia.MediaType.IMAGE,
-<<<<<<< HEAD
                 is_primary=idx == primary_idx,
-=======
-                is_primary=idx == 0,
->>>>>>> c3b89d27ec563af11f9e50443796471accc02753
                 position=idx,
             )
 
@@ -299,7 +256,6 @@ class ItemDetailView(LoginRequiredMixin, DetailView):
     template_name = "library/item_detail.html"
 
     def get_queryset(self):
-<<<<<<< HEAD
         return (
             Item.objects.select_related("collection", "collection__owner")
             .prefetch_related("media", "tags", "sections")
@@ -332,19 +288,24 @@ class ItemMoveToSectionView(LoginRequiredMixin, View):
         return redirect(reverse("library:section_detail", args=[section.pk]))
 
 
-class ItemCreateView(LoginRequiredMixin, CreateView):
-    model = Item
-    form_class = ItemForm
-=======
-        return Item.objects.select_related("collection", "collection__owner").prefetch_related(
-            "media", "tags"
-        )
+def enqueue_cover_import(request, item) -> None:
+    """
+    cover_url из поиска по штрихкоду: картинку скачивает сервер (Celery) и
+    делает обложкой, браузер её не пересылает. Хост — из ALLOWED_HOSTS прокси.
+    """
+    url = (request.POST.get("cover_url") or "").strip()
+    if not url:
+        return
+    try:
+        image_proxy.check_url(url)
+    except image_proxy.ProxyError:
+        return
+    transaction.on_commit(lambda: tasks.enqueue_cover_import(item.pk, url))
 
 
 class ItemCreateView(LoginRequiredMixin, CreateView):
     model = Item
-    fields = ["collection", "title", "description", "sections"]
->>>>>>> c3b89d27ec563af11f9e50443796471accc02753
+    form_class = ItemForm
     template_name = "library/item_form.html"
     success_url = reverse_lazy("library:home")
 
@@ -357,7 +318,6 @@ class ItemCreateView(LoginRequiredMixin, CreateView):
     def form_valid(self, form):
         response = super().form_valid(form)
         images = self.request.FILES.getlist("images")
-<<<<<<< HEAD
         if images:
             from .models import ItemMedia
             primary_upload_idx = self.request.POST.get("primary_upload_idx") or ""
@@ -374,6 +334,7 @@ class ItemCreateView(LoginRequiredMixin, CreateView):
                     is_primary=idx == primary_idx,
                     position=idx,
                 )
+        enqueue_cover_import(self.request, self.object)
         return response
 
 
@@ -428,6 +389,7 @@ class SectionItemCreateView(LoginRequiredMixin, CreateView):
                     is_primary=idx == primary_idx,
                     position=idx,
                 )
+        enqueue_cover_import(self.request, self.object)
         return response
 
     def get_success_url(self):
@@ -439,31 +401,12 @@ class SectionItemCreateView(LoginRequiredMixin, CreateView):
 class ItemUpdateView(LoginRequiredMixin, UpdateView):
     model = Item
     form_class = ItemForm
-=======
-        for idx, image in enumerate(images[:5]):
-            from .models import ItemMedia
-
-            ItemMedia.objects.create(
-                item=self.object,
-                file=image,
-                type=ItemMedia.MediaType.IMAGE,
-                is_primary=idx == 0,
-                position=idx,
-            )
-        return response
-
-
-class ItemUpdateView(LoginRequiredMixin, UpdateView):
-    model = Item
-    form_class = ItemInlineForm
->>>>>>> c3b89d27ec563af11f9e50443796471accc02753
     template_name = "library/item_form.html"
     success_url = reverse_lazy("library:home")
 
     def get_queryset(self):
         return Item.objects.filter(collection__owner=self.request.user)
 
-<<<<<<< HEAD
     def get_form(self, form_class=None):
         form = super().get_form(form_class)
         form.fields["collection"].queryset = Collection.objects.filter(owner=self.request.user)
@@ -524,6 +467,7 @@ class ItemUpdateView(LoginRequiredMixin, UpdateView):
                 first.is_primary = True
                 first.save(update_fields=["is_primary"])
 
+        enqueue_cover_import(self.request, self.object)
         return response
 
     def get_success_url(self):
@@ -544,8 +488,6 @@ class ItemUpdateView(LoginRequiredMixin, UpdateView):
 
         return reverse("library:collection_detail", args=[self.object.collection_id])
 
-=======
->>>>>>> c3b89d27ec563af11f9e50443796471accc02753
 
 class ItemDeleteView(LoginRequiredMixin, DeleteView):
     model = Item
@@ -564,7 +506,6 @@ class SectionCreateView(LoginRequiredMixin, CreateView):
 
     def form_valid(self, form):
         form.instance.owner = self.request.user
-<<<<<<< HEAD
         response = super().form_valid(form)
         # ensure an internal collection exists
         if not self.object.collection_id:
@@ -595,26 +536,14 @@ class SectionDetailView(LoginRequiredMixin, DetailView):
         items = (
             Item.objects.filter(collection=section.collection, collection__owner=self.request.user)
             .select_related("collection")
-            .prefetch_related("media", "sections")
+            .prefetch_related("media__variants", "sections")
         )
-        if q:
-            items = items.filter(Q(title__icontains=q) | Q(description__icontains=q))
-        if order == "oldest":
-            items = items.order_by("created_at", "id")
-        elif order == "az":
-            items = items.order_by("title", "id")
-        elif order == "za":
-            items = items.order_by("-title", "id")
-        else:
-            items = items.order_by("-created_at", "-id")
-        ctx["items"] = items
+        items, ranked = search.filter_by_text(items, q)
+        ctx["items"] = order_items(items, order, ranked)
         ctx["query"] = q
         ctx["current_order"] = order
         ctx["user_sections"] = Section.objects.filter(owner=self.request.user).select_related("collection").order_by("name", "id")
         return ctx
-=======
-        return super().form_valid(form)
->>>>>>> c3b89d27ec563af11f9e50443796471accc02753
 
 
 class SectionUpdateView(LoginRequiredMixin, UpdateView):
@@ -636,13 +565,13 @@ class SectionDeleteView(LoginRequiredMixin, DeleteView):
         return Section.objects.filter(owner=self.request.user)
 
 
-<<<<<<< HEAD
 @method_decorator(csrf_protect, name="dispatch")
 class BarcodeLookupView(LoginRequiredMixin, View):
     """
     Lookup basic metadata by barcode/ISBN.
     Intended for books/comics ISBN (978/979/EAN13 or ISBN10).
     Returns JSON: {ok, code, isbn, title, description, cover_url, authors}
+    Источники и их кэш — в barcode.py.
     """
 
     def post(self, request):
@@ -651,386 +580,149 @@ class BarcodeLookupView(LoginRequiredMixin, View):
         except Exception:
             payload = {}
 
-        raw = (payload.get("code") or "").strip()
-        code = "".join([c for c in raw if c.isdigit() or c.upper() == "X"])
+        code = barcode.normalize_code((payload.get("code") or "").strip())
         if not code:
             return JsonResponse({"ok": False, "error": "empty_code"}, status=400)
 
-        def is_isbn13(x: str) -> bool:
-            return len(x) == 13 and x.isdigit() and (x.startswith("978") or x.startswith("979"))
-
-        def is_isbn10(x: str) -> bool:
-            if len(x) != 10:
-                return False
-            body, last = x[:9], x[9]
-            return body.isdigit() and (last.isdigit() or last.upper() == "X")
-
-        isbn = code if (is_isbn13(code) or is_isbn10(code)) else ""
-        isbn13 = isbn if is_isbn13(isbn) else ""
-        isbn10 = isbn if is_isbn10(isbn) else ""
-
-        def isbn13_to_isbn10(x: str) -> str:
-            # Only 978-prefix ISBN13 can be converted to ISBN10
-            if not (x and len(x) == 13 and x.isdigit() and x.startswith("978")):
-                return ""
-            core = x[3:12]  # 9 digits
-            s = 0
-            for i, ch in enumerate(core):
-                s += (10 - i) * int(ch)
-            r = 11 - (s % 11)
-            if r == 10:
-                check = "X"
-            elif r == 11:
-                check = "0"
-            else:
-                check = str(r)
-            return core + check
-
-        if isbn13 and not isbn10:
-            isbn10 = isbn13_to_isbn10(isbn13)
-
-        def fetch_json(url: str):
-            try:
-                req = urllib.request.Request(
-                    url,
-                    headers={
-                        "User-Agent": "Geeker/1.0 (barcode lookup)",
-                        "Accept": "application/json",
-                    },
-                )
-                with urllib.request.urlopen(req, timeout=6) as resp:
-                    data = resp.read()
-                return json.loads(data.decode("utf-8") or "{}")
-            except Exception:
-                return None
-
-        title = ""
-        description = ""
-        cover_url = ""
-        authors = []
-        candidates = []
-
-        def normalize_ident(x: str) -> str:
-            return (x or "").replace("-", "").strip()
-
-        def upgrade_google_cover(u: str) -> str:
-            if not u:
-                return ""
-            u = u.replace("http://", "https://")
-            # Make google thumbnails less pixelated
-            if "books.google" in u and "zoom=" in u:
-                u = u.replace("zoom=0", "zoom=3").replace("zoom=1", "zoom=3").replace("zoom=2", "zoom=3")
-            u = u.replace("&edge=curl", "")
-            return u
-
-        def pick_google_image(imgs: dict) -> str:
-            if not imgs:
-                return ""
-            for k in ("extraLarge", "large", "medium", "small", "thumbnail", "smallThumbnail"):
-                if imgs.get(k):
-                    return upgrade_google_cover(str(imgs.get(k)))
-            return ""
-
-        def commons_file_url(file_url: str, width: int = 900) -> str:
-            # Wikidata P18 usually returns "http(s)://commons.wikimedia.org/wiki/Special:FilePath/FILENAME"
-            if not file_url:
-                return ""
-            u = str(file_url).replace("http://", "https://")
-            # Ask Wikimedia to return a resized image (good quality, fast)
-            if "commons.wikimedia.org/wiki/Special:FilePath/" in u:
-                return u + ("?width=%d" % width)
-            return u
-
-        def wikidata_lookup_by_barcode(barcode: str):
-            # P3969 = product barcode (EAN/UPC/GTIN)
-            q = f"""
-SELECT ?item ?itemLabel ?itemDescription ?pic WHERE {{
-  ?item wdt:P3969 "{barcode}" .
-  OPTIONAL {{ ?item wdt:P18 ?pic. }}
-  SERVICE wikibase:label {{ bd:serviceParam wikibase:language "ru,en". }}
-}}
-LIMIT 5
-""".strip()
-            url = "https://query.wikidata.org/sparql?" + urllib.parse.urlencode({"format": "json", "query": q})
-            data = fetch_json(url) or {}
-            rows = (((data.get("results") or {}).get("bindings")) or [])
-            out = []
-            for r in rows:
-                label = ((r.get("itemLabel") or {}).get("value")) or ""
-                desc = ((r.get("itemDescription") or {}).get("value")) or ""
-                pic = ((r.get("pic") or {}).get("value")) or ""
-                out.append(
-                    {
-                        "title": label,
-                        "description": desc,
-                        "authors": [],
-                        "cover_url": commons_file_url(pic, 900),
-                        "language": "",
-                        "match": True,
-                        "source": "Wikidata",
-                    }
-                )
-            return out
-
-        def wikidata_lookup_by_isbn(isbn13_: str, isbn10_: str):
-            # P212 = ISBN-13, P957 = ISBN-10
-            parts = []
-            if isbn13_:
-                parts.append(f'?item wdt:P212 "{isbn13_}" .')
-            if isbn10_:
-                parts.append(f'?item wdt:P957 "{isbn10_}" .')
-            if not parts:
-                return []
-            # OR the patterns by UNION to catch either property.
-            unions = " UNION ".join([f"{{ {p} }}" for p in parts])
-            q = f"""
-SELECT ?item ?itemLabel ?itemDescription ?pic WHERE {{
-  {unions}
-  OPTIONAL {{ ?item wdt:P18 ?pic. }}
-  SERVICE wikibase:label {{ bd:serviceParam wikibase:language "ru,en". }}
-}}
-LIMIT 5
-""".strip()
-            url = "https://query.wikidata.org/sparql?" + urllib.parse.urlencode({"format": "json", "query": q})
-            data = fetch_json(url) or {}
-            rows = (((data.get("results") or {}).get("bindings")) or [])
-            out = []
-            for r in rows:
-                label = ((r.get("itemLabel") or {}).get("value")) or ""
-                desc = ((r.get("itemDescription") or {}).get("value")) or ""
-                pic = ((r.get("pic") or {}).get("value")) or ""
-                out.append(
-                    {
-                        "title": label,
-                        "description": desc,
-                        "authors": [],
-                        "cover_url": commons_file_url(pic, 900),
-                        "language": "",
-                        "match": True,
-                        "source": "Wikidata",
-                    }
-                )
-            return out
-
-        # 1) OpenLibrary (best free for ISBN)
-        if isbn:
-            for key_isbn in [isbn13, isbn10, isbn]:
-                if not key_isbn:
-                    continue
-                ol_url = (
-                    "https://openlibrary.org/api/books?"
-                    + urllib.parse.urlencode(
-                        {
-                            "bibkeys": f"ISBN:{key_isbn}",
-                            "format": "json",
-                            "jscmd": "data",
-                        }
-                    )
-                )
-                ol = fetch_json(ol_url) or {}
-                rec = ol.get(f"ISBN:{key_isbn}") or {}
-                if rec:
-                    title = rec.get("title") or ""
-                    desc = rec.get("notes") or rec.get("subtitle") or ""
-                    if isinstance(desc, dict):
-                        desc = desc.get("value") or ""
-                    description = str(desc or "")
-                    if rec.get("authors"):
-                        authors = [a.get("name") for a in rec.get("authors", []) if a and a.get("name")]
-                    cover = rec.get("cover") or {}
-                    cover_url = cover.get("large") or cover.get("medium") or cover.get("small") or ""
-                    break
-
-        # 1.5) Wikidata ISBN (helps for comics/books where Google/OpenLibrary are messy)
-        if isbn and not title:
-            wd = wikidata_lookup_by_isbn(isbn13, isbn10)
-            if wd:
-                candidates.extend(wd)
-                best = wd[0]
-                title = best.get("title") or ""
-                description = best.get("description") or ""
-                cover_url = best.get("cover_url") or ""
-
-        # 2) Google Books fallback
-        def google_lookup(lang: str | None):
-            params = {
-                "q": f"isbn:{isbn13 or isbn10 or isbn}",
-                "maxResults": 10,
-                "printType": "books",
-            }
-            if lang:
-                params["langRestrict"] = lang
-            gb_url = "https://www.googleapis.com/books/v1/volumes?" + urllib.parse.urlencode(params)
-            gb = fetch_json(gb_url) or {}
-            return gb.get("items") or []
-
-        if not title and isbn:
-            want = {normalize_ident(isbn), normalize_ident(isbn13), normalize_ident(isbn10)}
-            want = {w for w in want if w}
-
-            items = google_lookup("ru")
-            if not items:
-                items = google_lookup(None)
-
-            all_cands = []
-            for it in items:
-                info = (it or {}).get("volumeInfo") or {}
-                ids = info.get("industryIdentifiers") or []
-                found_ids = {normalize_ident((ident or {}).get("identifier") or "") for ident in ids}
-                found_ids = {x for x in found_ids if x}
-                imgs = info.get("imageLinks") or {}
-                match = bool(want and (found_ids & want))
-                c = {
-                    "title": info.get("title") or "",
-                    "description": str(info.get("description") or ""),
-                    "authors": list(info.get("authors") or []),
-                    "cover_url": pick_google_image(imgs),
-                    "language": info.get("language") or "",
-                    "match": match,
-                }
-                if c["title"]:
-                    all_cands.append(c)
-
-            # Prefer exact ISBN matches; if none exist, still return top candidates so user can choose.
-            google_cands = [c for c in all_cands if c.get("match")] or all_cands
-            # Mark source
-            for c in google_cands:
-                c["source"] = "Google Books"
-            candidates.extend(google_cands)
-
-            # If multiple candidates exist (Google sometimes has duplicates/editions), pick best but also return list.
-            if google_cands and not title:
-                def rank(c):
-                    lang_score = 1 if (c.get("language") or "").lower() == "ru" else 0
-                    cover_score = 1 if c.get("cover_url") else 0
-                    title_score = len(c.get("title") or "")
-                    return (lang_score, cover_score, title_score)
-
-                google_cands.sort(key=rank, reverse=True)
-                best = google_cands[0]
-                title = best.get("title") or ""
-                description = best.get("description") or ""
-                authors = best.get("authors") or []
-                cover_url = best.get("cover_url") or ""
-
-        # 3) Generic product lookup: Wikidata by barcode for non-ISBN items (miniatures, games, etc.)
-        if not isbn:
-            wd = wikidata_lookup_by_barcode(code)
-            if wd:
-                candidates.extend(wd)
-                if not title:
-                    best = wd[0]
-                    title = best.get("title") or ""
-                    description = best.get("description") or ""
-                    cover_url = best.get("cover_url") or ""
-
-        # Cover quality fallback: try OpenLibrary covers CDN (often higher res) if we have ISBN.
-        if isbn and (not cover_url or "zoom=" in cover_url):
-            cover_url = f"https://covers.openlibrary.org/b/isbn/{isbn}-L.jpg?default=false"
-
-        cover_urls = []
-        # Prefer explicit cover_url first
-        if cover_url:
-            cover_urls.append(cover_url)
-        # Add OpenLibrary size fallbacks for this ISBN (some sizes may 404; frontend will try next)
-        if isbn:
-            cover_urls.extend(
-                [
-                    f"https://covers.openlibrary.org/b/isbn/{isbn}-L.jpg?default=false",
-                    f"https://covers.openlibrary.org/b/isbn/{isbn}-M.jpg?default=false",
-                    f"https://covers.openlibrary.org/b/isbn/{isbn}-S.jpg?default=false",
-                ]
-            )
-        # Add covers from candidates (Wikidata/Google) as additional fallbacks
-        for c in (candidates or [])[:8]:
-            u = (c or {}).get("cover_url") or ""
-            if u:
-                cover_urls.append(u)
-        # De-dup while preserving order
-        seen = set()
-        cover_urls_dedup = []
-        for u in cover_urls:
-            if u in seen:
-                continue
-            seen.add(u)
-            cover_urls_dedup.append(u)
-
-        return JsonResponse(
-            {
-                "ok": True,
-                "code": code,
-                "isbn": isbn,
-                "title": title,
-                "description": description,
-                "cover_url": cover_url,
-                "cover_urls": cover_urls_dedup[:8],
-                "authors": authors,
-                "candidates": (candidates or [])[:5],
-            }
-        )
+        return JsonResponse({"ok": True, **barcode.lookup(code)})
 
 
 @method_decorator(csrf_protect, name="dispatch")
-class FetchImageView(LoginRequiredMixin, View):
+class BarcodeBatchLookupView(LoginRequiredMixin, View):
     """
-    Proxy image fetch to avoid browser CORS issues when adding cover into uploads.
-    Accepts JSON: {url}
+    Пакетный поиск по штрихкодам (сканирование полки).
+    POST JSON {codes: [...]} или GET ?codes=a,b,c (для EventSource).
+    Ответ — по мере готовности: NDJSON, а при Accept: text/event-stream — SSE.
+    Логика — в batch.py и barcode.lookup_many.
     """
 
-    ALLOWED_HOSTS = {
-        "openlibrary.org",
-        "covers.openlibrary.org",
-        "books.google.com",
-        "books.googleusercontent.com",
-        "lh3.googleusercontent.com",
-        "upload.wikimedia.org",
-        "commons.wikimedia.org",
-    }
+    def get(self, request):
+        return self.respond(request, [c for c in (request.GET.get("codes") or "").split(",") if c.strip()])
 
     def post(self, request):
         try:
             payload = json.loads(request.body.decode("utf-8") or "{}")
         except Exception:
             payload = {}
-        url = (payload.get("url") or "").strip()
-        if not url:
-            return JsonResponse({"ok": False, "error": "empty_url"}, status=400)
+        codes = payload.get("codes") if isinstance(payload, dict) else None
+        if not isinstance(codes, list):
+            return JsonResponse({"ok": False, "error": "bad_codes"}, status=400)
+        return self.respond(request, [str(c) for c in codes])
+
+    def respond(self, request, codes):
+        if not codes:
+            return JsonResponse({"ok": False, "error": "empty_codes"}, status=400)
+        if len(codes) > batch.max_codes():
+            return JsonResponse({"ok": False, "error": "too_many_codes", "max": batch.max_codes()}, status=400)
+
+        fmt = batch.SSE if batch.SSE in request.headers.get("Accept", "") else batch.NDJSON
+        response = StreamingHttpResponse(batch.stream_lookups(codes, fmt), content_type=f"{fmt}; charset=utf-8")
+        response["Cache-Control"] = "no-cache"
+        # nginx would otherwise hold the stream until the whole batch is done.
+        response["X-Accel-Buffering"] = "no"
+        return response
 
+
+@method_decorator(csrf_protect, name="dispatch")
+class BarcodeBatchCreateView(LoginRequiredMixin, View):
+    """
+    Создание предметов по результатам пакетного сканирования одной транзакцией.
+    Accepts JSON: {collection, section?, items: [{title, description, code, authors, metadata, cover_url}]}
+    Returns JSON: {ok, created: [{id, title, url}]}
+    """
+
+    def post(self, request):
         try:
-            parsed = urllib.parse.urlparse(url)
+            payload = json.loads(request.body.decode("utf-8") or "{}")
         except Exception:
-            return JsonResponse({"ok": False, "error": "bad_url"}, status=400)
-
-        if parsed.scheme not in ("http", "https"):
-            return JsonResponse({"ok": False, "error": "bad_scheme"}, status=400)
+            payload = {}
+        if not isinstance(payload, dict):
+            payload = {}
 
-        host = (parsed.hostname or "").lower()
-        if host not in self.ALLOWED_HOSTS:
-            return JsonResponse({"ok": False, "error": "host_not_allowed"}, status=400)
+        section = None
+        if payload.get("section"):
+            section = (
+                Section.objects.filter(owner=request.user, pk=payload.get("section"))
+                .select_related("collection")
+                .first()
+            )
+            if section is None:
+                return JsonResponse({"ok": False, "error": "section_not_found"}, status=404)
+        if section is not None:
+            collection = section.collection
+        else:
+            collection = Collection.objects.filter(owner=request.user, pk=payload.get("collection") or 0).first()
+        if collection is None:
+            return JsonResponse({"ok": False, "error": "collection_not_found"}, status=404)
 
+        rows = payload.get("items")
         try:
-            req = urllib.request.Request(
-                url,
-                headers={
-                    "User-Agent": "Geeker/1.0 (image proxy)",
-                    "Accept": "image/*,*/*;q=0.8",
-                },
-            )
-            with urllib.request.urlopen(req, timeout=8) as resp:
-                data = resp.read()
-                ctype = resp.headers.get("Content-Type") or "application/octet-stream"
-        except urllib.error.HTTPError:
-            return JsonResponse({"ok": False, "error": "fetch_failed"}, status=400)
-        except Exception:
-            return JsonResponse({"ok": False, "error": "fetch_failed"}, status=400)
+            items = batch.create_items(request.user, collection, section, rows if isinstance(rows, list) else [])
+        except batch.BatchError as exc:
+            return JsonResponse({"ok": False, "error": exc.code, "index": exc.index}, status=400)
 
-        return HttpResponse(data, content_type=ctype)
+        created = [
+            {"id": item.pk, "title": item.title, "url": reverse("library:item_detail", args=[item.pk])}
+            for item in items
+        ]
+        return JsonResponse({"ok": True, "created": created}, status=201)
 
 
-=======
->>>>>>> c3b89d27ec563af11f9e50443796471accc02753
+@method_decorator(csrf_protect, name="dispatch")
+class FetchImageView(LoginRequiredMixin, View):
+    """
+    Proxy image fetch to avoid browser CORS issues when adding cover into uploads.
+    Accepts JSON: {url}
+    Потоковая отдача с лимитом размера и дисковым кэшем — в image_proxy.py.
+    """
 
+    def post(self, request):
+        try:
+            payload = json.loads(request.body.decode("utf-8") or "{}")
+        except Exception:
+            payload = {}
+        url = (payload.get("url") or "").strip()
+
+        try:
+            image_proxy.check_url(url)
+            return image_proxy.fetch(url)
+        except image_proxy.ProxyError as exc:
+            return JsonResponse({"ok": False, "error": exc.code}, status=exc.status)
 
 
+class SuggestView(LoginRequiredMixin, View):
+    """
+    Подсказки для строки поиска: GET ?q=<префикс>&limit=<N>.
+    Returns JSON: {ok, q, items, sections, tags}, each entry {id, title, url}.
+    Ответ кэшируется браузером ненадолго и ревалидируется по версии индекса (ETag),
+    так что повторные запросы при наборе/стирании символов почти бесплатны.
+    """
+
+    MAX_AGE = 15
 
+    def get(self, request):
+        q = (request.GET.get("q") or "").strip()[:100]
+        try:
+            limit = max(1, min(int(request.GET.get("limit") or 8), 20))
+        except ValueError:
+            limit = 8
+
+        version = suggest.index_version(request.user.id)
+        etag = f'W/"s{version}"' if version is not None else None
+        if etag and etag in (request.headers.get("If-None-Match") or ""):
+            response = HttpResponseNotModified()
+        else:
+            data = suggest.suggest(request.user.id, q, limit=limit)
+            home_url = reverse("library:home")
+            for entry in data["items"]:
+                entry["url"] = reverse("library:item_detail", args=[entry["id"]])
+            for entry in data["sections"]:
+                entry["url"] = reverse("library:section_detail", args=[entry["id"]])
+            for entry in data["tags"]:
+                entry["url"] = home_url + "?" + urllib.parse.urlencode({"q": entry["title"]})
+            response = JsonResponse({"ok": True, "q": q, **data})
+        if etag:
+            response["ETag"] = etag
+        patch_cache_control(response, private=True, max_age=self.MAX_AGE)
+        return response
 
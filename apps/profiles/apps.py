@@ -5,10 +5,5 @@ class ProfilesConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.profiles"
 
-
-
-
-
-
-
-
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,46 @@
+"""
+Комментарии к постам: в ленте — только последние, остальное — по запросу.
+
+Лента встраивает EMBEDDED_COMMENTS свежих комментариев каждого поста
+одним prefetch-запросом на страницу (срез в Prefetch -> ROW_NUMBER() по
+post_id), так что популярный пост не тянет за собой всю ветку. Кнопка
+«Показать ещё» листает ветку по курсору на (created_at, id) внутри поста,
+то есть по индексу (post, created_at), без OFFSET и COUNT: сколько всего
+комментариев, уже известно из ProfilePost.comments_count.
+"""
+
+from django.db.models import Prefetch
+
+from apps.core.pagination import NEXT, CursorPaginator
+
+from .models import ProfilePostComment
+
+EMBEDDED_COMMENTS = 3
+PAGE_SIZE = 20
+ORDERING = ["-created_at", "-id"]
+
+
+def visible():
+    return ProfilePostComment.objects.filter(is_deleted=False).select_related("author")
+
+
+def latest_prefetch(limit: int = EMBEDDED_COMMENTS) -> Prefetch:
+    """Последние limit комментариев каждого поста в post.latest_comments (новые сверху)."""
+    return Prefetch("comments", queryset=visible().order_by(*ORDERING)[:limit], to_attr="latest_comments")
+
+
+def paginator(post_id: int, per_page: int = PAGE_SIZE) -> CursorPaginator:
+    return CursorPaginator(visible().filter(post_id=post_id), per_page, ordering=ORDERING)
+
+
+def more_cursor(post) -> str | None:
+    """Курсор ветки сразу после встроенных комментариев или None, если показано всё."""
+    shown = post.latest_comments
+    if not shown or post.comments_count <= len(shown):
+        return None
+    return paginator(post.pk).encode_cursor(shown[-1], NEXT, len(shown))
+
+
+def page(post_id: int, cursor: str | None = None):
+    """Страница ветки (CursorPage, новые сверху); InvalidCursor — плохой курсор."""
+    return paginator(post_id).page(cursor)
@@ -0,0 +1,202 @@
+"""
+Счётчики поста: score, upvotes, downvotes, comments_count.
+
+Лента читает их прямо из строки ProfilePost — без JOIN с голосами и
+комментариями и без GROUP BY. Точность держат пути записи: голос и
+комментарий меняют счётчики в той же транзакции, что и свою строку
+(голос на PostgreSQL — одним SQL-выражением, см. TOGGLE_VOTE_SQL,
+комментарий — F()-выражением). Если счётчики всё же разошлись (ручная правка в БД,
+удаление в обход этих функций), их пересчитывает reconcile()
+(команда reconcile_post_counters).
+"""
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import ProfilePost, ProfilePostComment, ProfilePostVote
+
+COUNTER_FIELDS = ("score", "upvotes", "downvotes", "comments_count")
+
+
+def _vote_delta(old: int, new: int) -> dict:
+    """F()-обновления счётчиков при смене голоса old -> new (0 — голоса нет)."""
+    changes = {}
+    if old != new:
+        changes["score"] = F("score") + (new - old)
+    for value, name in ((1, "upvotes"), (-1, "downvotes")):
+        step = (new == value) - (old == value)
+        if step:
+            changes[name] = F(name) + step
+    return changes
+
+
+# One statement on PostgreSQL: post check, vote delete-or-upsert and counter update.
+# `removed` and `upserted` never touch the same row: which one runs is decided by the
+# snapshot in `old`. Counter deltas come from what the statement actually changed
+# (RETURNING), not from the snapshot, so racing double-clicks cannot skew them:
+# ON CONFLICT ... WHERE value <> new turns a duplicate into a no-op.
+TOGGLE_VOTE_SQL = """
+WITH target AS (
+    SELECT id FROM {post} WHERE id = %(post)s AND NOT is_deleted {author_filter}
+),
+old AS (
+    SELECT v.value FROM {vote} v JOIN target t ON v.post_id = t.id WHERE v.user_id = %(user)s
+),
+removed AS (
+    DELETE FROM {vote} v USING target t
+    WHERE v.post_id = t.id AND v.user_id = %(user)s AND v.value = %(value)s
+    RETURNING v.value AS old_value, 0 AS new_value
+),
+upserted AS (
+    INSERT INTO {vote} AS v (post_id, user_id, value, created_at, updated_at)
+    SELECT t.id, %(user)s, %(value)s, now(), now() FROM target t
+    WHERE NOT EXISTS (SELECT 1 FROM old WHERE old.value = %(value)s)
+    ON CONFLICT (post_id, user_id) DO UPDATE
+        SET value = EXCLUDED.value, updated_at = EXCLUDED.updated_at
+        WHERE v.value <> EXCLUDED.value
+    -- xmax = 0: a fresh insert; otherwise an update, and votes are +-1, so the old one was -value.
+    RETURNING CASE WHEN v.xmax = 0 THEN 0 ELSE -v.value END AS old_value, v.value AS new_value
+),
+changes AS (
+    SELECT old_value, new_value FROM removed
+    UNION ALL
+    SELECT old_value, new_value FROM upserted
+),
+counted AS (
+    UPDATE {post} p SET
+        score = p.score + c.new_value - c.old_value,
+        upvotes = p.upvotes + (c.new_value = 1)::int - (c.old_value = 1)::int,
+        downvotes = p.downvotes + (c.new_value = -1)::int - (c.old_value = -1)::int
+    FROM changes c
+    WHERE p.id = %(post)s
+    RETURNING p.score
+)
+SELECT
+    (SELECT id FROM target),
+    COALESCE((SELECT score FROM counted), (SELECT score FROM {post} WHERE id = %(post)s)),
+    COALESCE((SELECT new_value - old_value FROM changes), 0),
+    CASE WHEN EXISTS (SELECT 1 FROM old WHERE old.value = %(value)s) THEN 0 ELSE %(value)s END
+"""
+
+
+def toggle_vote(post_id: int, user_id: int, value: int, *, author_id: int | None = None):
+    """
+    Ставит голос value (1/-1); повтор того же голоса его снимает.
+    author_id — голосовать можно только за посты этого автора.
+    Возвращает (score, изменение score, голос пользователя после операции)
+    или None, если поста нет (удалён, чужой).
+    """
+    if connection.vendor == "postgresql":
+        return _toggle_vote_sql(post_id, user_id, value, author_id)
+    return _toggle_vote_orm(post_id, user_id, value, author_id)
+
+
+def _toggle_vote_sql(post_id, user_id, value, author_id):
+    sql = TOGGLE_VOTE_SQL.format(
+        post=connection.ops.quote_name(ProfilePost._meta.db_table),
+        vote=connection.ops.quote_name(ProfilePostVote._meta.db_table),
+        author_filter="AND author_id = %(author)s" if author_id is not None else "",
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, {"post": post_id, "user": user_id, "value": value, "author": author_id})
+        found, score, delta, current = cursor.fetchone()
+    if found is None:
+        return None
+    return score, delta, current
+
+
+def _toggle_vote_orm(post_id, user_id, value, author_id, retry: bool = True):
+    """То же самое по шагам — для SQLite (без data-modifying CTE) и как эталон для бенчмарка."""
+    posts = ProfilePost.objects.filter(pk=post_id, is_deleted=False)
+    if author_id is not None:
+        posts = posts.filter(author_id=author_id)
+    try:
+        with transaction.atomic():
+            if not posts.exists():
+                return None
+            vote = ProfilePostVote.objects.select_for_update().filter(post_id=post_id, user_id=user_id).first()
+            old = vote.value if vote else 0
+            if vote and vote.value == value:
+                vote.delete()
+                new = 0
+            elif vote:
+                vote.value = value
+                vote.save(update_fields=["value"])
+                new = value
+            else:
+                ProfilePostVote.objects.create(post_id=post_id, user_id=user_id, value=value)
+                new = value
+            changes = _vote_delta(old, new)
+            if changes:
+                ProfilePost.objects.filter(pk=post_id).update(**changes)
+            score = ProfilePost.objects.filter(pk=post_id).values_list("score", flat=True).get()
+    except IntegrityError:
+        # A concurrent first vote by the same user won the insert: apply ours on top of it.
+        if not retry:
+            raise
+        return _toggle_vote_orm(post_id, user_id, value, author_id, retry=False)
+    return score, new - old, new
+
+
+def add_comment(post: ProfilePost, author, text: str) -> ProfilePostComment:
+    with transaction.atomic():
+        comment = ProfilePostComment.objects.create(post=post, author=author, text=text)
+        ProfilePost.objects.filter(pk=post.pk).update(comments_count=F("comments_count") + 1)
+    return comment
+
+
+# --- reconcile ---
+
+
+def _vote_total(aggregate):
+    qs = ProfilePostVote.objects.filter(post=OuterRef("pk")).order_by().values("post")
+    return Coalesce(Subquery(qs.annotate(v=aggregate).values("v")[:1]), Value(0), output_field=IntegerField())
+
+
+def true_counters() -> dict:
+    """Выражения с точными значениями (коррелированные подзапросы, по одному посту)."""
+    comments = (
+        ProfilePostComment.objects.filter(post=OuterRef("pk"), is_deleted=False)
+        .order_by()
+        .values("post")
+        .annotate(c=Count("pk"))
+        .values("c")[:1]
+    )
+    return {
+        "score": _vote_total(Sum("value")),
+        "upvotes": _vote_total(Count("pk", filter=Q(value=1))),
+        "downvotes": _vote_total(Count("pk", filter=Q(value=-1))),
+        "comments_count": Coalesce(Subquery(comments), Value(0), output_field=IntegerField()),
+    }
+
+
+def reconcile(queryset=None, *, batch_size: int = 1000, dry_run: bool = False) -> list[dict]:
+    """
+    Сверяет счётчики с голосами и комментариями пачками по batch_size
+    постов и исправляет расхождения. Возвращает исправленные посты:
+    [{"id", поле: (было, стало), ...}].
+    """
+    queryset = (queryset if queryset is not None else ProfilePost.objects.all()).order_by("pk")
+    expected = {f"true_{name}": expr for name, expr in true_counters().items()}
+    fixed = []
+    last_pk = 0
+    while True:
+        ids = list(queryset.filter(pk__gt=last_pk).values_list("pk", flat=True)[:batch_size])
+        if not ids:
+            break
+        last_pk = ids[-1]
+        rows = (
+            ProfilePost.objects.filter(pk__in=ids)
+            .annotate(**expected)
+            .values("pk", *COUNTER_FIELDS, *expected)
+        )
+        for row in rows:
+            diff = {name: (row[name], row[f"true_{name}"]) for name in COUNTER_FIELDS if row[name] != row[f"true_{name}"]}
+            if not diff:
+                continue
+            fixed.append({"id": row["pk"], **diff})
+            if not dry_run:
+                # Recomputed inside the UPDATE, so writes since the SELECT above are not lost.
+                ProfilePost.objects.filter(pk=row["pk"]).update(**true_counters())
+    return fixed
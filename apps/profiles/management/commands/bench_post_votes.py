@@ -0,0 +1,126 @@
+import random
+import statistics
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+
+from apps.profiles import counters
+from apps.profiles.models import ProfilePost, ProfilePostVote
+
+BENCH_AUTHOR = "bench_votes"
+BENCH_VOTER_PREFIX = "bench_voter_"
+
+MODES = {
+    # Step-by-step transaction: SELECT FOR UPDATE, INSERT/UPDATE/DELETE, UPDATE counters, SELECT score.
+    "orm": lambda post_id, user_id, value: counters._toggle_vote_orm(post_id, user_id, value, None),
+    # Whatever toggle_vote picks for this database (one statement on PostgreSQL).
+    "statement": lambda post_id, user_id, value: counters.toggle_vote(post_id, user_id, value),
+}
+
+
+def percentile(values, p: float) -> float:
+    values = sorted(values)
+    k = max(0, min(len(values) - 1, int(round(p / 100 * (len(values) - 1)))))
+    return values[k]
+
+
+class Command(BaseCommand):
+    help = (
+        "Замер голосования за посты: голосов в секунду при N параллельных клиентах "
+        "(поток со своим соединением с БД на клиента), задержка одного голоса и "
+        "проверка, что счётчики после прогона не разошлись с голосами."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clients", type=int, default=16, help="Параллельных клиентов.")
+        parser.add_argument("--votes", type=int, default=500, help="Голосов на клиента.")
+        parser.add_argument(
+            "--posts", type=int, default=10, help="Постов, по которым размазаны голоса (1 — все бьют в одну строку)."
+        )
+        parser.add_argument("--mode", choices=[*MODES, "both"], default="both")
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        clients = max(1, options["clients"])
+        if connection.vendor == "sqlite" and clients > 1:
+            # SQLite takes one writer at a time; concurrent transactions fail with "database is locked".
+            raise CommandError("Параллельный замер нужен на PostgreSQL; на SQLite запускайте с --clients 1.")
+
+        modes = list(MODES) if options["mode"] == "both" else [options["mode"]]
+        if connection.vendor != "postgresql":
+            self.stdout.write("not PostgreSQL: 'statement' falls back to the same ORM path as 'orm'")
+
+        posts, voters = self._prepare(max(1, options["posts"]), clients)
+        header = f"{'mode':<10} {'clients':>7} {'votes':>7} {'votes/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'errors':>6}"
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        try:
+            for mode in modes:
+                ProfilePostVote.objects.filter(post__in=posts).delete()
+                ProfilePost.objects.filter(pk__in=posts).update(score=0, upvotes=0, downvotes=0)
+                result = self._run(MODES[mode], posts, voters, max(1, options["votes"]), options["seed"])
+                self.stdout.write(
+                    f"{mode:<10} {clients:>7} {result['votes']:>7} {result['per_s']:>9.0f} "
+                    f"{result['p50']:>8.2f} {result['p95']:>8.2f} {result['max']:>8.2f} {result['errors']:>6}"
+                )
+                drift = counters.reconcile(ProfilePost.objects.filter(pk__in=posts), dry_run=True)
+                if drift:
+                    self.stdout.write(self.style.ERROR(f"{mode}: counters drifted on {len(drift)} posts: {drift[:3]}"))
+                else:
+                    self.stdout.write(self.style.SUCCESS(f"{mode}: counters match votes"))
+        finally:
+            ProfilePost.objects.filter(pk__in=posts).delete()
+
+    def _prepare(self, posts: int, clients: int) -> tuple[list, list]:
+        User = get_user_model()
+        author, _ = User.objects.get_or_create(username=BENCH_AUTHOR)
+        ProfilePost.objects.filter(author=author).delete()
+        post_ids = [ProfilePost.objects.create(author=author, text=f"bench #{i}").pk for i in range(posts)]
+        voters = [User.objects.get_or_create(username=f"{BENCH_VOTER_PREFIX}{i}")[0].pk for i in range(clients)]
+        return post_ids, voters
+
+    def _run(self, vote, posts: list, voters: list, votes: int, seed: int) -> dict:
+        timings = []
+        errors = []
+        start = threading.Barrier(len(voters) + 1)
+
+        def client(index: int, user_id: int):
+            rnd = random.Random(seed + index)
+            own = []
+            start.wait()
+            try:
+                for _ in range(votes):
+                    post_id = rnd.choice(posts)
+                    # Mostly the same button twice (set, then unset), sometimes a switch.
+                    value = 1 if rnd.random() < 0.7 else -1
+                    began = time.perf_counter()
+                    try:
+                        vote(post_id, user_id, value)
+                    except OperationalError:
+                        # Deadlock / serialization failure: counted, the client goes on.
+                        errors.append(1)
+                        continue
+                    own.append((time.perf_counter() - began) * 1000)
+            finally:
+                timings.extend(own)
+                connections.close_all()
+
+        threads = [threading.Thread(target=client, args=(i, user_id)) for i, user_id in enumerate(voters)]
+        for thread in threads:
+            thread.start()
+        start.wait()
+        began = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = max(1e-9, time.perf_counter() - began)
+        return {
+            "votes": len(timings),
+            "per_s": len(timings) / elapsed,
+            "p50": statistics.median(timings) if timings else 0.0,
+            "p95": percentile(timings, 95) if timings else 0.0,
+            "max": max(timings) if timings else 0.0,
+            "errors": len(errors),
+        }
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from apps.profiles import timeline
+from apps.profiles.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = "Сверка UserProfile.followers_count с подписками (Follow)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", type=int, action="append", dest="users", help="Только этот пользователь (можно несколько).")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Профилей за один запрос сверки.")
+        parser.add_argument("--dry-run", action="store_true", help="Только показать расхождения.")
+
+    def handle(self, *args, **options):
+        qs = UserProfile.objects.all()
+        if options["users"]:
+            qs = qs.filter(user_id__in=options["users"])
+        fixed = timeline.reconcile_followers(qs, batch_size=max(1, options["batch_size"]), dry_run=options["dry_run"])
+        for user_id, old, new in fixed:
+            self.stdout.write(f"user #{user_id}: followers_count {old} -> {new}")
+        verb = "Расходится" if options["dry_run"] else "Исправлено"
+        self.stdout.write(self.style.SUCCESS(f"{verb}: {len(fixed)} профилей."))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from apps.profiles import counters
+from apps.profiles.models import ProfilePost
+
+
+class Command(BaseCommand):
+    help = "Сверка счётчиков постов (score, upvotes, downvotes, comments_count) с голосами и комментариями."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--post", type=int, action="append", dest="posts", help="Только этот пост (можно несколько).")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Постов за один запрос сверки.")
+        parser.add_argument("--dry-run", action="store_true", help="Только показать расхождения.")
+
+    def handle(self, *args, **options):
+        qs = ProfilePost.objects.all()
+        if options["posts"]:
+            qs = qs.filter(pk__in=options["posts"])
+        fixed = counters.reconcile(qs, batch_size=max(1, options["batch_size"]), dry_run=options["dry_run"])
+        for row in fixed:
+            changes = ", ".join(f"{name} {old} -> {new}" for name, (old, new) in row.items() if name != "id")
+            self.stdout.write(f"post #{row['id']}: {changes}")
+        verb = "Расходится" if options["dry_run"] else "Исправлено"
+        self.stdout.write(self.style.SUCCESS(f"{verb}: {len(fixed)} постов."))
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.2 on 2026-10-18
+
+import apps.core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0002_storedblob"),
+        ("profiles", "0005_rename_profiles_pr_author__a4b2fb_idx_profiles_pr_author__da51f5_idx_and_more"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="profilepostmedia",
+            name="file",
+            field=models.ImageField(
+                db_index=False, storage=apps.core.storage.content_storage, upload_to="profile_posts/"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="userprofile",
+            name="avatar",
+            field=models.ImageField(
+                blank=True, null=True, storage=apps.core.storage.content_storage, upload_to="avatars/"
+            ),
+        ),
+    ]
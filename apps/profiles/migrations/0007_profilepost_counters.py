@@ -0,0 +1,59 @@
+# Generated by Django 5.1.2 on 2026-10-18
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    ProfilePost = apps.get_model("profiles", "ProfilePost")
+    ProfilePostVote = apps.get_model("profiles", "ProfilePostVote")
+    ProfilePostComment = apps.get_model("profiles", "ProfilePostComment")
+
+    def votes(aggregate):
+        qs = ProfilePostVote.objects.filter(post=OuterRef("pk")).order_by().values("post")
+        return Coalesce(Subquery(qs.annotate(v=aggregate).values("v")[:1]), Value(0), output_field=IntegerField())
+
+    comments = (
+        ProfilePostComment.objects.filter(post=OuterRef("pk"), is_deleted=False)
+        .order_by()
+        .values("post")
+        .annotate(c=Count("pk"))
+        .values("c")[:1]
+    )
+    ProfilePost.objects.update(
+        score=votes(Sum("value")),
+        upvotes=votes(Count("pk", filter=Q(value=1))),
+        downvotes=votes(Count("pk", filter=Q(value=-1))),
+        comments_count=Coalesce(Subquery(comments), Value(0), output_field=IntegerField()),
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("profiles", "0006_content_addressed_media"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="profilepost",
+            name="score",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="profilepost",
+            name="upvotes",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="profilepost",
+            name="downvotes",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="profilepost",
+            name="comments_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,10 @@
 from django.conf import settings
 from django.db import models
 from apps.core.models import TimeStampedModel
+from apps.core.storage import content_storage
+
+# Изображений в посте не больше этого (загрузка, редактирование, лента).
+POST_MEDIA_LIMIT = 8
 
 
 class UserProfile(TimeStampedModel):
@@ -15,7 +19,7 @@ class UserProfile(TimeStampedModel):
         related_name="profile",
     )
     display_name = models.CharField(max_length=150, db_index=True)
-    avatar = models.ImageField(upload_to="avatars/", blank=True, null=True)
+    avatar = models.ImageField(upload_to="avatars/", blank=True, null=True, storage=content_storage)
     bio = models.TextField(blank=True)
     language = models.CharField(
         max_length=5,
@@ -29,6 +33,8 @@ class UserProfile(TimeStampedModel):
         default=Role.USER,
         db_index=True,
     )
+    # Denormalized, kept by timeline.follow/unfollow: picks push or pull mode for the author's posts.
+    followers_count = models.PositiveIntegerField(default=0)
 
     class Meta:
         indexes = [
@@ -66,6 +72,13 @@ class ProfilePost(TimeStampedModel):
     comments_enabled = models.BooleanField(default=True, db_index=True)
     is_deleted = models.BooleanField(default=False, db_index=True)
 
+    # Denormalized counters, kept exact by the vote/comment write paths in counters.py;
+    # `manage.py reconcile_post_counters` repairs any drift.
+    score = models.IntegerField(default=0)
+    upvotes = models.PositiveIntegerField(default=0)
+    downvotes = models.PositiveIntegerField(default=0)
+    comments_count = models.PositiveIntegerField(default=0)
+
     class Meta:
         ordering = ["-is_pinned", "-created_at"]
         indexes = [
@@ -85,7 +98,7 @@ class ProfilePost(TimeStampedModel):
 
 class ProfilePostMedia(TimeStampedModel):
     """
-    Медиафайлы поста (до 8 изображений).
+    Медиафайлы поста (до POST_MEDIA_LIMIT изображений).
     """
 
     post = models.ForeignKey(
@@ -94,7 +107,7 @@ class ProfilePostMedia(TimeStampedModel):
         related_name="media_items",
         db_index=True,
     )
-    file = models.ImageField(upload_to="profile_posts/", db_index=False)
+    file = models.ImageField(upload_to="profile_posts/", db_index=False, storage=content_storage)
     position = models.PositiveIntegerField(default=0, db_index=True)
 
     class Meta:
@@ -156,9 +169,32 @@ class ProfilePostComment(TimeStampedModel):
         ]
 
 
+class Follow(TimeStampedModel):
+    """
+    Подписка follower -> followee: посты followee попадают в домашнюю
+    ленту follower (timeline.py).
+    """
 
+    follower = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="following",
+    )
+    followee = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="followers",
+    )
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["follower", "followee"], name="profiles_follow_uniq"),
+            models.CheckConstraint(condition=~models.Q(follower=models.F("followee")), name="profiles_follow_not_self"),
+        ]
+        indexes = [
+            # Fan-out walks the followers of an author.
+            models.Index(fields=["followee", "follower"], name="profiles_follow_followee"),
+        ]
 
-
-
-
+    def __str__(self) -> str:
+        return f"{self.follower_id} -> {self.followee_id}"
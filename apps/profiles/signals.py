@@ -0,0 +1,32 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.core.storage import track_file_field
+
+from . import timeline
+from .models import Follow, ProfilePost, ProfilePostMedia, UserProfile
+from .tasks import enqueue_fan_out
+
+# Reference counting for content-addressed uploads (apps/core/storage.py).
+track_file_field(UserProfile, "avatar")
+track_file_field(ProfilePostMedia, "file")
+
+
+@receiver(post_save, sender=ProfilePost)
+def post_created(sender, instance, created, raw=False, **kwargs):
+    """Новый пост — в домашние ленты подписчиков (timeline.fan_out), после коммита."""
+    if created and not raw:
+        transaction.on_commit(lambda: enqueue_fan_out(instance.pk))
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        timeline.followed(instance.follower_id, instance.followee_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    """Любое удаление подписки (отписка, админка, каскад от удалённого пользователя)."""
+    timeline.unfollowed(instance.follower_id, instance.followee_id)
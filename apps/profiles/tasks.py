@@ -0,0 +1,26 @@
+import logging
+
+from celery import shared_task
+
+from . import timeline
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True, ignore_result=True, max_retries=3)
+def fan_out_post(self, post_id: int) -> None:
+    try:
+        timeline.fan_out(post_id)
+    except Exception as exc:
+        # LPUSH/LTRIM are per follower and the post id is deduplicated on read, so a retry is safe.
+        raise self.retry(exc=exc, countdown=10 * (self.request.retries + 1))
+
+
+def enqueue_fan_out(post_id: int) -> None:
+    """Недоступный брокер не должен ронять публикацию: лента подберёт пост при пересборке."""
+    if not timeline.is_enabled():
+        return
+    try:
+        fan_out_post.delay(post_id)
+    except Exception:
+        logger.warning("cannot enqueue timeline fan-out for post %s", post_id, exc_info=True)
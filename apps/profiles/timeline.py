@@ -0,0 +1,301 @@
+"""
+Подписки и домашняя лента (посты тех, на кого подписан пользователь, и свои).
+
+Гибрид push/pull:
+- push: новый пост автора с числом подписчиков меньше
+  TIMELINE_PULL_THRESHOLD задача fan_out_post раскладывает в Redis-списки
+  подписчиков ("timeline:home:<user_id>", не длиннее TIMELINE_LENGTH);
+- pull: посты авторов с большим числом подписчиков никуда не копируются
+  (иначе один пост — миллион записей), их последние id читаются из БД при
+  открытии ленты — один запрос по индексу (author, is_deleted, ...).
+
+Чтение: id из списка + id «тяжёлых» авторов сливаются, сортируются по
+убыванию id, и страница гидрируется одним in_bulk. Удалённые посты
+отсеивает гидрация, так что удаление не трогает списки.
+
+Списки живут TIMELINE_TTL и пополняются только существующие (LPUSHX):
+неактивные пользователи не занимают память, их лента пересобирается из
+БД при следующем открытии (rebuild). Подписка и отписка сбрасывают список
+подписчика — новый автор появляется в ленте сразу с его прошлыми постами.
+Свой пост всегда попадает в собственный список автора, даже в pull-режиме.
+Когда автор опускается ниже порога (отписка), списки всех его подписчиков
+сбрасываются: посты, сделанные в pull-режиме, в них не попадали. При
+переходе вверх сброс не нужен — старые посты уже в списках, новые читаются
+из БД, повторы убирает слияние.
+
+followers_count и сбросы при подписке/отписке делают сигналы Follow
+(followed/unfollowed), так что каскадное удаление подписок тоже учтено;
+reconcile_followers (команда reconcile_follow_counters) чинит расхождения.
+
+Без django-redis (dev-настройки) лента целиком читается из БД (pull).
+"""
+
+import logging
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import POST_MEDIA_LIMIT, Follow, ProfilePost, ProfilePostMedia, UserProfile
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 20
+# Marks a rebuilt list that may be empty; never a real post id.
+SENTINEL = b"0"
+
+
+def is_enabled() -> bool:
+    return "django_redis" in settings.CACHES["default"]["BACKEND"]
+
+
+def _redis():
+    from django_redis import get_redis_connection
+
+    return get_redis_connection("default")
+
+
+def _key(user_id: int) -> str:
+    return f"timeline:home:{user_id}"
+
+
+def length() -> int:
+    return int(getattr(settings, "TIMELINE_LENGTH", 800))
+
+
+def ttl() -> int:
+    return int(getattr(settings, "TIMELINE_TTL", 7 * 24 * 3600))
+
+
+def pull_threshold() -> int:
+    return int(getattr(settings, "TIMELINE_PULL_THRESHOLD", 10000))
+
+
+# --- подписки ---
+
+
+def follow(follower, followee) -> bool:
+    """Подписывает; False — уже подписан или это сам пользователь."""
+    if follower.pk == followee.pk:
+        return False
+    UserProfile.objects.get_or_create(user=followee, defaults={"display_name": followee.username})
+    try:
+        with transaction.atomic():
+            Follow.objects.create(follower=follower, followee=followee)
+    except IntegrityError:
+        return False
+    return True
+
+
+def unfollow(follower, followee) -> bool:
+    deleted, _ = Follow.objects.filter(follower=follower, followee=followee).delete()
+    return bool(deleted)
+
+
+def followed(follower_id: int, followee_id: int) -> None:
+    UserProfile.objects.filter(user_id=followee_id).update(followers_count=F("followers_count") + 1)
+    transaction.on_commit(lambda: invalidate(follower_id))
+
+
+def unfollowed(follower_id: int, followee_id: int) -> None:
+    UserProfile.objects.filter(user_id=followee_id, followers_count__gt=0).update(
+        followers_count=F("followers_count") - 1
+    )
+    count = UserProfile.objects.filter(user_id=followee_id).values_list("followers_count", flat=True).first()
+    transaction.on_commit(lambda: invalidate(follower_id))
+    if count == pull_threshold() - 1:
+        # Back to push mode: posts made while pulled are in nobody's list, rebuild them all.
+        transaction.on_commit(lambda: invalidate_followers(followee_id))
+
+
+def reconcile_followers(queryset=None, *, batch_size: int = 1000, dry_run: bool = False) -> list[tuple]:
+    """
+    Сверяет UserProfile.followers_count с подписками пачками по batch_size
+    профилей. Возвращает исправленные: [(user_id, было, стало)].
+    """
+    queryset = (queryset if queryset is not None else UserProfile.objects.all()).order_by("pk")
+    true_count = Subquery(
+        Follow.objects.filter(followee_id=OuterRef("user_id"))
+        .order_by()
+        .values("followee_id")
+        .annotate(n=Count("pk"))
+        .values("n"),
+        output_field=IntegerField(),
+    )
+    true_count = Coalesce(true_count, 0)
+    fixed = []
+    last_pk = 0
+    while True:
+        ids = list(queryset.filter(pk__gt=last_pk).values_list("pk", flat=True)[:batch_size])
+        if not ids:
+            break
+        last_pk = ids[-1]
+        rows = UserProfile.objects.filter(pk__in=ids).annotate(true_count=true_count)
+        for pk, user_id, old, new in rows.values_list("pk", "user_id", "followers_count", "true_count"):
+            if old == new:
+                continue
+            fixed.append((user_id, old, new))
+            if dry_run:
+                continue
+            # Recomputed inside the UPDATE, so follows since the SELECT above are not lost.
+            UserProfile.objects.filter(pk=pk).update(followers_count=true_count)
+            if old >= pull_threshold() > new:
+                transaction.on_commit(lambda user_id=user_id: invalidate_followers(user_id))
+    return fixed
+
+
+def is_pulled(author_id: int) -> bool:
+    count = UserProfile.objects.filter(user_id=author_id).values_list("followers_count", flat=True).first()
+    return (count or 0) >= pull_threshold()
+
+
+# --- push ---
+
+
+def fan_out(post_id: int, batch_size: int = 1000) -> int:
+    """
+    Кладёт пост в списки подписчиков автора и самого автора (в pull-режиме —
+    только автора). Возвращает, сколько списков затронуто; 0 — Redis не используется.
+    """
+    if not is_enabled():
+        return 0
+    post = ProfilePost.objects.filter(pk=post_id, is_deleted=False).values("author_id").first()
+    if post is None:
+        return 0
+    author_id = post["author_id"]
+    followers = Follow.objects.filter(followee_id=author_id).values_list("follower_id", flat=True)
+    # A pulled author's followers read the post from the DB, but the author's own list
+    # is push-only (_pushed_authors always includes the user): it still gets the post.
+    recipients = [author_id] if is_pulled(author_id) else [author_id, *followers.iterator(chunk_size=batch_size)]
+    touched = 0
+    pipe = _redis().pipeline(transaction=False)
+    for user_id in recipients:
+        # LPUSHX: lists of users who haven't opened the feed lately are rebuilt on read instead.
+        pipe.lpushx(_key(user_id), post_id)
+        pipe.ltrim(_key(user_id), 0, length() - 1)
+        touched += 1
+        if touched % batch_size == 0:
+            pipe.execute()
+    pipe.execute()
+    return touched
+
+
+def invalidate(user_id: int) -> None:
+    if not is_enabled():
+        return
+    try:
+        _redis().delete(_key(user_id))
+    except Exception:
+        logger.warning("timeline invalidate failed for user %s", user_id, exc_info=True)
+
+
+def invalidate_followers(author_id: int, batch_size: int = 1000) -> None:
+    """Сбрасывает списки всех подписчиков автора (пересоберутся при чтении)."""
+    if not is_enabled():
+        return
+    followers = Follow.objects.filter(followee_id=author_id).values_list("follower_id", flat=True)
+    try:
+        pipe = _redis().pipeline(transaction=False)
+        for n, user_id in enumerate(followers.iterator(chunk_size=batch_size), 1):
+            pipe.delete(_key(user_id))
+            if n % batch_size == 0:
+                pipe.execute()
+        pipe.execute()
+    except Exception:
+        logger.warning("timeline invalidate failed for followers of %s", author_id, exc_info=True)
+
+
+def _pushed_authors(user_id: int) -> list[int]:
+    """Авторы, чьи посты пользователь получает через список: он сам и «лёгкие» подписки."""
+    light = Follow.objects.filter(follower_id=user_id, followee__profile__followers_count__lt=pull_threshold())
+    return [user_id, *light.values_list("followee_id", flat=True)]
+
+
+def _pulled_authors(user_id: int) -> list[int]:
+    return list(
+        Follow.objects.filter(
+            follower_id=user_id, followee__profile__followers_count__gte=pull_threshold()
+        ).values_list("followee_id", flat=True)
+    )
+
+
+def _recent_ids(author_ids, before: int | None, limit: int) -> list[int]:
+    if not author_ids:
+        return []
+    qs = ProfilePost.objects.filter(author_id__in=author_ids, is_deleted=False)
+    if before:
+        qs = qs.filter(pk__lt=before)
+    return list(qs.order_by("-id").values_list("pk", flat=True)[:limit])
+
+
+def rebuild(user_id: int) -> list[int]:
+    """Пересобирает список из БД (последние TIMELINE_LENGTH постов push-авторов)."""
+    ids = _recent_ids(_pushed_authors(user_id), None, length())
+    pipe = _redis().pipeline()
+    pipe.delete(_key(user_id))
+    pipe.rpush(_key(user_id), *ids, SENTINEL)
+    pipe.expire(_key(user_id), ttl())
+    pipe.execute()
+    return ids
+
+
+def _pushed_ids(user_id: int) -> list[int] | None:
+    """id из Redis-списка (пересобирает при отсутствии); None — Redis недоступен."""
+    try:
+        r = _redis()
+        raw = r.lrange(_key(user_id), 0, -1)
+        if not raw:
+            return rebuild(user_id)
+        r.expire(_key(user_id), ttl())
+    except Exception:
+        logger.warning("timeline read failed for user %s", user_id, exc_info=True)
+        return None
+    return [int(pk) for pk in raw if pk != SENTINEL]
+
+
+# --- чтение ---
+
+
+def page_ids(user_id: int, before: int | None = None, limit: int = PAGE_SIZE) -> tuple[list[int], bool]:
+    """
+    id постов страницы (новые сверху) и есть ли следующая. before — id
+    последнего поста предыдущей страницы.
+    """
+    pushed = _pushed_ids(user_id) if is_enabled() else None
+    if pushed is None:
+        # Pure pull: no Redis, or Redis is down.
+        ids = _recent_ids([*_pushed_authors(user_id), *_pulled_authors(user_id)], before, limit + 1)
+        return ids[:limit], len(ids) > limit
+
+    candidates = [pk for pk in pushed if before is None or pk < before]
+    if len(candidates) <= limit and len(pushed) >= length():
+        # Scrolled past the capped list: older push posts come from the DB.
+        floor = min(pushed) if before is None else min(min(pushed), before)
+        candidates += _recent_ids(_pushed_authors(user_id), floor, limit + 1)
+    candidates += _recent_ids(_pulled_authors(user_id), before, limit + 1)
+    ids = sorted(set(candidates), reverse=True)
+    return ids[:limit], len(ids) > limit
+
+
+def hydrate(ids: list[int]) -> list[ProfilePost]:
+    """Посты по id в заданном порядке; удалённые и пропавшие выпадают."""
+    posts = (
+        ProfilePost.objects.filter(is_deleted=False)
+        .select_related("author", "author__profile")
+        .prefetch_related(
+            Prefetch(
+                "media_items",
+                queryset=ProfilePostMedia.objects.order_by("position", "created_at", "id")[:POST_MEDIA_LIMIT],
+                to_attr="media_list",
+            )
+        )
+        .in_bulk(ids)
+    )
+    return [posts[pk] for pk in ids if pk in posts]
+
+
+def home(user, before: int | None = None, limit: int = PAGE_SIZE) -> tuple[list[ProfilePost], int | None]:
+    """Страница домашней ленты и курсор (id) следующей или None."""
+    ids, has_next = page_ids(user.pk, before, limit)
+    return hydrate(ids), (ids[-1] if has_next and ids else None)
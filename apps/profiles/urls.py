@@ -8,10 +8,13 @@ urlpatterns = [
     path("", views.ProfileDetailView.as_view(), name="detail"),
     path("edit/", views.ProfileUpdateView.as_view(), name="edit"),
     path("settings/", views.ProfileSettingsView.as_view(), name="settings"),
+    path("home/", views.HomeTimelineView.as_view(), name="home"),
+    path("follow/", views.FollowToggleView.as_view(), name="follow"),
     path("posts/create/", views.ProfilePostCreateView.as_view(), name="post_create"),
     path("posts/<int:pk>/edit/", views.ProfilePostUpdateView.as_view(), name="post_edit"),
     path("posts/<int:pk>/pin/", views.ProfilePostTogglePinView.as_view(), name="post_pin"),
     path("posts/<int:pk>/vote/", views.ProfilePostVoteView.as_view(), name="post_vote"),
+    path("posts/<int:pk>/comments/", views.ProfilePostCommentListView.as_view(), name="post_comments"),
     path(
         "posts/<int:pk>/comments/create/",
         views.ProfilePostCommentCreateView.as_view(),
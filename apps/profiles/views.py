@@ -1,18 +1,23 @@
+from django.contrib.auth import get_user_model
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.core.paginator import Paginator
 from django.db import models
-from django.db.models import Count, Prefetch, Q, Sum
-from django.db.models.functions import Coalesce
+from django.db.models import Prefetch
 from django.http import Http404, JsonResponse
 from django.views.generic import DetailView, UpdateView, TemplateView
-from django.urls import reverse_lazy
-from django.shortcuts import redirect
+from django.urls import reverse, reverse_lazy
+from django.shortcuts import get_object_or_404, redirect
+from django.template.loader import render_to_string
 from django.views import View
+from django.utils.cache import patch_vary_headers
 
+from apps.core.pagination import CursorPaginator, InvalidCursor, cursor_url, page_json_response, wants_json
+
+from . import comments, counters, timeline
 from .models import (
+    POST_MEDIA_LIMIT,
+    Follow,
     UserProfile,
     ProfilePost,
-    ProfilePostComment,
     ProfilePostMedia,
     ProfilePostVote,
 )
@@ -22,6 +27,7 @@ from .forms import UserProfileForm, ProfilePostForm
 class ProfileDetailView(LoginRequiredMixin, DetailView):
     model = UserProfile
     template_name = "profiles/profile_detail.html"
+    posts_per_page = 10
 
     def get_object(self, queryset=None):
         profile, _ = UserProfile.objects.get_or_create(
@@ -33,12 +39,19 @@ class ProfileDetailView(LoginRequiredMixin, DetailView):
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
         posts_qs = (
+            # score/comments_count are columns on the post (counters.py): no joins, no GROUP BY.
             ProfilePost.objects.filter(author=self.request.user, is_deleted=False)
-            .annotate(vote_score=Coalesce(Sum("votes__value"), 0))
-            .annotate(
-                comments_count=Count("comments", filter=Q(comments__is_deleted=False), distinct=True)
+            # One query for the whole page, at most POST_MEDIA_LIMIT rows per post
+            # (sliced Prefetch -> ROW_NUMBER() window); the template only reads post.media_list.
+            .prefetch_related(
+                Prefetch(
+                    "media_items",
+                    queryset=ProfilePostMedia.objects.order_by("position", "created_at", "id")[:POST_MEDIA_LIMIT],
+                    to_attr="media_list",
+                )
             )
-            .prefetch_related("media_items")
+            # Newest comments only; the rest of a thread comes from ProfilePostCommentListView.
+            .prefetch_related(comments.latest_prefetch())
             .prefetch_related(
                 Prefetch(
                     "votes",
@@ -49,15 +62,34 @@ class ProfileDetailView(LoginRequiredMixin, DetailView):
             # Ensure newest posts are always above older ones (stable ordering).
             .order_by("-is_pinned", "-created_at", "-id")
         )
-        paginator = Paginator(posts_qs, 10)
-        page_number = self.request.GET.get("page") or 1
-        page_obj = paginator.get_page(page_number)
+        # Keyset-пагинация: без COUNT и OFFSET, глубокие страницы стоят как первая.
+        paginator = CursorPaginator(posts_qs, self.posts_per_page)
+        try:
+            page_obj = paginator.page(self.request.GET.get("cursor"))
+        except InvalidCursor:
+            raise Http404
         ctx["page_obj"] = page_obj
         ctx["is_paginated"] = page_obj.has_other_pages()
+        ctx["next_page_url"] = cursor_url(self.request, page_obj.next_cursor)
+        ctx["previous_page_url"] = cursor_url(self.request, page_obj.previous_cursor)
+        for post in page_obj.object_list:
+            post.media_count = len(post.media_list)
+            cursor = comments.more_cursor(post)
+            post.comments_more_url = (
+                f"{reverse('profiles:post_comments', args=[post.pk])}?cursor={cursor}" if cursor else None
+            )
         ctx["posts"] = page_obj.object_list
         ctx["post_form"] = ProfilePostForm()
         return ctx
 
+    def render_to_response(self, context, **response_kwargs):
+        # profile_posts.js подгружает следующую порцию постов как JSON.
+        if wants_json(self.request):
+            return page_json_response(self.request, context["page_obj"], "profiles/_post_cards.html", context)
+        response = super().render_to_response(context, **response_kwargs)
+        patch_vary_headers(response, ["Accept"])
+        return response
+
 
 class ProfileUpdateView(LoginRequiredMixin, UpdateView):
     model = UserProfile
@@ -84,7 +116,7 @@ class ProfilePostCreateView(LoginRequiredMixin, View):
             post = form.save(commit=False)
             post.author = request.user
             post.save()
-            images = request.FILES.getlist("media")[:8]
+            images = request.FILES.getlist("media")[:POST_MEDIA_LIMIT]
             for idx, img in enumerate(images):
                 ProfilePostMedia.objects.create(post=post, file=img, position=idx)
         return redirect("profiles:detail")
@@ -116,9 +148,9 @@ class ProfilePostUpdateView(LoginRequiredMixin, View):
                     m.position = idx
                     m.save(update_fields=["position"])
 
-            # Add new images on edit (up to 8 total)
+            # Add new images on edit (up to POST_MEDIA_LIMIT total)
             existing = len(remaining_media)
-            remaining_slots = max(0, 8 - existing)
+            remaining_slots = max(0, POST_MEDIA_LIMIT - existing)
             if remaining_slots:
                 new_images = request.FILES.getlist("media")[:remaining_slots]
                 for i, img in enumerate(new_images):
@@ -163,9 +195,6 @@ class ProfilePostDeleteView(LoginRequiredMixin, View):
 
 class ProfilePostVoteView(LoginRequiredMixin, View):
     def post(self, request, pk: int):
-        post = ProfilePost.objects.filter(pk=pk, author=request.user, is_deleted=False).first()
-        if not post:
-            raise Http404
         try:
             value = int(request.POST.get("value"))
         except (TypeError, ValueError):
@@ -173,30 +202,37 @@ class ProfilePostVoteView(LoginRequiredMixin, View):
         if value not in (-1, 1):
             return redirect("profiles:detail")
 
-        vote = ProfilePostVote.objects.filter(post=post, user=request.user).first()
-        if vote and vote.value == value:
-            vote.delete()
-        elif vote:
-            vote.value = value
-            vote.save(update_fields=["value"])
-        else:
-            ProfilePostVote.objects.create(post=post, user=request.user, value=value)
+        # Post check, vote toggle and score update in one statement (counters.TOGGLE_VOTE_SQL).
+        result = counters.toggle_vote(pk, request.user.pk, value, author_id=request.user.pk)
+        if result is None:
+            raise Http404
+        score, delta, current = result
 
         wants_json = (
             request.headers.get("x-requested-with") == "XMLHttpRequest"
             or "application/json" in (request.headers.get("accept") or "")
         )
         if wants_json:
-            score = (
-                ProfilePostVote.objects.filter(post=post).aggregate(s=Coalesce(Sum("value"), 0)).get("s")
-                or 0
-            )
-            current = ProfilePostVote.objects.filter(post=post, user=request.user).values_list("value", flat=True).first()
-            return JsonResponse({"ok": True, "score": int(score), "user_vote": current or 0})
+            return JsonResponse({"ok": True, "score": score, "delta": delta, "user_vote": current})
 
         return redirect("profiles:detail")
 
 
+class ProfilePostCommentListView(LoginRequiredMixin, View):
+    """Следующая порция ветки для «Показать ещё»: {"ok", "html", "next"}."""
+
+    def get(self, request, pk: int):
+        if not ProfilePost.objects.filter(pk=pk, author=request.user, is_deleted=False).exists():
+            raise Http404
+        try:
+            page_obj = comments.page(pk, request.GET.get("cursor"))
+        except InvalidCursor:
+            raise Http404
+        return page_json_response(
+            request, page_obj, "profiles/_post_comments.html", {"comments": page_obj.object_list}
+        )
+
+
 class ProfilePostCommentCreateView(LoginRequiredMixin, View):
     def post(self, request, pk: int):
         post = ProfilePost.objects.filter(pk=pk, author=request.user, is_deleted=False).first()
@@ -206,11 +242,56 @@ class ProfilePostCommentCreateView(LoginRequiredMixin, View):
             return redirect("profiles:detail")
         text = (request.POST.get("text") or "").strip()
         if text:
-            ProfilePostComment.objects.create(post=post, author=request.user, text=text[:2000])
+            counters.add_comment(post, request.user, text[:2000])
         return redirect("profiles:detail")
 
 
+class HomeTimelineView(LoginRequiredMixin, TemplateView):
+    """Домашняя лента: свои посты и посты подписок (timeline.py), курсор — ?before=<id поста>."""
+
+    template_name = "profiles/home.html"
+
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        raw = self.request.GET.get("before") or ""
+        if raw and not raw.isdigit():
+            raise Http404
+        posts, next_before = timeline.home(self.request.user, int(raw) if raw else None)
+        ctx["posts"] = posts
+        ctx["next_page_url"] = f"{self.request.path}?before={next_before}" if next_before else None
+        ctx["following"] = (
+            Follow.objects.filter(follower=self.request.user)
+            .select_related("followee")
+            .order_by("-created_at")[:50]
+        )
+        return ctx
+
+    def render_to_response(self, context, **response_kwargs):
+        # profile_posts.js подгружает следующую порцию как JSON.
+        if wants_json(self.request):
+            html = render_to_string("profiles/_timeline_cards.html", context, request=self.request)
+            response = JsonResponse({"ok": True, "html": html, "next": context["next_page_url"]})
+        else:
+            response = super().render_to_response(context, **response_kwargs)
+        patch_vary_headers(response, ["Accept"])
+        return response
 
 
+class FollowToggleView(LoginRequiredMixin, View):
+    """Подписаться на пользователя username или отписаться от него."""
 
+    def post(self, request):
+        followee = get_object_or_404(get_user_model(), username=(request.POST.get("username") or "").strip())
+        if followee.pk == request.user.pk:
+            following = False
+        elif Follow.objects.filter(follower=request.user, followee=followee).exists():
+            timeline.unfollow(request.user, followee)
+            following = False
+        else:
+            timeline.follow(request.user, followee)
+            following = True
 
+        if wants_json(request):
+            followers = UserProfile.objects.filter(user=followee).values_list("followers_count", flat=True).first()
+            return JsonResponse({"ok": True, "following": following, "followers": followers or 0})
+        return redirect("profiles:home")
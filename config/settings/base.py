@@ -152,9 +152,61 @@ CACHES = {
     }
 }
 
+# pg_trgm word_similarity threshold for fuzzy title search in the library (0..1)
+LIBRARY_TRIGRAM_THRESHOLD = env.float("LIBRARY_TRIGRAM_THRESHOLD", default=0.3)
+
+# Widths (px) of the WebP/JPEG variants built for ItemMedia images (srcset in cards)
+LIBRARY_MEDIA_VARIANT_WIDTHS = env.list("LIBRARY_MEDIA_VARIANT_WIDTHS", cast=int, default=[320, 640, 1280])
+
+# Barcode/ISBN lookup cache TTLs (seconds) per source; "miss" applies to empty answers
+LIBRARY_BARCODE_CACHE_TTL = {
+    "openlibrary": env.int("LIBRARY_BARCODE_TTL_OPENLIBRARY", default=7 * 24 * 3600),
+    "wikidata": env.int("LIBRARY_BARCODE_TTL_WIKIDATA", default=3 * 24 * 3600),
+    "google": env.int("LIBRARY_BARCODE_TTL_GOOGLE", default=24 * 3600),
+    "miss": env.int("LIBRARY_BARCODE_TTL_MISS", default=3600),
+}
+
+# Threads per process for querying barcode sources in parallel
+LIBRARY_BARCODE_MAX_WORKERS = env.int("LIBRARY_BARCODE_MAX_WORKERS", default=8)
+
+# Batch scanning: codes per request and codes resolved at once (each lookup also uses the pool above)
+LIBRARY_BARCODE_BATCH_MAX = env.int("LIBRARY_BARCODE_BATCH_MAX", default=200)
+LIBRARY_BARCODE_BATCH_WORKERS = env.int("LIBRARY_BARCODE_BATCH_WORKERS", default=4)
+
+# Cover image proxy (FetchImageView): hard size cap, on-disk LRU cache and how long a cached copy is used
+# without revalidating it upstream; an empty LIBRARY_IMAGE_PROXY_CACHE_DIR disables the cache
+LIBRARY_IMAGE_PROXY_MAX_BYTES = env.int("LIBRARY_IMAGE_PROXY_MAX_BYTES", default=10 * 1024 * 1024)
+LIBRARY_IMAGE_PROXY_CACHE_DIR = env("LIBRARY_IMAGE_PROXY_CACHE_DIR", default=str(BASE_DIR / "var" / "image-proxy"))
+LIBRARY_IMAGE_PROXY_CACHE_MAX_BYTES = env.int("LIBRARY_IMAGE_PROXY_CACHE_MAX_BYTES", default=512 * 1024 * 1024)
+LIBRARY_IMAGE_PROXY_FRESH_SECONDS = env.int("LIBRARY_IMAGE_PROXY_FRESH_SECONDS", default=24 * 3600)
+
+# Barcode metadata providers to skip (names from apps.integrations.providers);
+# INTEGRATIONS_METADATA_PROVIDERS may replace the list, e.g. with StubProvider for offline load tests
+INTEGRATIONS_METADATA_DISABLED = env.list("INTEGRATIONS_METADATA_DISABLED", default=[])
+
 CELERY_BROKER_URL = env("CELERY_BROKER_URL", default="redis://redis:6379/1")
 CELERY_RESULT_BACKEND = env("CELERY_RESULT_BACKEND", default="redis://redis:6379/2")
 
+# Chat write-behind buffer (apps/chat/buffer.py): flush interval and per-chat batch size
+CHAT_WRITE_FLUSH_MS = env.int("CHAT_WRITE_FLUSH_MS", default=250)
+CHAT_WRITE_BATCH_SIZE = env.int("CHAT_WRITE_BATCH_SIZE", default=50)
+# Chat history page size; the newest page of every chat is cached for CHAT_HISTORY_CACHE_TTL seconds
+CHAT_HISTORY_PAGE_SIZE = env.int("CHAT_HISTORY_PAGE_SIZE", default=50)
+CHAT_HISTORY_CACHE_TTL = env.int("CHAT_HISTORY_CACHE_TTL", default=3600)
+# Chat presence: one coalesced frame per chat per interval; online and typing marks expire after these TTLs (seconds)
+CHAT_PRESENCE_INTERVAL_MS = env.int("CHAT_PRESENCE_INTERVAL_MS", default=1000)
+CHAT_PRESENCE_TTL = env.int("CHAT_PRESENCE_TTL", default=60)
+CHAT_TYPING_TTL = env.int("CHAT_TYPING_TTL", default=6)
+# How long a chat access decision (participant / community ban) is cached; membership changes reset it
+CHAT_ACCESS_CACHE_TTL = env.int("CHAT_ACCESS_CACHE_TTL", default=300)
+# Longer chat messages are rejected by ChatConsumer
+CHAT_MESSAGE_MAX_LENGTH = env.int("CHAT_MESSAGE_MAX_LENGTH", default=4000)
+# Home timeline: post ids kept per follower in Redis, idle lists expire after TIMELINE_TTL seconds;
+# authors with at least TIMELINE_PULL_THRESHOLD followers are read at request time instead of fanned out
+TIMELINE_LENGTH = env.int("TIMELINE_LENGTH", default=800)
+TIMELINE_TTL = env.int("TIMELINE_TTL", default=7 * 24 * 3600)
+TIMELINE_PULL_THRESHOLD = env.int("TIMELINE_PULL_THRESHOLD", default=10000)
+
 CHANNEL_LAYERS = {
     "default": {
         "BACKEND": "channels_redis.core.RedisChannelLayer",
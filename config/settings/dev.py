@@ -31,6 +31,9 @@ CHANNEL_LAYERS = {
     },
 }
 
+# Без брокера Celery-задачи (превью картинок и т.п.) выполняются сразу в процессе.
+CELERY_TASK_ALWAYS_EAGER = True
+
 PASSWORD_HASHERS = [
     "django.contrib.auth.hashers.PBKDF2PasswordHasher",
     "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
@@ -117,6 +117,9 @@
     const candEl = qs("#barcode-candidates", box);
     const applyBtn = qs("#barcode-apply-btn", box);
     const addCoverBtn = qs("#barcode-add-cover-btn", box);
+    const coverUrlInput = qs("#barcode-cover-url", box);
+    const coverNote = qs("#barcode-cover-note", box);
+    const coverClear = qs("#barcode-cover-clear", box);
     const hint = qs("#barcode-hint", box);
     const boxStatus = qs("#barcode-box-status", box);
     const preview = qs("#barcode-preview", box);
@@ -129,7 +132,6 @@
 
     const itemTitle = qs('input[name="title"]');
     const itemDesc = qs('textarea[name="description"]');
-    const imagesInput = qs("#id_images");
 
     let lastLookup = null; // {title, description, cover_url, authors}
     let stream = null;
@@ -408,42 +410,27 @@
       });
     }
 
-    // Add cover image into uploads (best-effort)
+    // Cover goes by URL only: the server downloads it after save and makes it the item cover.
+    function setServerCover(url) {
+      if (!coverUrlInput) return;
+      coverUrlInput.value = url || "";
+      show(coverNote, !!url);
+    }
+
     if (addCoverBtn) {
-      addCoverBtn.addEventListener("click", async () => {
-        if (!lastLookup || !lastLookup.cover_url || !imagesInput) return;
-        try {
-          const csrf = getCookie("csrftoken");
-          const res = await fetch("/library/api/fetch-image/", {
-            method: "POST",
-            headers: {
-              "Content-Type": "application/json",
-              ...(csrf ? { "X-CSRFToken": csrf } : {}),
-            },
-            body: JSON.stringify({ url: lastLookup.cover_url }),
-          });
-          const blob = await res.blob();
-          const file = new File([blob], "cover.jpg", { type: blob.type || "image/jpeg" });
-
-          // Append to existing input.files (if any) and trigger change.
-          const dt = new DataTransfer();
-          Array.from(imagesInput.files || []).forEach((f) => dt.items.add(f));
-          dt.items.add(file);
-          imagesInput.files = dt.files;
-          imagesInput.dispatchEvent(new Event("change", { bubbles: true }));
-
-          // After previews render, click last thumb so it becomes cover
-          setTimeout(() => {
-            const thumbs = document.querySelectorAll("#library-upload-previews .upload-thumb");
-            const last = thumbs && thumbs.length ? thumbs[thumbs.length - 1] : null;
-            if (last) last.click();
-          }, 30);
-        } catch (e) {
-          setStatus("Не удалось добавить обложку автоматически. Можно скачать её и загрузить вручную.");
-        }
+      addCoverBtn.addEventListener("click", () => {
+        if (!lastLookup) return;
+        // The URL that actually loaded in the preview (after fallbacks), not just the first guess.
+        const url = (coverImg && coverImg.getAttribute("src")) || lastLookup.cover_url || "";
+        if (!url) return;
+        setServerCover(url);
       });
     }
 
+    if (coverClear) {
+      coverClear.addEventListener("click", () => setServerCover(""));
+    }
+
     // Camera scan
     async function startCameraScan() {
       if (!modal || !video) return;
@@ -362,8 +362,8 @@
   }
 
   // Reuse "post" carousel behavior (track translateX + dots + arrows)
-  function initCarousels() {
-    const carousels = Array.from(document.querySelectorAll("[data-carousel]"));
+  function initCarousels(root) {
+    const carousels = Array.from((root || document).querySelectorAll("[data-carousel]"));
     if (!carousels.length) return;
 
     function qs(root, sel) {
@@ -535,6 +535,150 @@
     });
   }
 
+  // Typeahead for search inputs with [data-suggest-url] (library:suggest)
+  function initSuggest() {
+    const inputs = Array.from(document.querySelectorAll("input[data-suggest-url]"));
+    if (!inputs.length) return;
+
+    const groups = [
+      ["sections", "Разделы"],
+      ["items", "Предметы"],
+      ["tags", "Теги"],
+    ];
+
+    inputs.forEach((input) => {
+      const url = input.getAttribute("data-suggest-url") || "";
+      const box = document.createElement("div");
+      box.className = "library-suggest";
+      box.hidden = true;
+      input.insertAdjacentElement("afterend", box);
+
+      let timer = null;
+      let controller = null;
+      let links = [];
+      let active = -1;
+
+      function close() {
+        box.hidden = true;
+        box.innerHTML = "";
+        links = [];
+        active = -1;
+      }
+
+      function setActive(i) {
+        links.forEach((a, idx) => a.classList.toggle("is-active", idx === i));
+        active = i;
+      }
+
+      function render(data) {
+        box.innerHTML = "";
+        groups.forEach(([key, label]) => {
+          const entries = (data && data[key]) || [];
+          if (!entries.length) return;
+          const head = document.createElement("div");
+          head.className = "library-suggest-group";
+          head.textContent = label;
+          box.appendChild(head);
+          entries.forEach((entry) => {
+            const a = document.createElement("a");
+            a.className = "library-suggest-item";
+            a.href = entry.url || "#";
+            a.textContent = entry.title || "";
+            box.appendChild(a);
+          });
+        });
+        links = Array.from(box.querySelectorAll(".library-suggest-item"));
+        active = -1;
+        box.hidden = !links.length;
+      }
+
+      function load() {
+        const q = (input.value || "").trim();
+        if (!q) {
+          close();
+          return;
+        }
+        if (controller) controller.abort();
+        controller = new AbortController();
+        // Browser HTTP cache (short max-age + ETag) absorbs repeated prefixes while typing/erasing.
+        fetch(`${url}?q=${encodeURIComponent(q)}`, {
+          credentials: "same-origin",
+          headers: { Accept: "application/json" },
+          signal: controller.signal,
+        })
+          .then((r) => (r.ok ? r.json() : null))
+          .then((data) => {
+            if ((input.value || "").trim() === q) render(data);
+          })
+          .catch(() => {});
+      }
+
+      input.addEventListener("input", () => {
+        clearTimeout(timer);
+        timer = setTimeout(load, 150);
+      });
+
+      input.addEventListener("keydown", (e) => {
+        if (box.hidden || !links.length) return;
+        if (e.key === "ArrowDown") {
+          e.preventDefault();
+          setActive((active + 1) % links.length);
+        } else if (e.key === "ArrowUp") {
+          e.preventDefault();
+          setActive((active - 1 + links.length) % links.length);
+        } else if (e.key === "Enter" && active >= 0) {
+          e.preventDefault();
+          window.location.href = links[active].href;
+        } else if (e.key === "Escape") {
+          close();
+        }
+      });
+
+      document.addEventListener("click", (e) => {
+        if (e.target !== input && !box.contains(e.target)) close();
+      });
+    });
+  }
+
+  // Cursor pagination: append the next page of cards when the "next" link scrolls into view
+  function initInfiniteList() {
+    const list = document.querySelector("[data-infinite-list]");
+    const nav = document.querySelector("[data-cursor-pagination]");
+    const link = nav ? nav.querySelector("[data-cursor-next]") : null;
+    if (!list || !link || !("IntersectionObserver" in window)) return;
+
+    let loading = false;
+    const observer = new IntersectionObserver((entries) => {
+      if (!entries.some((en) => en.isIntersecting) || loading) return;
+      loading = true;
+      fetch(link.href, { credentials: "same-origin", headers: { Accept: "application/json" } })
+        .then((r) => (r.ok ? r.json() : null))
+        .then((data) => {
+          if (!data || !data.ok) return;
+          const tmp = document.createElement("div");
+          tmp.innerHTML = data.html || "";
+          Array.from(tmp.children).forEach((node) => {
+            list.appendChild(node);
+            initCarousels(node);
+          });
+          if (data.next) {
+            link.href = data.next;
+            // Re-observe: fires again if the link is still visible after a short page
+            observer.unobserve(link);
+            observer.observe(link);
+          } else {
+            observer.disconnect();
+            link.remove();
+          }
+        })
+        .catch(() => {})
+        .finally(() => {
+          loading = false;
+        });
+    }, { rootMargin: "600px 0px" });
+    observer.observe(link);
+  }
+
   document.addEventListener("DOMContentLoaded", function () {
     initLightbox();
     initMetadataEditor();
@@ -543,6 +687,8 @@
     initExistingMediaControls();
     initCharCounters();
     initSectionCoverPreview();
+    initSuggest();
+    initInfiniteList();
   });
 })();
 
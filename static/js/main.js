@@ -33,7 +33,6 @@
     } catch (e) {}
     applyTheme(theme);
 
-<<<<<<< HEAD
     // Expose navbar height to CSS so sidebar can stick correctly everywhere
     function syncNavbarHeight() {
       const nav = document.querySelector(".navbar");
@@ -72,8 +71,6 @@
       updateThemeIcon();
     }
 
-=======
->>>>>>> c3b89d27ec563af11f9e50443796471accc02753
     // Sidebar toggle
     try {
       const storedSidebar = localStorage.getItem(SIDEBAR_KEY);
@@ -101,13 +98,10 @@
       const searchBack = document.getElementById("library-search-back");
       const searchClear = document.getElementById("library-search-clear");
       const searchInput = searchRow ? searchRow.querySelector("input[type='search']") : null;
-<<<<<<< HEAD
       const orderSelect = libraryFilters.querySelector("select[name='order']");
       const advancedToggle = libraryFilters.querySelector("input[name='advanced']");
       const descOnlyToggle = libraryFilters.querySelector("input[name='search_in_description']");
       const sectionCheckboxes = Array.from(libraryFilters.querySelectorAll("input[name='sections']"));
-=======
->>>>>>> c3b89d27ec563af11f9e50443796471accc02753
 
       function openSearch() {
         libraryFilters.classList.add("search-open");
@@ -129,7 +123,6 @@
       if (searchClear && searchInput) {
         searchClear.addEventListener("click", function () {
           searchInput.value = "";
-<<<<<<< HEAD
           scheduleSubmit();
         });
       }
@@ -256,20 +249,21 @@
       });
     }
 
-    // Attach explicit handlers for reliability (prevents link overlays stealing click)
-    Array.from(document.querySelectorAll("[data-menu-btn]")).forEach(function (btn) {
-      btn.addEventListener("click", function (e) {
-        if (e && e.preventDefault) e.preventDefault();
-        if (e && e.stopPropagation) e.stopPropagation();
+    // Delegated so cards appended later (cursor pagination) get menus too;
+    // preventDefault still stops link overlays from stealing the click.
+    document.addEventListener("click", function (e) {
+      const btn = e.target && e.target.closest && e.target.closest("[data-menu-btn]");
+      if (!btn) return;
+      if (e && e.preventDefault) e.preventDefault();
+      if (e && e.stopPropagation) e.stopPropagation();
 
-        const menu = btn.closest(".post-menu") || btn.parentElement;
-        const dropdown = menu ? menu.querySelector("[data-menu-dropdown]") : null;
-        if (!dropdown) return;
+      const menu = btn.closest(".post-menu") || btn.parentElement;
+      const dropdown = menu ? menu.querySelector("[data-menu-dropdown]") : null;
+      if (!dropdown) return;
 
-        const isOpen = dropdown.hidden === false;
-        closeAllMenus(isOpen ? null : dropdown);
-        dropdown.hidden = isOpen ? true : false;
-      });
+      const isOpen = dropdown.hidden === false;
+      closeAllMenus(isOpen ? null : dropdown);
+      dropdown.hidden = isOpen ? true : false;
     });
 
     // Click outside closes menus
@@ -338,10 +332,5 @@
         if (e.key === "Escape" && !modal.hidden) close();
       });
     })();
-=======
-        });
-      }
-    }
->>>>>>> c3b89d27ec563af11f9e50443796471accc02753
   });
 })();
@@ -14,7 +14,6 @@
     const mediaInput = document.getElementById("post-media-input");
     const pickBtn = qs("[data-post-pick]");
     const preview = document.getElementById("post-media-preview");
-    const openBtns = qsa("[data-open-post-modal]");
     const closeBtns = modal ? qsa("[data-post-close]", modal) : [];
 
     if (!modal || !form || !title || !text || !mediaInput || !pickBtn || !preview) return;
@@ -198,17 +197,18 @@
       renderPreview();
     });
 
-    openBtns.forEach(function (btn) {
-      btn.addEventListener("click", function () {
-        const mode = btn.getAttribute("data-open-post-modal");
-        if (mode === "edit") {
-          setModeEdit(btn);
-        } else {
-          setModeCreate();
-        }
-        open();
-        autosizeTextarea(text);
-      });
+    // Delegated: edit buttons of posts loaded by infinite scroll work too
+    document.addEventListener("click", function (e) {
+      const btn = e.target && e.target.closest && e.target.closest("[data-open-post-modal]");
+      if (!btn) return;
+      const mode = btn.getAttribute("data-open-post-modal");
+      if (mode === "edit") {
+        setModeEdit(btn);
+      } else {
+        setModeCreate();
+      }
+      open();
+      autosizeTextarea(text);
     });
 
     closeBtns.forEach(function (btn) {
@@ -375,8 +375,8 @@
     });
   }
 
-  function initCarousels() {
-    qsa("[data-carousel]").forEach(function (carousel) {
+  function initCarousels(root) {
+    qsa("[data-carousel]", root).forEach(function (carousel) {
       const track = qs(".post-carousel-track", carousel);
       const slides = qsa(".post-carousel-slide", carousel);
       const dotsWrap = qs("[data-carousel-dots]", carousel);
@@ -447,6 +447,33 @@
     });
   }
 
+  // "Show more" under a post: next page of its comment thread (cursor in data-url)
+  function initCommentsMore() {
+    document.addEventListener("click", function (e) {
+      const btn = e.target && e.target.closest && e.target.closest("[data-comments-more]");
+      if (!btn || btn.disabled) return;
+      const list = qs("[data-comment-list]", btn.closest(".post-comments"));
+      const url = btn.getAttribute("data-url");
+      if (!list || !url) return;
+      btn.disabled = true;
+      fetch(url, { credentials: "same-origin", headers: { Accept: "application/json" } })
+        .then((r) => (r.ok ? r.json() : null))
+        .then(function (data) {
+          if (!data || !data.ok) return;
+          list.insertAdjacentHTML("beforeend", data.html || "");
+          if (data.next) {
+            btn.setAttribute("data-url", data.next);
+          } else {
+            btn.remove();
+          }
+        })
+        .catch(function () {})
+        .finally(function () {
+          btn.disabled = false;
+        });
+    });
+  }
+
   function initShare() {
     document.addEventListener("click", async function (e) {
       const btn = e.target && e.target.closest && e.target.closest("[data-post-share]");
@@ -513,6 +540,45 @@
     });
   }
 
+  // Cursor pagination: append the next page of posts when the "next" link scrolls into view
+  function initInfiniteFeed() {
+    const list = qs("[data-infinite-list]");
+    const nav = qs("[data-cursor-pagination]");
+    const link = nav ? qs("[data-cursor-next]", nav) : null;
+    if (!list || !link || !("IntersectionObserver" in window)) return;
+
+    let loading = false;
+    const observer = new IntersectionObserver(function (entries) {
+      if (!entries.some((en) => en.isIntersecting) || loading) return;
+      loading = true;
+      fetch(link.href, { credentials: "same-origin", headers: { Accept: "application/json" } })
+        .then((r) => (r.ok ? r.json() : null))
+        .then(function (data) {
+          if (!data || !data.ok) return;
+          const tmp = document.createElement("div");
+          tmp.innerHTML = data.html || "";
+          Array.from(tmp.children).forEach(function (node) {
+            list.appendChild(node);
+            initCarousels(node);
+          });
+          if (data.next) {
+            link.href = data.next;
+            // Re-observe: fires again if the link is still visible after a short page
+            observer.unobserve(link);
+            observer.observe(link);
+          } else {
+            observer.disconnect();
+            link.remove();
+          }
+        })
+        .catch(function () {})
+        .finally(function () {
+          loading = false;
+        });
+    }, { rootMargin: "600px 0px" });
+    observer.observe(link);
+  }
+
   document.addEventListener("DOMContentLoaded", function () {
     initPostModal();
     initPostMenu();
@@ -522,8 +588,10 @@
     initCarousels();
     initPostTextToggle();
     initCommentsToggle();
+    initCommentsMore();
     initShare();
     initVoteAjax();
+    initInfiniteFeed();
   });
 })();
 